@@ -1,71 +1,64 @@
-from datetime import date
-from typing import NotRequired, TypedDict
+import json
+from datetime import date, timedelta
 
-import requests
+from src.model.energy_charts import (
+    ApiMarketData,
+    EpexMarketDataPoint,
+    EpexMarketFrame,
+)
+from src.util.aio import AsyncHttpClient
+from src.util.cache import get_http_cache
 
-from src.model.energy_charts import ApiMarketData, EpexMarketData, EpexMarketDataPoint
+MARKET_DATA_URL = "https://energy-charts.info/charts/price_spot_market/data/de"
+# Days after which a week's market data doesn't change anymore
+FINAL_AFTER_DAYS = 7
 
 
 def get_weekly_market_data(year: int, week: int) -> list[EpexMarketDataPoint]:
     """Fetch weekly EPEX spot market data from energy-charts.info"""
 
-    cur_year = date.today().year
+    return get_weekly_market_frame(year, week).topoints()
+
+
+def get_weekly_market_frame(year: int, week: int) -> EpexMarketFrame:
+    """Fetch weekly EPEX spot market data from energy-charts.info as columnar arrays"""
+
+    body = get_http_cache().get(weekly_market_url(year, week), is_final(year, week))
+    data: list[ApiMarketData] = json.loads(body)
+    return EpexMarketFrame.fromjson(data)
+
+
+async def get_weekly_market_frame_async(
+    year: int, week: int, client: AsyncHttpClient
+) -> EpexMarketFrame:
+    """Fetch weekly EPEX spot market data from energy-charts.info without blocking the event loop"""
+
+    body = await client.get(weekly_market_url(year, week), is_final(year, week))
+    data: list[ApiMarketData] = json.loads(body)
+    return EpexMarketFrame.fromjson(data)
+
+
+def num_iso_weeks(year: int) -> int:
+    """Number of ISO weeks of a year (52 or 53)."""
+
+    # December 28th always falls into the last ISO week
+    return date(year, 12, 28).isocalendar().week
+
+
+def weekly_market_url(year: int, week: int) -> str:
+    """energy-charts.info URL for the market data of an ISO week."""
+
+    # The ISO year of the last days of December may already be the next year
+    cur_year = date.today().isocalendar().year
     assert year >= 1990 and year <= cur_year, f"Year must be in [{1990}, {cur_year}]"
-    assert week >= 1 and week <= 52, "Week must be in [1, 52]"
-
-    url = f"https://energy-charts.info/charts/price_spot_market/data/de/week_{year}_{week:02d}.json"
-    res = requests.get(url)
-    res.raise_for_status()
-    data: list[ApiMarketData] = res.json()
-
-    class TimeSeriesRef(TypedDict):
-        q: str
-        d: NotRequired[list[float]]
-
-    time_series: dict[str, TimeSeriesRef] = {
-        "phc": {"q": "pumped storage"},
-        "xbt": {"q": "Cross border"},
-        "nrp": {"q": "Non-Renewable"},
-        "rp": {"q": "Renewable"},
-        "l": {"q": "Load"},
-        "dap": {"q": "Day Ahead"},
-        "ida": {"q": "Intraday Continuous Average"},
-        "idl": {"q": "Intraday Continuous Low"},
-        "idh": {"q": "Intraday Continuous High"},
-    }
-    times: list[int] = []
-
-    for d in data:
-        if "xAxisValues" in d:
-            times = d["xAxisValues"]
-        name = d["name"][0]["en"] if isinstance(d["name"], list) else d["name"]["en"]
-        for key in time_series:
-            if time_series[key]["q"] in name:
-                time_series[key]["d"] = d["data"]
-
-    assert len(times) > 0, "Data is missing time axis"
-    for k in time_series:
-        assert len(time_series[k]["d"]) == len(times), (
-            "Y and X values have different dimensions"
-        )
-
-    wmd: list[EpexMarketDataPoint] = []
-    for idx, t in enumerate(times):
-        wmd.append(
-            EpexMarketDataPoint(
-                t,
-                EpexMarketData(
-                    pumped_hydro_cons_kw=time_series["phc"]["d"][idx],
-                    x_border_trading_kw=time_series["xbt"]["d"][idx],
-                    non_ren_prod_kw=time_series["nrp"]["d"][idx],
-                    ren_prod_kw=time_series["rp"]["d"][idx],
-                    load_kw=time_series["l"]["d"][idx],
-                    daa_price_eurmwh=time_series["dap"]["d"][idx],
-                    idc_av_price_eurmwh=time_series["ida"]["d"][idx],
-                    idc_low_price_eurmwh=time_series["idl"]["d"][idx],
-                    idc_high_price_eurmwh=time_series["idh"]["d"][idx],
-                ),
-            )
-        )
-
-    return wmd
+    num_weeks = num_iso_weeks(year)
+    assert week >= 1 and week <= num_weeks, f"Week must be in [1, {num_weeks}]"
+
+    return f"{MARKET_DATA_URL}/week_{year}_{week:02d}.json"
+
+
+def is_final(year: int, week: int) -> bool:
+    """Whether the market data of an ISO week is final (and can be cached forever)."""
+
+    week_end = date.fromisocalendar(year, week, 7)
+    return week_end < date.today() - timedelta(days=FINAL_AFTER_DAYS)
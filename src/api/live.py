@@ -0,0 +1,53 @@
+import asyncio
+from datetime import date
+
+from src.api.energy_charts import get_weekly_market_frame_async
+from src.api.open_meteo import get_forecast_frames_async
+from src.model.energy_charts import EpexMarketFrame
+from src.model.forecast import Location
+from src.model.geo import LatLon
+from src.model.open_meteo import ForecastFrame
+from src.util.aio import AsyncHttpClient
+from src.util.geo import merge_forecasts, weight_matrix
+
+# Keeps the request URL below ~4k characters (e.g. for grid cells)
+MAX_LOCS = 128
+
+
+async def fetch_merged_forecast(
+    locs: list[Location], client: AsyncHttpClient
+) -> ForecastFrame:
+    """Fetch the current forecast for a set of locations, merged using the location weights."""
+
+    coords = [LatLon(loc.lat, loc.lon) for loc in locs]
+    chunks = await asyncio.gather(
+        *[
+            get_forecast_frames_async(coords[i : i + MAX_LOCS], client)
+            for i in range(0, len(coords), MAX_LOCS)
+        ]
+    )
+    frames = [frame for chunk in chunks for frame in chunk]
+    if len(frames) == 1:
+        return frames[0]
+    return merge_forecasts(frames, weight_matrix(locs))
+
+
+async def fetch_live_data(
+    location_sets: dict[str, list[Location]], client: AsyncHttpClient | None = None
+) -> tuple[dict[str, ForecastFrame], EpexMarketFrame]:
+    """Fetch the current forecast for each location set and this week's market data concurrently.
+
+    The forecasts of each location set are merged into one, using the location weights.
+    """
+
+    client = client or AsyncHttpClient()
+    year, week, _ = date.today().isocalendar()
+
+    names = list(location_sets)
+    forecasts, market = await asyncio.gather(
+        asyncio.gather(
+            *[fetch_merged_forecast(location_sets[n], client) for n in names]
+        ),
+        get_weekly_market_frame_async(year, week, client),
+    )
+    return dict(zip(names, forecasts)), market
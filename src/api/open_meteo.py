@@ -1,41 +1,103 @@
-from datetime import datetime
-
-import requests
+import json
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
+from typing import BinaryIO
 
+from src.model.geo import LatLon
 from src.model.open_meteo import (
     ApiForecastData,
     ApiForecastValues,
+    ForecastFrame,
     OpenMeteoForecastDataPoint,
 )
-from src.util.geo import LatLon
+from src.util.aio import AsyncHttpClient
+from src.util.cache import get_http_cache
+from src.util.stream import iter_json_values
 
 HOURLY_ATTRS = ",".join(ApiForecastValues.__annotations__.keys())
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+HISTORICAL_FORECAST_URL = "https://historical-forecast-api.open-meteo.com/v1/forecast"
+# Days after which historical forecasts don't change anymore
+FINAL_AFTER_DAYS = 7
+
+
+def request_cost(num_locs: int, num_days: int, num_vars: int | None = None) -> float:
+    """Estimate how many API calls a request counts as against the OpenMeteo quota.
+
+    Requests count as one call per location, scaled up for more than 10 variables or
+    more than 2 weeks of data. The number of variables defaults to all hourly variables.
+    """
+
+    if num_vars is None:
+        num_vars = len(ApiForecastValues.__annotations__)
+    return num_locs * max(1.0, num_vars / 10) * max(1.0, num_days / 14)
+
+
+def is_final(end: datetime | date) -> bool:
+    """Whether historical forecasts up to `end` are final (and can be cached forever)."""
+
+    end_date = end.date() if isinstance(end, datetime) else end
+    return end_date < date.today() - timedelta(days=FINAL_AFTER_DAYS)
+
+
+def forecast_url(locs: list[LatLon]) -> str:
+    """OpenMeteo API URL for the current weather forecast of one or more locations."""
+
+    lats = ",".join(map(str, [loc.lat for loc in locs]))
+    lons = ",".join(map(str, [loc.lon for loc in locs]))
+    return (
+        f"{FORECAST_URL}?latitude={lats}&longitude={lons}&hourly={HOURLY_ATTRS}&tilt=35"
+    )
+
+
+def historical_forecast_url(
+    locs: list[LatLon], start: datetime | date, end: datetime | date
+) -> str:
+    """OpenMeteo API URL for the historical weather forecasts of one or more locations."""
+
+    lats = ",".join(map(str, [loc.lat for loc in locs]))
+    lons = ",".join(map(str, [loc.lon for loc in locs]))
+    sd = start.isoformat()[:10]
+    ed = end.isoformat()[:10]
+    return f"{HISTORICAL_FORECAST_URL}?latitude={lats}&longitude={lons}&start_date={sd}&end_date={ed}&hourly={HOURLY_ATTRS}&tilt=35"
+
+
+def decode_frames(body: bytes, num_locs: int) -> list[ForecastFrame]:
+    """Decode an API response for one or more locations into one frame per location."""
+
+    data: ApiForecastData | list[ApiForecastData] = json.loads(body)
+    if not isinstance(data, list):
+        data = [data]
+    assert len(data) == num_locs, "Response doesn't match the requested locations"
+
+    return [ForecastFrame.fromjson(d) for d in data]
 
 
 def get_forecast(lat: float, lon: float) -> list[OpenMeteoForecastDataPoint]:
     """Fetch OpenMeteo weather forecast data for a given location."""
 
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly={HOURLY_ATTRS}&tilt=35"
-    res = requests.get(url)
-    data: ApiForecastData = res.json()
-    forecast = OpenMeteoForecastDataPoint.fromjson(data)
-
-    return forecast
+    [frame] = get_forecast_frames([LatLon(lat, lon)])
+    return frame.topoints()
 
 
 def get_forecasts(locs: list[LatLon]) -> list[OpenMeteoForecastDataPoint]:
     """Fetch OpenMeteo weather forecasts for several locations."""
 
-    lats = ",".join(map(str, [loc.lat for loc in locs]))
-    lons = ",".join(map(str, [loc.lon for loc in locs]))
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={lats}&longitude={lons}&hourly={HOURLY_ATTRS}&tilt=35"
-    res = requests.get(url)
-    res.raise_for_status()
-    data: list[ApiForecastData] = res.json()
+    return [dp for frame in get_forecast_frames(locs) for dp in frame.topoints()]
+
+
+def get_forecast_frames(locs: list[LatLon]) -> list[ForecastFrame]:
+    """Fetch OpenMeteo weather forecasts for several locations (one frame per location)."""
+
+    return decode_frames(get_http_cache().get(forecast_url(locs)), len(locs))
 
-    forecasts = [OpenMeteoForecastDataPoint.fromjson(d) for d in data]
 
-    return [dp for fc in forecasts for dp in fc]
+async def get_forecast_frames_async(
+    locs: list[LatLon], client: AsyncHttpClient
+) -> list[ForecastFrame]:
+    """Fetch OpenMeteo weather forecasts for several locations without blocking the event loop."""
+
+    return decode_frames(await client.get(forecast_url(locs)), len(locs))
 
 
 def get_historical_forecast(
@@ -43,14 +105,16 @@ def get_historical_forecast(
 ) -> list[OpenMeteoForecastDataPoint]:
     """Fetch historic OpenMeteo weather forecast for a given location and time range."""
 
-    sd = start.isoformat()[:10]
-    ed = end.isoformat()[:10]
-    url = f"https://historical-forecast-api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&start_date={sd}&end_date={ed}&hourly={HOURLY_ATTRS}&tilt=35"
-    res = requests.get(url)
-    data: ApiForecastData = res.json()
-    forecast = OpenMeteoForecastDataPoint.fromjson(data)
+    return get_historical_forecast_frame(lat, lon, start, end).topoints()
+
 
-    return forecast
+def get_historical_forecast_frame(
+    lat: float, lon: float, start: datetime, end: datetime
+) -> ForecastFrame:
+    """Fetch historic OpenMeteo weather forecast for a given location and time range as a frame."""
+
+    [frame] = get_historical_forecast_frames([LatLon(lat, lon)], start, end)
+    return frame
 
 
 def get_historical_forecasts(
@@ -58,15 +122,81 @@ def get_historical_forecasts(
 ) -> list[OpenMeteoForecastDataPoint]:
     """Fetch OpenMeteo weather forecasts for several locations and a given time range."""
 
-    lats = ",".join(map(str, [loc.lat for loc in locs]))
-    lons = ",".join(map(str, [loc.lon for loc in locs]))
-    sd = start.isoformat()[:10]
-    ed = end.isoformat()[:10]
-    url = f"https://historical-forecast-api.open-meteo.com/v1/forecast?latitude={lats}&longitude={lons}&start_date={sd}&end_date={ed}&hourly={HOURLY_ATTRS}&tilt=35"
-    res = requests.get(url)
-    res.raise_for_status()
-    data: list[ApiForecastData] = res.json()
+    with iter_historical_forecast_frames(locs, start, end) as frames:
+        return [dp for frame in frames for dp in frame.topoints()]
+
+
+def get_historical_forecast_frames(
+    locs: list[LatLon], start: datetime | date, end: datetime | date
+) -> list[ForecastFrame]:
+    """Fetch historic OpenMeteo weather forecasts for several locations with one request (one frame per location)."""
+
+    with iter_historical_forecast_frames(locs, start, end) as frames:
+        return list(frames)
+
+
+async def get_historical_forecast_frames_async(
+    locs: list[LatLon],
+    start: datetime | date,
+    end: datetime | date,
+    client: AsyncHttpClient,
+) -> list[ForecastFrame]:
+    """Fetch historic OpenMeteo weather forecasts for several locations without blocking the event loop."""
+
+    url = historical_forecast_url(locs, start, end)
+    return decode_frames(await client.get(url, is_final(end)), len(locs))
+
+
+class ForecastFrameReader:
+    """Frames of a downloaded multi-location response, decoded one location at a time.
+
+    The response file is closed once all frames are read, on `close()` or when leaving
+    a `with` block, so a reader that is dropped early doesn't keep it open.
+    """
+
+    def __init__(self, f: BinaryIO, num_locs: int):
+        self._f = f
+        self._frames = self._decode(num_locs)
+
+    def _decode(self, num_locs: int) -> Iterator[ForecastFrame]:
+        num = 0
+        with self._f:
+            data: ApiForecastData
+            for data in iter_json_values(self._f):
+                num += 1
+                assert num <= num_locs, "Response doesn't match the requested locations"
+                yield ForecastFrame.fromjson(data)
+        assert num == num_locs, "Response doesn't match the requested locations"
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> ForecastFrame:
+        return next(self._frames)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        self._frames.close()
+        self._f.close()
+
+
+def iter_historical_forecast_frames(
+    locs: list[LatLon], start: datetime | date, end: datetime | date
+) -> ForecastFrameReader:
+    """Fetch historic OpenMeteo weather forecasts for several locations with one request.
 
-    forecasts = [OpenMeteoForecastDataPoint.fromjson(d) for d in data]
+    The response is downloaded right away, but decoded lazily: one frame per location
+    is yielded at a time, so memory is bounded by a single location's data. Close the
+    reader (or use it in a `with` block) if it may not be read to the end.
+    """
 
-    return [dp for fc in forecasts for dp in fc]
+    url = historical_forecast_url(locs, start, end)
+    return ForecastFrameReader(get_http_cache().open(url, is_final(end)), len(locs))
@@ -1,10 +1,85 @@
-from src.api.open_meteo import get_forecasts
-from src.util.geo import LatLon, get_german_states, merge_forecasts
+import argparse
+import json
+from datetime import date
+
+import src.util.log as log
+
+# Heavy dependencies (NumPy, DuckDB, requests, torch) are imported by the commands that
+# need them, which keeps `--help` and argument errors fast
+
+
+def print_live_data():
+    import asyncio
+
+    from src.api.live import fetch_live_data
+    from src.util.geo import get_german_states
+
+    forecasts, market = asyncio.run(fetch_live_data({"DE": get_german_states()}))
+    print("FORECAST", forecasts["DE"])
+    print("MARKET", market)
+
+
+def make_service(args: argparse.Namespace):
+    """Forecast service for the command line options (see `main`)."""
+
+    import duckdb
+
+    from src.util.backtest import seasonal_naive
+    from src.util.db import db_filepath
+    from src.util.service import ForecastService, LiveWeather
+
+    if args.model:
+        from src.model.rnn import PricePredictor
+
+        forecaster = PricePredictor.fromfile(args.model)
+    else:
+        forecaster = seasonal_naive
+    return ForecastService(
+        duckdb.connect(args.db or db_filepath),
+        forecaster,
+        fetch_weather=None if args.offline else LiveWeather(),
+    )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.app",
+        description="Live weather forecasts and next-day price forecasts for Germany",
+    )
+    cmds = parser.add_subparsers(dest="cmd")
+    cmds.add_parser("live", help="print the live forecast and market data (default)")
+    serve_cmd = cmds.add_parser("serve", help="serve price forecasts over HTTP")
+    forecast_cmd = cmds.add_parser("forecast", help="print a price forecast as JSON")
+    for cmd in [serve_cmd, forecast_cmd]:
+        cmd.add_argument("--db", help="DuckDB file (default: data/db/local.db)")
+        cmd.add_argument(
+            "--model", help="saved price predictor (default: seasonal naive)"
+        )
+        cmd.add_argument(
+            "--offline", action="store_true", help="only use stored weather forecasts"
+        )
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8050)
+    serve_cmd.add_argument(
+        "--refresh", type=float, default=600, help="refresh interval (in s)"
+    )
+    forecast_cmd.add_argument(
+        "--day", type=date.fromisoformat, help="delivery day (default: tomorrow)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.cmd == "serve":
+        from src.util.service import serve
+
+        service = make_service(args)
+        log.msg(f"Serving forecasts on http://{args.host}:{args.port}/forecast")
+        serve(service, args.host, args.port, args.refresh)
+    elif args.cmd == "forecast":
+        service = make_service(args)
+        print(json.dumps(service.forecast(args.day)))
+    else:
+        print_live_data()
+
 
 if __name__ == "__main__":
-    states = get_german_states()
-    forecasts = get_forecasts([LatLon(s.lat, s.lon) for s in states])
-    forecast = merge_forecasts(forecasts, [s.weight for s in states])
-    print("DAYS", [d.isoformat()[:10] for d in forecast.days])
-    print("DAYLIGHT", forecast.daylight_dur)
-    print("SUNSHINE", forecast.sunshine_dur)
+    main()
@@ -0,0 +1,68 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import src.util.log as log
+from src.model.chronos import ChronosForecaster
+from src.model.features import LAGGED_KEYS, WEATHER_KEYS, FeatureMatrix
+
+TARGET = "idc_av_price_eurmwh"
+
+
+def predict_df_days(model: ChronosForecaster, fm: FeatureMatrix, starts: np.ndarray):
+    """One `predict_df` call per day, with DataFrames built from the feature matrix."""
+
+    df = pd.DataFrame(fm.x, columns=fm.keys)
+    df.insert(0, "timestamp", fm.ts)
+    df.insert(0, "id", "DE")
+    for s in starts.tolist():
+        lo = max(0, s - model.context_hours)
+        model.pipeline.predict_df(  # type: ignore
+            df.iloc[lo:s],
+            future_df=df.iloc[s : s + model.horizon].drop(columns=TARGET),
+            prediction_length=model.horizon,
+            quantile_levels=model.quantiles,
+            id_column="id",
+            timestamp_column="timestamp",
+            target=TARGET,
+        )
+
+
+def run(num_days: int):
+    rng = np.random.default_rng(0)
+    keys = [*WEATHER_KEYS, *LAGGED_KEYS, TARGET]
+    num_hours = (num_days + 28) * 24
+    ts = np.datetime64("2024-01-01T00:00", "ms") + np.arange(
+        num_hours
+    ) * np.timedelta64(1, "h")
+    x = rng.normal(size=(num_hours, len(keys))).astype(np.float32)
+    fm = FeatureMatrix(ts, x, keys, np.zeros(len(keys)), np.ones(len(keys)))
+    starts = np.arange(28 * 24, num_hours - 23, 24)
+
+    model = ChronosForecaster.from_pretrained(TARGET, keys[:-1], batch_size=1)
+    log.msg(
+        f"Benchmark {len(starts)} daily Chronos-2 forecasts with {len(keys) - 1} covariates ({model.context_hours}h context)"
+    )
+
+    t0 = time.perf_counter()
+    predict_df_days(model, fm, starts)
+    dur = time.perf_counter() - t0
+    log.info(
+        f"predict_df per day: {dur:.2f}s", f" ({len(starts) / dur:.1f} forecasts/s)"
+    )
+
+    for batch_size in [1, 32, 128]:
+        model.batch_size = batch_size
+        t0 = time.perf_counter()
+        model.predict(fm, starts)
+        dur_batch = time.perf_counter() - t0
+        log.info(
+            f"Batches of {batch_size}: {dur_batch:.2f}s",
+            f" ({model.throughput:.1f} forecasts/s, {dur / dur_batch:.1f}x)",
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
@@ -0,0 +1,81 @@
+import glob
+import json
+import os
+import sys
+import time
+from collections.abc import Callable
+
+import yaml
+from dateutil.parser import parse
+
+import src.util.log as log
+from src.model.open_meteo import (
+    ApiForecastData,
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+
+cassette_dir = os.path.normpath(
+    f"{__file__}/../../../test/api/cassettes/test_open_meteo"
+)
+
+
+def fromjson_legacy(data: ApiForecastData) -> list[OpenMeteoForecastDataPoint]:
+    """Previous decoder, which parses every timestamp with dateutil."""
+
+    data_points: list[OpenMeteoForecastDataPoint] = []
+    lat = data["latitude"]
+    lon = data["longitude"]
+    elev = data["elevation"]
+    hourly = data["hourly"]
+    for idx, time_str in enumerate(hourly["time"]):
+        ts = parse(time_str)
+        vals: dict[str, float] = {}
+        for k in OpenMeteoForecastData.__annotations__:
+            attr = "_".join(k.split("_")[:-1])
+            vals[k] = hourly[attr][idx]
+        data_points.append(
+            OpenMeteoForecastDataPoint(
+                ts, lat, lon, elev, OpenMeteoForecastData(**vals)
+            )
+        )
+
+    return data_points
+
+
+def load_responses() -> list[ApiForecastData]:
+    """Load all OpenMeteo API responses recorded in the test cassettes."""
+
+    responses: list[ApiForecastData] = []
+    for filepath in sorted(glob.glob(f"{cassette_dir}/*.yaml")):
+        with open(filepath) as f:
+            for interaction in yaml.safe_load(f)["interactions"]:
+                data = json.loads(interaction["response"]["body"]["string"])
+                responses.extend(data if isinstance(data, list) else [data])
+    return responses
+
+
+def run(repeat: int):
+    responses = load_responses()
+    num_rows = sum(len(r["hourly"]["time"]) for r in responses)
+    log.msg(
+        f"Benchmark decoding {len(responses)} recorded responses ({num_rows} rows) × {repeat}"
+    )
+
+    decoders: list[tuple[str, Callable[[ApiForecastData], object]]] = [
+        ("Legacy data points", fromjson_legacy),
+        ("Data points", OpenMeteoForecastDataPoint.fromjson),
+        ("ForecastFrame", ForecastFrame.fromjson),
+    ]
+    for name, decode in decoders:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for r in responses:
+                decode(r)
+        dur = time.perf_counter() - t0
+        log.info(f"{name}: {dur:.3f}s", f" ({num_rows * repeat / dur:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
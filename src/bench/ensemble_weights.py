@@ -0,0 +1,80 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import src.util.log as log
+from src.util.ensemble import blend_grid, fit_weights, local_day_hour, rolling_weights
+
+
+def notebook_blend(pdata: pd.DataFrame) -> float:
+    """Previous blend factor search of the Chronos notebook, one factor at a time."""
+
+    daa_dev_mean = (pdata["intraday_price"] - pdata["day_ahead_price"]).abs().mean()
+    best_im, best_blend_fac = float("inf"), 0.0
+    for blend_fac in [v / 100 for v in range(1, 51)]:
+        blend_price = (1 - blend_fac) * pdata["day_ahead_price"] + blend_fac * pdata[
+            "pred_price"
+        ]
+        blend_diff = pdata["intraday_price"] - blend_price
+        blend_dev_mean = blend_diff.abs().mean()
+        blend_diff.abs().std()
+        im = blend_dev_mean - daa_dev_mean
+        if im < best_im:
+            best_im, best_blend_fac = im, blend_fac
+    return best_blend_fac
+
+
+def timed(fn, reps=5) -> float:
+    durs = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        durs.append(time.perf_counter() - t0)
+    return float(np.median(durs))
+
+
+def run(num_years: float):
+    rng = np.random.default_rng(0)
+    num_hours = round(num_years * 365 * 24)
+    ts = np.datetime64("2015-01-01T00:00", "ms") + np.arange(
+        num_hours
+    ) * np.timedelta64(1, "h")
+    actual = rng.normal(80, 30, num_hours)
+    # Day-ahead price, GRU, LSTM and Chronos median with different errors
+    preds = actual[:, None] + rng.normal(0, [8, 12, 12, 10], (num_hours, 4))
+    log.msg(
+        f"Benchmark ensemble weights for {num_hours:,} hours × {preds.shape[1]} forecasters"
+    )
+
+    pdata = pd.DataFrame(
+        {
+            "intraday_price": actual,
+            "day_ahead_price": preds[:, 0],
+            "pred_price": preds[:, 3],
+        }
+    )
+    dur_nb = timed(lambda: notebook_blend(pdata), reps=1)
+    factors = np.arange(1, 51) / 100
+    dur_grid = timed(lambda: blend_grid(preds[:, 0], preds[:, 3], actual, factors))
+    log.info(
+        f"Blend factors (50): notebook {dur_nb * 1e3:.1f}ms",
+        f" | vectorized grid {dur_grid * 1e3:.1f}ms ({dur_nb / dur_grid:.0f}x)",
+    )
+
+    _, hours = local_day_hour(ts)
+    for name, fn in [
+        ("Closed-form fit", lambda: fit_weights(preds, actual)),
+        ("Closed-form fit per hour", lambda: fit_weights(preds, actual, hours)),
+        ("Daily refit (365-day window)", lambda: rolling_weights(preds, actual, ts)),
+        (
+            "Daily refit per hour (365-day window)",
+            lambda: rolling_weights(preds, actual, ts, per_hour=True),
+        ),
+    ]:
+        log.info(f"{name}: {timed(fn) * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 10)
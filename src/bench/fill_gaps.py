@@ -0,0 +1,70 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import src.util.log as log
+from src.model.features import WEATHER_KEYS
+from src.util.gaps import fill_hourly
+from src.util.tz import to_local_wall_ms
+
+
+def make_frame(num_years: float) -> pd.DataFrame:
+    """Hourly data in local wall clock time, as the notebooks load it from the DB."""
+
+    rng = np.random.default_rng(0)
+    utc = np.datetime64("2023-01-01T00:00", "ms") + np.arange(
+        round(num_years * 365 * 24)
+    ) * np.timedelta64(1, "h")
+    wall = np.unique(to_local_wall_ms(utc.astype(np.int64))).astype("datetime64[ms]")
+    return pd.DataFrame(
+        {k: rng.random(len(wall)) for k in WEATHER_KEYS}, index=pd.Index(wall)
+    )
+
+
+def fill_loop(data: pd.DataFrame) -> pd.DataFrame:
+    """Previous gap filling from the notebooks, which walks every row."""
+
+    tdata = data.copy()
+    for idx in range(1, tdata.shape[0]):
+        ts = tdata.index[idx]
+        prev_ts = tdata.index[idx - 1]
+        diff = (ts.hour - prev_ts.hour) % 24
+        if diff != 1:
+            iso_str = f"{ts.year}-{ts.month:02d}-{ts.day:02d}T{(ts.hour - 1):02d}:00:00"
+            new_ts = pd.to_datetime(iso_str)
+            tdata = pd.concat(
+                [tdata, pd.DataFrame(tdata.loc[prev_ts].to_dict(), index=[new_ts])]
+            )
+    tdata.sort_index(ascending=True, inplace=True)
+    return tdata
+
+
+def fill_vectorized(data: pd.DataFrame) -> pd.DataFrame:
+    grid, vals = fill_hourly(
+        data.index.to_numpy(), {k: data[k].to_numpy() for k in data.columns}
+    )
+    return pd.DataFrame(vals, index=pd.Index(grid))
+
+
+def run(num_years: float):
+    data = make_frame(num_years)
+    log.msg(
+        f"Benchmark DST gap filling for {len(data):,} hours × {data.shape[1]} columns"
+    )
+
+    results = {}
+    for name, fill in [("Row loop", fill_loop), ("Vectorized", fill_vectorized)]:
+        t0 = time.perf_counter()
+        results[name] = fill(data)
+        dur = time.perf_counter() - t0
+        log.info(f"{name}: {dur * 1e3:,.1f}ms", f" ({len(results[name]):,} hours)")
+
+    loop, vec = results.values()
+    assert np.array_equal(loop.to_numpy(), vec.to_numpy()), "Results differ"
+    log.success("Results match")
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 2.5)
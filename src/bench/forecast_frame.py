@@ -0,0 +1,83 @@
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+import src.util.log as log
+from src.model.open_meteo import (
+    ApiForecastData,
+    ApiForecastValues,
+    ForecastFrame,
+    OpenMeteoForecastDataPoint,
+)
+
+
+def make_response(lat: float, lon: float, num_hours: int) -> ApiForecastData:
+    """Create a synthetic OpenMeteo API response for one location."""
+
+    start = datetime(2020, 1, 1)
+    times = [(start + timedelta(hours=h)).isoformat()[:16] for h in range(num_hours)]
+    hourly = {
+        k: [(h % 97) * 0.5 for h in range(num_hours)]
+        for k in ApiForecastValues.__annotations__
+    }
+    return ApiForecastData(
+        latitude=lat,
+        longitude=lon,
+        generationtime_ms=1.0,
+        utc_offset_seconds=0,
+        timezone="GMT",
+        timezone_abbreviation="GMT",
+        elevation=100,
+        hourly_units={},
+        hourly={"time": times, **hourly},  # type: ignore[typeddict-item]
+    )
+
+
+def measure(
+    name: str,
+    build: Callable[[list[ApiForecastData]], object],
+    make: Callable[[], list[ApiForecastData]],
+):
+    responses = make()
+    t0 = time.perf_counter()
+    build(responses)
+    dur = time.perf_counter() - t0
+    del responses
+
+    # Measure what stays on the heap once the API responses are discarded
+    tracemalloc.start()
+    res = build(make())
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del res
+    log.info(f"{name}: {dur:.2f}s", f" ({size / 2**20:,.1f} MiB retained)")
+
+
+def run(num_locations: int, num_hours: int):
+    log.msg(
+        f"Benchmark forecast containers for {num_locations} locations × {num_hours} hours"
+    )
+
+    def make() -> list[ApiForecastData]:
+        return [
+            make_response(48 + i * 0.25, 8 + i * 0.5, num_hours)
+            for i in range(num_locations)
+        ]
+
+    measure(
+        "Data points",
+        lambda rs: [dp for r in rs for dp in OpenMeteoForecastDataPoint.fromjson(r)],
+        make,
+    )
+    measure(
+        "ForecastFrame",
+        lambda rs: ForecastFrame.concat([ForecastFrame.fromjson(r) for r in rs]),
+        make,
+    )
+
+
+if __name__ == "__main__":
+    years = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    run(16, round(years * 365 * 24))
@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.request import urlopen
+
+import duckdb
+import numpy as np
+
+import src.util.log as log
+from src.model.energy_charts import (
+    EpexMarketData,
+    EpexMarketDataPoint,
+    EpexMarketFrame,
+)
+from src.model.open_meteo import (
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+from src.util.backtest import seasonal_naive
+from src.util.features import build_features
+from src.util.service import ForecastService, make_server
+
+
+def create_db(path: str, num_days: int):
+    """Synthetic weather (up to the end of tomorrow) and market data (up to now)."""
+
+    rng = np.random.default_rng(0)
+    end = np.datetime64(date.today() + timedelta(days=2), "ms")
+    start = end - np.timedelta64(num_days, "D")
+    ts = np.arange(start, end, np.timedelta64(1, "h"))
+    ones = np.ones(len(ts))
+
+    con = duckdb.connect(path)
+    OpenMeteoForecastDataPoint.init_table(con, "open_meteo_agg_hourly")
+    EpexMarketDataPoint.init_table(con)
+    vals = {
+        k: rng.normal(10, 5, len(ts)) for k in OpenMeteoForecastData.__annotations__
+    }
+    frame = ForecastFrame(ts, ones * 51, ones * 10, ones, vals)
+    OpenMeteoForecastDataPoint.upsert_many(frame, con, "open_meteo_agg_hourly")
+
+    m_ts = ts[:-48].astype(np.int64)
+    m_vals = {k: rng.normal(80, 30, len(m_ts)) for k in EpexMarketData.__annotations__}
+    EpexMarketDataPoint.upsert_many(EpexMarketFrame(m_ts, m_vals), con)
+    build_features(con)
+    con.close()
+
+
+def run(reps: int):
+    day = date.today() + timedelta(days=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        create_db(path, 90)
+        log.msg(f"Benchmark next-day forecasts ({day}), {reps} requests each")
+
+        cmd = [sys.executable, "-m", "src.app", "forecast", "--offline"]
+        cmd += ["--db", path, "--day", day.isoformat()]
+        durs = []
+        for _ in range(min(reps, 5)):
+            t0 = time.perf_counter()
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            durs.append(time.perf_counter() - t0)
+        assert len(json.loads(out.stdout)["prices"]) > 0
+        cold = float(np.median(durs))
+        log.info(f"Cold (new process per forecast): {cold * 1e3:.0f}ms")
+
+        service = ForecastService(duckdb.connect(path), seasonal_naive)
+        t0 = time.perf_counter()
+        service.refresh()
+        log.info(
+            f"Service start (first refresh): {(time.perf_counter() - t0) * 1e3:.0f}ms"
+        )
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/forecast?day={day}"
+
+        def timed(invalidate: bool) -> float:
+            durs = []
+            for _ in range(reps):
+                if invalidate:
+                    service.forecasts.clear()
+                t0 = time.perf_counter()
+                with urlopen(url) as res:
+                    json.load(res)
+                durs.append(time.perf_counter() - t0)
+            return float(np.median(durs))
+
+        try:
+            for name, invalidate in [("Warm", True), ("Warm (cached)", False)]:
+                dur = timed(invalidate)
+                log.info(
+                    f"{name}: {dur * 1e3:.2f}ms",
+                    f" ({cold / dur:.0f}x faster than cold)",
+                )
+            t0 = time.perf_counter()
+            service.refresh()
+            log.info(
+                f"Refresh without new data: {(time.perf_counter() - t0) * 1e3:.2f}ms"
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.con.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,92 @@
+import sys
+import time
+from datetime import date, timedelta
+
+import duckdb
+import numpy as np
+
+import src.util.log as log
+from src.api.open_meteo import request_cost
+from src.model.forecast import Location
+from src.model.open_meteo import (
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+from src.scripts.download_open_meteo_forecasts import MAX_DAYS, MAX_GRID_LOCS
+from src.util.coverage import CoverageIndex
+from src.util.geo import get_german_grid, merge_forecasts, merge_forecasts_db
+from src.util.plan import DateRange, plan_requests
+
+START = date(2024, 1, 1)
+
+# Points -> grid (rows, cols) per state
+GRIDS = {16: (1, 1), 256: (4, 4), 1024: (8, 8)}
+
+
+def make_frames(locs: list[Location], num_hours: int) -> list[ForecastFrame]:
+    """Create synthetic hourly forecasts for each location."""
+
+    rng = np.random.default_rng(0)
+    ts = np.datetime64(START, "h") + np.arange(num_hours).astype("timedelta64[h]")
+    return [
+        ForecastFrame(
+            ts,
+            np.full(num_hours, loc.lat),
+            np.full(num_hours, loc.lon),
+            np.full(num_hours, 100.0),
+            {
+                k: rng.random(num_hours) * 100
+                for k in OpenMeteoForecastData.__annotations__
+            },
+        )
+        for loc in locs
+    ]
+
+
+def store(con: duckdb.DuckDBPyConnection, frames: list[ForecastFrame]):
+    """Store forecasts with one insert per request, as in the downloader."""
+
+    for i in range(0, len(frames), MAX_GRID_LOCS):
+        chunk = ForecastFrame.concat(frames[i : i + MAX_GRID_LOCS])
+        OpenMeteoForecastDataPoint.upsert_many(chunk, con)
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    res = fn(*args, **kwargs)
+    return res, time.perf_counter() - t0
+
+
+def run(num_days: int):
+    log.msg(f"Benchmark grid aggregation for {num_days} days")
+
+    end = START + timedelta(days=num_days - 1)
+    for num_points, grid in GRIDS.items():
+        locs = get_german_grid(*grid)
+        assert len(locs) == num_points
+
+        # Requests to download the whole range
+        tasks = plan_requests(
+            {loc: [DateRange(START, end)] for loc in locs}, MAX_GRID_LOCS, MAX_DAYS
+        )
+        cost = sum(request_cost(len(t.keys), t.num_days) for t in tasks)
+
+        frames = make_frames(locs, num_days * 24)
+        con = duckdb.connect(":memory:")
+        OpenMeteoForecastDataPoint.init_table(con)
+
+        _, dur_store = timed(store, con, frames)
+        _, dur_index = timed(CoverageIndex.build, con, locs, START, end, tol=0)
+        _, dur_db = timed(merge_forecasts_db, con, locs, tol=0)
+        _, dur_py = timed(merge_forecasts, frames, [loc.weight for loc in locs])
+
+        log.info(
+            f"{num_points:>4} points: {len(tasks)} requests ({cost:,.0f} calls)",
+            f" | store {dur_store:.2f}s | coverage {dur_index:.2f}s"
+            + f" | merge in DB {dur_db:.2f}s | merge in Python {dur_py:.2f}s",
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
@@ -0,0 +1,70 @@
+import sys
+import time
+
+import numpy as np
+import torch
+
+import src.util.log as log
+from src.model.features import LAGGED_KEYS, WEATHER_KEYS
+from src.model.rnn import MODELS, PricePredictor
+
+
+def notebook_predict(model: torch.nn.Module, x: np.ndarray) -> np.ndarray:
+    """Previous inference of the notebooks, in eval mode but with autograd enabled."""
+
+    model.eval()
+    return model(torch.from_numpy(x))[:, -24:, 0].detach().numpy()
+
+
+def latency(fn, x: np.ndarray, reps: int) -> float:
+    """Median duration of a call in seconds (after a warm-up call)."""
+
+    fn(x)
+    durs = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn(x)
+        durs.append(time.perf_counter() - t0)
+    return float(np.median(durs))
+
+
+def run(model_name: str, reps: int):
+    rng = np.random.default_rng(0)
+    num_features = len(WEATHER_KEYS) + len(LAGGED_KEYS)
+    model = MODELS[model_name](num_features, num_layers=2, hidden_size=128)
+    log.msg(
+        f"Benchmark {model_name.upper()} 2×128 price predictions on"
+        + f" {torch.get_num_threads()} threads ({num_features} features, lookback 24h)"
+    )
+
+    variants: dict[str, PricePredictor] = {}
+    for backend in ["eager", "script", "compile"]:
+        for quantize in [False, True]:
+            t0 = time.perf_counter()
+            pred = PricePredictor(model, backend=backend, quantize=quantize)
+            # The first call compiles
+            pred.predict(np.zeros((1, 24, num_features), dtype=np.float32))
+            variants[f"{pred}"] = pred
+            log.info(f"{pred}", f" prepared in {time.perf_counter() - t0:.2f}s")
+
+    for batch_size in [1, 32, 365]:
+        x = rng.normal(size=(batch_size, 24, num_features)).astype(np.float32)
+        base = latency(lambda x: notebook_predict(model, x), x, reps)
+        log.msg(f"Batch of {batch_size} days")
+        log.info(f"notebook: {base * 1e3:.2f}ms", f" ({batch_size / base:,.0f} days/s)")
+        expected = variants[next(iter(variants))].predict(x)
+        for name, pred in variants.items():
+            dur = latency(pred.predict, x, reps)
+            err = np.abs(pred.predict(x) - expected).max()
+            log.info(
+                f"{name.removeprefix('PricePredictor: ')}: {dur * 1e3:.2f}ms",
+                f" ({batch_size / dur:,.0f} days/s, {base / dur:.1f}x,"
+                + f" max. diff {err:.4f})",
+            )
+
+
+if __name__ == "__main__":
+    run(
+        sys.argv[1] if len(sys.argv) > 1 else "gru",
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    )
@@ -0,0 +1,63 @@
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from typing import BinaryIO
+
+import src.util.log as log
+from src.bench.forecast_frame import make_response
+from src.model.open_meteo import ApiForecastData, ForecastFrame
+from src.util.stream import iter_json_values
+
+
+def decode_full(f: BinaryIO) -> Iterable[ApiForecastData]:
+    """Previous decoder, which loads the whole response at once."""
+
+    return json.load(f)
+
+
+def measure(name: str, decode: Callable[[BinaryIO], Iterable[ApiForecastData]], path):
+    def ingest():
+        num_rows = 0
+        with open(path, "rb") as f:
+            for data in decode(f):
+                num_rows += len(ForecastFrame.fromjson(data))
+        return num_rows
+
+    t0 = time.perf_counter()
+    num_rows = ingest()
+    dur = time.perf_counter() - t0
+
+    tracemalloc.start()
+    ingest()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    log.info(
+        f"{name}: {dur:.2f}s",
+        f" ({num_rows:,} rows, {peak / 2**20:,.1f} MiB peak)",
+    )
+
+
+def run(num_locations: int, num_hours: int):
+    log.msg(
+        f"Benchmark decoding a response for {num_locations} locations × {num_hours} hours"
+    )
+
+    with tempfile.NamedTemporaryFile(suffix=".json") as f:
+        for i in range(num_locations):
+            data = make_response(48 + i * 0.25, 8 + i * 0.5, num_hours)
+            f.write(b"[" if i == 0 else b",")
+            f.write(json.dumps(data).encode())
+        f.write(b"]")
+        f.flush()
+        log.info(f"Response size: {f.tell() / 2**20:,.1f} MiB")
+
+        measure("Full decode", decode_full, f.name)
+        measure("Streaming decode", iter_json_values, f.name)
+
+
+if __name__ == "__main__":
+    years = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    run(16, round(years * 365 * 24))
@@ -0,0 +1,78 @@
+import calendar
+import sys
+import time
+from datetime import datetime, timedelta
+
+import duckdb
+from duckdb import DuckDBPyConnection
+
+import src.util.log as log
+from src.model.open_meteo import (
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+
+TBL_NAME = "open_meteo_hourly"
+
+
+def upsert_many_sql(data: list[OpenMeteoForecastDataPoint], con: DuckDBPyConnection):
+    """Previous ingest path, which renders all values into one SQL string."""
+
+    val_str = (
+        "("
+        + "), (".join(
+            [
+                f"make_timestamp_ms({round(calendar.timegm(time.localtime(d.ts.timestamp())) * 1e3)}), "
+                + f"{d.lat:.6f}, {d.lon:.6f}, {d.elev},"
+                + ", ".join(
+                    [f"{getattr(d, k)}" for k in OpenMeteoForecastData.__annotations__]
+                ).replace("None", "NULL")
+                for d in data
+            ]
+        )
+        + ")"
+    )
+    stmt = f"""
+    INSERT OR IGNORE INTO {TBL_NAME} VALUES
+    {val_str};
+    """
+    con.execute(stmt)
+
+
+def make_data(num_rows: int) -> list[OpenMeteoForecastDataPoint]:
+    """Create hourly data points for 16 locations, starting on 2020-01-01."""
+
+    start = datetime(2020, 1, 1)
+    keys = OpenMeteoForecastData.__annotations__.keys()
+    return [
+        OpenMeteoForecastDataPoint(
+            start + timedelta(hours=idx // 16),
+            48 + (idx % 16) * 0.25,
+            8 + (idx % 16) * 0.5,
+            100,
+            OpenMeteoForecastData(**{k: (idx % 97) * 0.5 for k in keys}),
+        )
+        for idx in range(num_rows)
+    ]
+
+
+def run(num_rows: int):
+    log.msg(f"Benchmark forecast ingest with {num_rows} rows")
+    data = make_data(num_rows)
+    for name, upsert in [
+        ("SQL string", upsert_many_sql),
+        ("Columnar", OpenMeteoForecastDataPoint.upsert_many),
+    ]:
+        con = duckdb.connect(":memory:")
+        OpenMeteoForecastDataPoint.init_table(con)
+        t0 = time.perf_counter()
+        upsert(data, con)
+        dur = time.perf_counter() - t0
+        [(cnt,)] = con.sql(f"SELECT count(*) FROM {TBL_NAME}").fetchall()
+        log.info(
+            f"{name}: {dur:.2f}s", f" ({num_rows / dur:,.0f} rows/s, {cnt} stored)"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,59 @@
+import sys
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+import src.util.log as log
+from src.model.dataset import WindowDataset
+from src.model.features import FEATURE_KEYS
+
+
+def create_dataset(data: np.ndarray, target: int, lookback: int, horizon: int):
+    """Previous dataset creation from the notebooks, which copies every window."""
+
+    X, y = [], []
+    for i in range(lookback, len(data) - horizon, 24):
+        X.append(data[i - lookback : i])
+        y.append(data[i : i + horizon][:, target])
+    return torch.tensor(np.array(X)), torch.tensor(np.array(y))
+
+
+def epoch(loader: DataLoader) -> float:
+    t0 = time.perf_counter()
+    for X, y in loader:
+        X.sum() + y.sum()
+    return time.perf_counter() - t0
+
+
+def run(num_years: float):
+    rng = np.random.default_rng(0)
+    x = rng.random((round(num_years * 365 * 24), len(FEATURE_KEYS)), dtype=np.float32)
+    log.msg(
+        f"Benchmark sliding windows over {len(x):,} hours × {x.shape[1]} features"
+        + f" ({x.nbytes / 2**20:,.1f} MiB)"
+    )
+
+    for lookback in [24, 7 * 24, 28 * 24]:
+        t0 = time.perf_counter()
+        X, y = create_dataset(x, 0, lookback, 24)
+        dur_copy = time.perf_counter() - t0
+        size = X.nbytes + y.nbytes
+        dur_copy_epoch = epoch(DataLoader(TensorDataset(X, y), batch_size=32))
+
+        t0 = time.perf_counter()
+        ds = WindowDataset(x, 0, lookback, 24, 24)
+        dur_view = time.perf_counter() - t0
+        dur_view_epoch = epoch(ds.loader(batch_size=32))
+
+        log.info(
+            f"Lookback {lookback}h: copies {size / 2**20:,.1f} MiB in {dur_copy:.2f}s"
+            + f" ({len(X)} windows, epoch {dur_copy_epoch:.2f}s)",
+            f" | views: 0 MiB in {dur_view * 1e3:.1f}ms"
+            + f" ({len(ds)} windows, epoch {dur_view_epoch:.2f}s)",
+        )
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 2.5)
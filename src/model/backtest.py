@@ -0,0 +1,123 @@
+from datetime import date
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+from src.util.db import insert_columns
+
+TBL_NAME = "backtest_forecasts"
+
+
+class BacktestForecasts:
+    """Cached per-day forecasts of backtests: one value per hour and quantile"""
+
+    @staticmethod
+    def init_table(con: DuckDBPyConnection):
+        con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TBL_NAME} (
+            name VARCHAR,
+            day DATE,
+            ts TIMESTAMP_MS,
+            quantile DOUBLE,
+            value DOUBLE,
+            PRIMARY KEY (name, ts, quantile)
+        );
+        """)
+
+    @staticmethod
+    def upsert_many(
+        name: str,
+        day: np.ndarray,
+        ts: np.ndarray,
+        quantiles: list[float],
+        vals: np.ndarray,
+        con: DuckDBPyConnection,
+    ):
+        """Store forecasts (hours × quantiles) with the delivery day of every hour."""
+
+        assert len(day) == len(ts), "Every hour must have a day"
+        assert vals.shape == (len(ts), len(quantiles)), (
+            "Values must be hours × quantiles"
+        )
+        if len(ts) == 0:
+            return
+
+        ts = np.asarray(ts, dtype="datetime64[ms]")
+        days = np.unique(np.asarray(day, dtype="datetime64[D]"))
+        con.execute(
+            f"DELETE FROM {TBL_NAME} WHERE name = ? AND day IN (SELECT unnest(?))",
+            [name, days.tolist()],
+        )
+        num = len(quantiles)
+        insert_columns(
+            con,
+            TBL_NAME,
+            {
+                "name": np.full(len(ts) * num, name),
+                "day": np.repeat(
+                    np.asarray(day, dtype="datetime64[D]").astype("datetime64[ms]"), num
+                ),
+                "ts": np.repeat(ts, num),
+                "quantile": np.tile(np.asarray(quantiles, dtype=np.float64), len(ts)),
+                "value": vals.astype(np.float64).ravel(),
+            },
+        )
+
+    @staticmethod
+    def days(con: DuckDBPyConnection, name: str) -> set[date]:
+        """Delivery days with cached forecasts."""
+
+        rows = con.execute(
+            f"SELECT DISTINCT day FROM {TBL_NAME} WHERE name = ?", [name]
+        ).fetchnumpy()
+        return set(rows["day"].astype("datetime64[D]").tolist())
+
+    @staticmethod
+    def delete(con: DuckDBPyConnection, name: str):
+        con.execute(f"DELETE FROM {TBL_NAME} WHERE name = ?", [name])
+
+
+class BacktestScore:
+    """Forecast errors of a backtest per (local) hour of day"""
+
+    def __init__(
+        self,
+        name: str,
+        count: np.ndarray,
+        mae: np.ndarray,
+        rmse: np.ndarray,
+        pinball: np.ndarray,
+    ):
+        assert len(count) == len(mae) == len(rmse) == len(pinball) == 24, (
+            "Scores must have one value per hour of day"
+        )
+
+        self.name = name
+        self.count = count
+        self.mae = mae
+        self.rmse = rmse
+        self.pinball = pinball
+
+    def __repr__(self):
+        return (
+            f"BacktestScore '{self.name}': MAE {self.total_mae:.2f}, "
+            + f"RMSE {self.total_rmse:.2f}, pinball {self.total_pinball:.2f} "
+            + f"({self.count.sum()} hours)"
+        )
+
+    def _mean(self, vals: np.ndarray) -> float:
+        num = self.count.sum()
+        total = (np.where(self.count > 0, vals, 0) * self.count).sum()
+        return float(total / num) if num > 0 else np.nan
+
+    @property
+    def total_mae(self) -> float:
+        return self._mean(self.mae)
+
+    @property
+    def total_rmse(self) -> float:
+        return float(np.sqrt(self._mean(self.rmse**2)))
+
+    @property
+    def total_pinball(self) -> float:
+        return self._mean(self.pinball)
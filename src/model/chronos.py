@@ -0,0 +1,135 @@
+import time
+from typing import Any, Protocol
+
+import numpy as np
+
+from src.model.features import FeatureMatrix
+
+
+class QuantilePipeline(Protocol):
+    """The part of `Chronos2Pipeline` used for forecasting"""
+
+    def predict_quantiles(
+        self,
+        inputs: list[dict],
+        prediction_length: int,
+        quantile_levels: list[float],
+        batch_size: int,
+    ) -> tuple[list[Any], list[Any]]: ...
+
+
+class ChronosForecaster:
+    """Batched rolling day-ahead forecasts with a Chronos-2 pipeline.
+
+    Every forecast has its own context: the `context_hours` of the target and the
+    covariates before its start, plus the covariates of the forecast hours (which must
+    be known in advance, e.g. weather forecasts and lagged market data). Contexts are
+    views into the feature matrix and are passed to the pipeline in batches of
+    `batch_size`, without creating a DataFrame per forecast.
+    """
+
+    def __init__(
+        self,
+        pipeline: QuantilePipeline,
+        target: str,
+        covariates: list[str],
+        context_hours=28 * 24,
+        horizon=24,
+        quantiles=(0.1, 0.5, 0.9),
+        batch_size=64,
+        threads: int | None = None,
+    ):
+        assert context_hours > 0, "Context must be > 0 hours"
+        assert horizon > 0, "Horizon must be > 0"
+        assert batch_size > 0, "Batch size must be > 0"
+        assert target not in covariates, "Target must not be a covariate"
+
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+
+        self.pipeline = pipeline
+        self.target = target
+        self.covariates = covariates
+        self.context_hours = context_hours
+        self.horizon = horizon
+        self.quantiles = list(quantiles)
+        self.batch_size = batch_size
+        # Forecasts per second of the last `predict` call
+        self.throughput = 0.0
+
+    def __repr__(self):
+        return (
+            f"ChronosForecaster: {self.target} with {len(self.covariates)} covariates "
+            + f"({self.context_hours}h → {self.horizon}h, batches of {self.batch_size})"
+        )
+
+    def contexts(self, fm: FeatureMatrix, starts: np.ndarray, horizon: int):
+        """Pipeline inputs of forecasts for the `horizon` rows from each start row on."""
+
+        y = fm.col(self.target)
+        cov = {k: fm.col(k) for k in self.covariates}
+        for s in starts.tolist():
+            lo = max(0, s - self.context_hours)
+            yield {
+                "target": y[lo:s],
+                "past_covariates": {k: v[lo:s] for k, v in cov.items()},
+                "future_covariates": {k: v[s : s + horizon] for k, v in cov.items()},
+            }
+
+    def predict(
+        self, fm: FeatureMatrix, starts: np.ndarray, horizon: int | None = None
+    ) -> np.ndarray:
+        """Forecasts (forecasts × horizon × quantiles) starting at the given rows."""
+
+        horizon = horizon or self.horizon
+        starts = np.asarray(starts, dtype=np.int64)
+        assert (starts > 0).all(), "Forecasts require a context"
+        assert (starts + horizon <= len(fm)).all(), "Covariates must cover the horizon"
+
+        t0 = time.perf_counter()
+        out = np.empty((len(starts), horizon, len(self.quantiles)), dtype=np.float32)
+        inputs = self.contexts(fm, starts, horizon)
+        for i in range(0, len(starts), self.batch_size):
+            batch = [next(inputs) for _ in range(min(self.batch_size, len(starts) - i))]
+            quantiles, _ = self.pipeline.predict_quantiles(
+                batch,
+                prediction_length=horizon,
+                quantile_levels=self.quantiles,
+                batch_size=self.batch_size,
+            )
+            for j, q in enumerate(quantiles):
+                # Forecast of the first (and only) target variate
+                out[i + j] = np.asarray(q)[0]
+
+        self.throughput = len(starts) / max(time.perf_counter() - t0, 1e-9)
+        return out
+
+    def predict_days(self, fm: FeatureMatrix, hour=0) -> tuple[np.ndarray, np.ndarray]:
+        """Forecasts for every day of a feature matrix, starting at the given UTC hour.
+
+        Returns the start time and forecast (days × horizon × quantiles) of each day.
+        """
+
+        ts = fm.ts.astype("datetime64[h]").astype(np.int64)
+        starts = np.nonzero(ts % 24 == hour)[0]
+        starts = starts[(starts > 0) & (starts + self.horizon <= len(fm))]
+        return fm.ts[starts], self.predict(fm, starts)
+
+    def __call__(self, history: FeatureMatrix, hours: np.ndarray) -> np.ndarray:
+        """Forecast of the last hours of a backtest history (see `src.util.backtest`)."""
+
+        start = len(history) - len(hours)
+        return self.predict(history, np.array([start]), len(hours))[0]
+
+    @staticmethod
+    def from_pretrained(
+        target: str, covariates: list[str], model="amazon/chronos-2", **kwargs
+    ) -> "ChronosForecaster":
+        """Forecaster with a pretrained Chronos-2 model (downloaded on first use), on the CPU."""
+
+        from chronos import Chronos2Pipeline
+
+        pipeline = Chronos2Pipeline.from_pretrained(model, device_map="cpu")
+        return ChronosForecaster(pipeline, target, covariates, **kwargs)
@@ -0,0 +1,102 @@
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from src.util.windows import num_windows
+
+Batch = tuple[torch.Tensor, torch.Tensor]
+
+
+def as_tensor(x: np.ndarray | torch.Tensor) -> torch.Tensor:
+    """Contiguous tensor sharing the memory of `x` where possible."""
+
+    return (x if isinstance(x, torch.Tensor) else torch.from_numpy(x)).contiguous()
+
+
+class WindowDataset(Dataset[Batch]):
+    """Sliding (lookback, horizon) windows over an hourly feature matrix, for sequence models.
+
+    The matrix is held once (e.g. memory-mapped, see `fromfile`) and windows are strided
+    views into it (see `sliding_windows`, also for `target` and `offset`). Batches are
+    gathered with a single copy.
+    """
+
+    def __init__(
+        self,
+        x: np.ndarray | torch.Tensor,
+        target: int | np.ndarray | torch.Tensor,
+        lookback=24,
+        horizon=24,
+        stride=24,
+        offset=0,
+    ):
+        data = as_tensor(x)
+        assert data.ndim == 2, "Matrix must be rows × features"
+        if isinstance(target, int):
+            assert 0 <= target < data.shape[1], "Target must be a feature column"
+            y = data[:, target]
+        else:
+            y = as_tensor(target)
+            assert y.shape == (len(data),), "Targets must have one value per row"
+
+        self.x = data
+        self.y = y
+        self.lookback = lookback
+        self.horizon = horizon
+        self.stride = stride
+        self.offset = offset
+
+        num = num_windows(len(data), lookback, horizon, stride, offset)
+        row, col = data.stride()
+        self.inputs = data.as_strided(
+            (num, lookback, data.shape[1]), (stride * row, row, col)
+        )
+        step = y.stride(0)
+        self.targets = y[lookback + offset :].as_strided(
+            (num, horizon), (stride * step, step)
+        )
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def __repr__(self):
+        return (
+            f"WindowDataset: {len(self)} windows ({self.lookback}h → {self.horizon}h, "
+            + f"every {self.stride}h) over {len(self.x)} rows"
+        )
+
+    def __getitem__(self, idx: int) -> Batch:
+        return self.inputs[idx], self.targets[idx]
+
+    def __getitems__(self, indices: list[int]) -> Batch:
+        """Gather a batch of windows (batch × lookback × features, batch × horizon)."""
+
+        idx = torch.as_tensor(indices, dtype=torch.long)
+        return self.inputs[idx], self.targets[idx]
+
+    @staticmethod
+    def collate(batch: Batch) -> Batch:
+        """Collate function for batches from `__getitems__`, which are already stacked."""
+
+        return batch
+
+    def loader(self, batch_size=8, shuffle=False, **kwargs) -> DataLoader[Batch]:
+        """Data loader that fetches each batch of windows at once."""
+
+        return DataLoader(
+            self,
+            batch_size=batch_size,
+            shuffle=shuffle,
+            collate_fn=WindowDataset.collate,
+            **kwargs,
+        )
+
+    @staticmethod
+    def fromfile(path: str, target: int, lookback=24, horizon=24, stride=24, offset=0):
+        """Create a dataset from a matrix saved with `np.save`, memory-mapped instead of loaded.
+
+        Pages are only read when windows are accessed and are shared between processes.
+        """
+
+        x = np.load(path, mmap_mode="c")
+        return WindowDataset(x, target, lookback, horizon, stride, offset)
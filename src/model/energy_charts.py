@@ -1,9 +1,12 @@
-import calendar
-import time
-from typing import NotRequired, TypedDict
+from typing import TYPE_CHECKING, NotRequired, TypedDict
 
-from duckdb import DuckDBPyConnection
-from duckdb.typing import DuckDBPyType
+import numpy as np
+
+from src.util.db import insert_columns
+from src.util.tz import to_local_wall_ms
+
+if TYPE_CHECKING:
+    from duckdb import DuckDBPyConnection
 
 
 class ApiI18nName(TypedDict):
@@ -48,7 +51,9 @@ class EpexMarketDataPoint:
         )
 
     @staticmethod
-    def init_table(con: DuckDBPyConnection):
+    def init_table(con: "DuckDBPyConnection"):
+        from duckdb.typing import DuckDBPyType
+
         col_str = ", ".join(
             [
                 f"{k} {DuckDBPyType(v)}"
@@ -64,22 +69,152 @@ class EpexMarketDataPoint:
         con.execute(stmt)
 
     @staticmethod
-    def upsert_many(data: list["EpexMarketDataPoint"], con: DuckDBPyConnection):
-        val_str = (
-            "("
-            + "), (".join(
-                [
-                    f"make_timestamp_ms({round(calendar.timegm(time.localtime(d.ts / 1e3)) * 1e3)}), "
-                    + ", ".join(
-                        [f"{getattr(d, k)}" for k in EpexMarketData.__annotations__]
-                    ).replace("None", "NULL")
-                    for d in data
-                ]
-            )
-            + ")"
+    def upsert_many(
+        data: "list[EpexMarketDataPoint] | EpexMarketFrame", con: "DuckDBPyConnection"
+    ):
+        frame = (
+            data
+            if isinstance(data, EpexMarketFrame)
+            else EpexMarketFrame.frompoints(data)
+        )
+        if len(frame) == 0:
+            return
+        cols: dict[str, np.ndarray] = {
+            "ts": to_local_wall_ms(frame.ts).astype("datetime64[ms]"),
+            **frame.vals,
+        }
+        insert_columns(con, "epex_market", cols)
+
+    @staticmethod
+    def delete_week(con: "DuckDBPyConnection", year: int, week: int):
+        """Delete the market data of an ISO week (in local wall-clock time)."""
+
+        con.execute(
+            "DELETE FROM epex_market WHERE isoyear(ts) = ? AND week(ts) = ?",
+            [year, week],
         )
+
+    @staticmethod
+    def complete_weeks(
+        con: "DuckDBPyConnection", min_hours=167
+    ) -> set[tuple[int, int]]:
+        """ISO (year, week) pairs with at least `min_hours` distinct hours in the table.
+
+        Timestamps are stored as local wall-clock time, so a week has 167 distinct hours
+        when the clocks spring forward and 168 otherwise.
+        """
+
         stmt = f"""
-        INSERT OR IGNORE INTO epex_market VALUES
-        {val_str};
+            SELECT isoyear(ts) AS year, week(ts) AS week
+            FROM epex_market
+            GROUP BY ALL
+            HAVING count(DISTINCT date_trunc('hour', ts)) >= {min_hours}
         """
-        con.execute(stmt)
+        return {(year, week) for year, week in con.sql(stmt).fetchall()}
+
+
+class EpexMarketFrame:
+    """Columnar EPEX spot market data, with one array per market data column"""
+
+    def __init__(self, ts: np.ndarray, vals: dict[str, np.ndarray]):
+        assert set(vals) == set(EpexMarketData.__annotations__), (
+            "Values must contain all market data columns"
+        )
+        for v in vals.values():
+            assert len(v) == len(ts), "Timestamps and values have different lengths"
+        assert np.all(ts > 0), "Timestamps must be > 0"
+
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.vals = {
+            k: np.asarray(vals[k], dtype=np.float64)
+            for k in EpexMarketData.__annotations__
+        }
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __repr__(self):
+        return f"EpexMarketFrame: {len(self)} data points"
+
+    def topoints(self) -> list[EpexMarketDataPoint]:
+        """Convert the frame into a list of data points (missing values become None)."""
+
+        cols = {
+            k: [None if np.isnan(x) else x for x in v.tolist()]
+            for k, v in self.vals.items()
+        }
+        return [
+            EpexMarketDataPoint(
+                t, EpexMarketData(**{k: v[idx] for k, v in cols.items()})
+            )
+            for idx, t in enumerate(self.ts.tolist())
+        ]
+
+    @staticmethod
+    def frompoints(data: list[EpexMarketDataPoint]) -> "EpexMarketFrame":
+        """Create a frame from a list of data points (None values become NaN)."""
+
+        return EpexMarketFrame(
+            np.array([d.ts for d in data], dtype=np.int64),
+            {
+                k: np.array([getattr(d, k) for d in data], dtype=np.float64)
+                for k in EpexMarketData.__annotations__
+            },
+        )
+
+    @staticmethod
+    def fromjson(data: list[ApiMarketData]) -> "EpexMarketFrame":
+        """Create a frame from a weekly energy-charts.info API response."""
+
+        class TimeSeriesRef(TypedDict):
+            q: str
+            d: NotRequired[list[float]]
+
+        time_series: dict[str, TimeSeriesRef] = {
+            "phc": {"q": "pumped storage"},
+            "xbt": {"q": "Cross border"},
+            "nrp": {"q": "Non-Renewable"},
+            "rp": {"q": "Renewable"},
+            "l": {"q": "Load"},
+            "dap": {"q": "Day Ahead"},
+            "ida": {"q": "Intraday Continuous Average"},
+            "idl": {"q": "Intraday Continuous Low"},
+            "idh": {"q": "Intraday Continuous High"},
+        }
+        times: list[int] = []
+
+        for d in data:
+            if "xAxisValues" in d:
+                times = d["xAxisValues"]
+            name = (
+                d["name"][0]["en"] if isinstance(d["name"], list) else d["name"]["en"]
+            )
+            for key in time_series:
+                if time_series[key]["q"] in name:
+                    time_series[key]["d"] = d["data"]
+
+        assert len(times) > 0, "Data is missing time axis"
+        for k in time_series:
+            assert len(time_series[k]["d"]) == len(times), (
+                "Y and X values have different dimensions"
+            )
+
+        cols: dict[str, str] = {
+            "pumped_hydro_cons_kw": "phc",
+            "x_border_trading_kw": "xbt",
+            "non_ren_prod_kw": "nrp",
+            "ren_prod_kw": "rp",
+            "load_kw": "l",
+            "daa_price_eurmwh": "dap",
+            "idc_av_price_eurmwh": "ida",
+            "idc_low_price_eurmwh": "idl",
+            "idc_high_price_eurmwh": "idh",
+        }
+
+        return EpexMarketFrame(
+            np.array(times, dtype=np.int64),
+            {
+                k: np.array(time_series[ref]["d"], dtype=np.float64)
+                for k, ref in cols.items()
+            },
+        )
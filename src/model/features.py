@@ -0,0 +1,194 @@
+from datetime import datetime
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+from src.model.energy_charts import EpexMarketData
+from src.model.open_meteo import OpenMeteoForecastData
+from src.util.db import insert_columns
+
+# Bump whenever columns or their derivation change, the table is then rebuilt
+FEATURES_VERSION = 1
+TBL_NAME = "features_hourly"
+# Market data of the same hour is only known after the fact, so models see it a day later
+LAG_HOURS = 24
+
+WEATHER_KEYS = list(OpenMeteoForecastData.__annotations__)
+MARKET_KEYS = list(EpexMarketData.__annotations__)
+LAGGED_KEYS = [f"{k}_lag{LAG_HOURS}h" for k in MARKET_KEYS]
+FEATURE_KEYS = [*WEATHER_KEYS, *MARKET_KEYS, *LAGGED_KEYS]
+
+
+class FeatureMatrix:
+    """Hourly features as one (hours × features) matrix, with their normalization stats"""
+
+    def __init__(
+        self,
+        ts: np.ndarray,
+        x: np.ndarray,
+        keys: list[str],
+        mean: np.ndarray,
+        std: np.ndarray,
+    ):
+        assert x.shape == (len(ts), len(keys)), "Matrix must be hours × features"
+        assert len(mean) == len(std) == len(keys), "Stats must match the features"
+
+        self.ts = np.asarray(ts, dtype="datetime64[ms]")
+        self.x = x
+        self.keys = keys
+        self.mean = np.asarray(mean, dtype=x.dtype)
+        self.std = np.asarray(std, dtype=x.dtype)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __repr__(self):
+        return f"FeatureMatrix: {len(self)} hours × {len(self.keys)} features"
+
+    def col(self, key: str) -> np.ndarray:
+        """Values of a single feature."""
+
+        return self.x[:, self.keys.index(key)]
+
+    def normalized(self) -> "FeatureMatrix":
+        """Copy with every feature scaled to zero mean and unit variance."""
+
+        std = np.where(self.std > 0, self.std, 1)
+        return FeatureMatrix(
+            self.ts, (self.x - self.mean) / std, self.keys, self.mean, self.std
+        )
+
+    def denormalize(self, vals: np.ndarray, key: str) -> np.ndarray:
+        """Scale normalized values of a feature (e.g. predicted prices) back."""
+
+        idx = self.keys.index(key)
+        return vals * self.std[idx] + self.mean[idx]
+
+
+class FeaturesHourly:
+    """Materialized hourly training features: weather and lagged market data on a UTC grid"""
+
+    @staticmethod
+    def init_table(con: DuckDBPyConnection):
+        col_str = ", ".join([f"{k} DOUBLE" for k in FEATURE_KEYS])
+        con.execute(f"""
+        CREATE OR REPLACE TABLE {TBL_NAME} (
+            ts TIMESTAMP_MS PRIMARY KEY,
+            {col_str}
+        );
+        CREATE OR REPLACE TABLE {TBL_NAME}_stats (
+            key VARCHAR PRIMARY KEY,
+            mean DOUBLE,
+            std DOUBLE,
+            min DOUBLE,
+            max DOUBLE
+        );
+        CREATE OR REPLACE TABLE {TBL_NAME}_meta AS
+            SELECT {FEATURES_VERSION} AS version, NULL::TIMESTAMP AS updated_at;
+        """)
+
+    @staticmethod
+    def version(con: DuckDBPyConnection) -> int | None:
+        """Version of the stored features, if any."""
+
+        [(num,)] = con.execute(
+            "SELECT count(*) FROM duckdb_tables() WHERE table_name = ?",
+            [f"{TBL_NAME}_meta"],
+        ).fetchall()
+        if num == 0:
+            return None
+        [(version,)] = con.sql(f"SELECT version FROM {TBL_NAME}_meta").fetchall()
+        return version
+
+    @staticmethod
+    def is_current(con: DuckDBPyConnection) -> bool:
+        """Whether the stored features were built by the current `FEATURES_VERSION`."""
+
+        return FeaturesHourly.version(con) == FEATURES_VERSION
+
+    @staticmethod
+    def last_ts(con: DuckDBPyConnection) -> datetime | None:
+        [(ts,)] = con.sql(f"SELECT max(ts) FROM {TBL_NAME}").fetchall()
+        return ts
+
+    @staticmethod
+    def upsert_many(
+        ts: np.ndarray, vals: dict[str, np.ndarray], con: DuckDBPyConnection
+    ):
+        assert set(vals) == set(FEATURE_KEYS), "Values must contain all feature columns"
+        if len(ts) == 0:
+            return
+        insert_columns(
+            con,
+            TBL_NAME,
+            {"ts": np.asarray(ts, dtype="datetime64[ms]"), **vals},
+        )
+
+    @staticmethod
+    def update_stats(con: DuckDBPyConnection):
+        """Recompute the normalization stats of every feature over all stored hours."""
+
+        aggs = ", ".join(
+            [f"avg({k}), stddev_samp({k}), min({k}), max({k})" for k in FEATURE_KEYS]
+        )
+        [row] = con.sql(f"SELECT {aggs} FROM {TBL_NAME}").fetchall()
+        stats = np.array(row, dtype=np.float64).reshape(len(FEATURE_KEYS), 4)
+
+        con.execute(f"DELETE FROM {TBL_NAME}_stats")
+        insert_columns(
+            con,
+            f"{TBL_NAME}_stats",
+            {
+                "key": np.array(FEATURE_KEYS),
+                "mean": stats[:, 0],
+                "std": stats[:, 1],
+                "min": stats[:, 2],
+                "max": stats[:, 3],
+            },
+        )
+        con.execute(f"UPDATE {TBL_NAME}_meta SET updated_at = now()::TIMESTAMP")
+
+    @staticmethod
+    def load(
+        con: DuckDBPyConnection,
+        keys: list[str] | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        dtype=np.float32,
+        fill_nan=True,
+    ) -> FeatureMatrix:
+        """Load features for start <= ts < end as a matrix.
+
+        Missing values are replaced by the feature's mean, unless `fill_nan` is False.
+        """
+
+        keys = keys or FEATURE_KEYS
+        for k in keys:
+            assert k in FEATURE_KEYS, f"Unknown feature '{k}'"
+
+        conds = ["true"]
+        if start:
+            conds.append(f"ts >= '{start.isoformat()}'")
+        if end:
+            conds.append(f"ts < '{end.isoformat()}'")
+        cols = con.sql(f"""
+            SELECT ts, {", ".join(keys)}
+            FROM {TBL_NAME}
+            WHERE {" AND ".join(conds)}
+            ORDER BY ts
+        """).fetchnumpy()
+
+        stats = dict(
+            con.sql(f"SELECT key, [mean, std] FROM {TBL_NAME}_stats").fetchall()
+        )
+        mean, std = np.array(
+            [stats.get(k, [None, None]) for k in keys], dtype=np.float64
+        ).T.reshape(2, len(keys))
+
+        x = np.empty((len(cols["ts"]), len(keys)), dtype=dtype)
+        for idx, k in enumerate(keys):
+            x[:, idx] = np.ma.filled(cols[k].astype(np.float64), np.nan)
+        if fill_nan:
+            np.copyto(x, mean.astype(dtype), where=np.isnan(x))
+
+        return FeatureMatrix(cols["ts"], x, keys, mean, std)
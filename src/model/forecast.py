@@ -1,14 +1,80 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.model.open_meteo import SOLAR_KEYS, WIND_KEYS
+from src.util.db import insert_columns
+
+if TYPE_CHECKING:
+    from duckdb import DuckDBPyConnection
+
+
 class Location:
-    def __init__(self, name: str, lat: float, lon: float, weight=1.0):
+    def __init__(
+        self,
+        name: str,
+        lat: float,
+        lon: float,
+        weight=1.0,
+        sol_weight: float | None = None,
+        wnd_weight: float | None = None,
+    ):
         assert len(name) > 0, "Name must not be empty"
         assert lat >= -90 and lat <= 90, "Latitude must be within [-90, 90]"
         assert lon >= -180 and lon <= 180, "Longitude must be within [-180, 180]"
         assert weight > 0, "Weight must be > 0"
+        assert sol_weight is None or sol_weight >= 0, "Solar weight must be >= 0"
+        assert wnd_weight is None or wnd_weight >= 0, "Wind weight must be >= 0"
 
         self.name = name
         self.lat = lat
         self.lon = lon
         self.weight = weight
+        self.sol_weight = weight if sol_weight is None else sol_weight
+        self.wnd_weight = weight if wnd_weight is None else wnd_weight
 
     def __repr__(self):
         return f"ForecastLocation '{self.name}' ({self.lat:.6f}, {self.lon:.6f}) W: {self.weight:.2f}"
+
+    def weight_for(self, key: str) -> float:
+        """Weight of a forecast data column (solar and wind columns have their own weights)."""
+
+        return getattr(self, Location.weight_key(key))
+
+    @staticmethod
+    def weight_key(key: str) -> str:
+        """Name of the weight attribute (and DB column) for a forecast data column."""
+
+        if key in SOLAR_KEYS:
+            return "sol_weight"
+        if key in WIND_KEYS:
+            return "wnd_weight"
+        return "weight"
+
+    @staticmethod
+    def init_table(con: "DuckDBPyConnection", tbl_name="forecast_locations"):
+        stmt = f"""
+        CREATE OR REPLACE TABLE {tbl_name} (
+            name VARCHAR PRIMARY KEY,
+            lat DOUBLE,
+            lon DOUBLE,
+            weight DOUBLE,
+            sol_weight DOUBLE,
+            wnd_weight DOUBLE
+        );
+        """
+        con.execute(stmt)
+
+    @staticmethod
+    def upsert_many(
+        locs: list["Location"], con: "DuckDBPyConnection", tbl_name="forecast_locations"
+    ):
+        cols: dict[str, np.ndarray] = {
+            "name": np.array([loc.name for loc in locs], dtype=object),
+            "lat": np.array([loc.lat for loc in locs], dtype=np.float64),
+            "lon": np.array([loc.lon for loc in locs], dtype=np.float64),
+            "weight": np.array([loc.weight for loc in locs], dtype=np.float64),
+            "sol_weight": np.array([loc.sol_weight for loc in locs], dtype=np.float64),
+            "wnd_weight": np.array([loc.wnd_weight for loc in locs], dtype=np.float64),
+        }
+        insert_columns(con, tbl_name, cols)
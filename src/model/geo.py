@@ -1,4 +1,6 @@
-from typing import TypedDict
+from typing import NamedTuple, TypedDict
+
+LatLon = NamedTuple("LatLon", [("lat", float), ("lon", float)])
 
 
 class GeoStateInfo(TypedDict):
@@ -45,6 +47,24 @@ class BBox:
             (self.max_lon - self.min_lon) / 0.36 * (self.max_lat - self.min_lat) / 0.18
         )
 
+    def tile(self, rows: int, cols: int) -> list["BBox"]:
+        """Split the bounding box into rows × cols equally sized cells (row by row, from the southwest)."""
+
+        assert rows > 0 and cols > 0, "Number of rows and columns must be > 0"
+
+        lat_step = (self.max_lat - self.min_lat) / rows
+        lon_step = (self.max_lon - self.min_lon) / cols
+        return [
+            BBox(
+                self.min_lat + r * lat_step,
+                self.min_lon + c * lon_step,
+                self.min_lat + (r + 1) * lat_step if r < rows - 1 else self.max_lat,
+                self.min_lon + (c + 1) * lon_step if c < cols - 1 else self.max_lon,
+            )
+            for r in range(rows)
+            for c in range(cols)
+        ]
+
     @staticmethod
     def fromjson(data: GeoStateInfo):
         """Create a bounding box from GeoJSON data (has to contain { "minLat": ...} values')."""
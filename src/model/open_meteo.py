@@ -1,11 +1,12 @@
-import calendar
-import time
 from datetime import datetime
-from typing import TypedDict
+from typing import TYPE_CHECKING, TypedDict
 
-from dateutil.parser import parse
-from duckdb import DuckDBPyConnection
-from duckdb.typing import DuckDBPyType
+import numpy as np
+
+from src.util.db import insert_columns
+
+if TYPE_CHECKING:
+    from duckdb import DuckDBPyConnection, DuckDBPyRelation
 
 
 class ApiForecastValues(TypedDict):
@@ -81,6 +82,22 @@ ZERO_FC_DATA = OpenMeteoForecastData(
     precipitation_mm=0,
 )
 
+# Forecast data column -> OpenMeteo API key (e.g. "visibility_m" -> "visibility")
+API_KEYS: dict[str, str] = {
+    k: "_".join(k.split("_")[:-1]) for k in OpenMeteoForecastData.__annotations__
+}
+
+# Forecast data columns driven by solar and wind power (weighted by their capacity)
+SOLAR_KEYS = [
+    "shortwave_radiation_wm2",
+    "direct_radiation_wm2",
+    "diffuse_radiation_wm2",
+    "direct_normal_irradiance_wm2",
+    "global_tilted_irradiance_wm2",
+    "terrestrial_radiation_wm2",
+]
+WIND_KEYS = ["wind_speed_10m_kmh", "wind_speed_80m_kmh", "wind_speed_120m_kmh"]
+
 
 class OpenMeteoForecastDataPoint:
     """Weather forecast data point (e.g. hourly) from the OpenMeteo API"""
@@ -110,7 +127,9 @@ class OpenMeteoForecastDataPoint:
         )
 
     @staticmethod
-    def init_table(con: DuckDBPyConnection, tbl_name="open_meteo_hourly"):
+    def init_table(con: "DuckDBPyConnection", tbl_name="open_meteo_hourly"):
+        from duckdb.typing import DuckDBPyType
+
         col_str = ", ".join(
             [
                 f"{k} {DuckDBPyType(v)}"
@@ -131,50 +150,201 @@ class OpenMeteoForecastDataPoint:
 
     @staticmethod
     def upsert_many(
-        data: list["OpenMeteoForecastDataPoint"],
-        con: DuckDBPyConnection,
+        data: "list[OpenMeteoForecastDataPoint] | ForecastFrame",
+        con: "DuckDBPyConnection",
         tbl_name="open_meteo_hourly",
     ):
-        val_str = (
-            "("
-            + "), (".join(
-                [
-                    f"make_timestamp_ms({round(calendar.timegm(time.localtime(d.ts.timestamp())) * 1e3)}), "
-                    + f"{d.lat:.6f}, {d.lon:.6f}, {d.elev},"
-                    + ", ".join(
-                        [
-                            f"{getattr(d, k)}"
-                            for k in OpenMeteoForecastData.__annotations__
-                        ]
-                    ).replace("None", "NULL")
-                    for d in data
-                ]
-            )
-            + ")"
+        frame = (
+            data if isinstance(data, ForecastFrame) else ForecastFrame.frompoints(data)
         )
-        stmt = f"""
-        INSERT OR IGNORE INTO {tbl_name} VALUES
-        {val_str};
-        """
-        con.execute(stmt)
+        if len(frame) == 0:
+            return
+        insert_columns(con, tbl_name, frame.tocolumns())
 
     @staticmethod
     def fromjson(data: ApiForecastData) -> list["OpenMeteoForecastDataPoint"]:
-        data_points: list["OpenMeteoForecastDataPoint"] = []
-        lat = data["latitude"]
-        lon = data["longitude"]
-        elev = data["elevation"]
-        hourly = data["hourly"]
-        for idx, time_str in enumerate(hourly["time"]):
-            ts = parse(time_str)
-            vals: dict[str, float] = {}
-            for k in OpenMeteoForecastData.__annotations__:
-                attr = "_".join(k.split("_")[:-1])
-                vals[k] = hourly[attr][idx]
-            data_points.append(
-                OpenMeteoForecastDataPoint(
-                    ts, lat, lon, elev, OpenMeteoForecastData(**vals)
-                )
+        return ForecastFrame.fromjson(data).topoints()
+
+
+class ForecastFrame:
+    """Columnar weather forecast data for one or more locations (one array per column)"""
+
+    def __init__(
+        self,
+        ts: np.ndarray,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        elev: np.ndarray,
+        vals: dict[str, np.ndarray],
+    ):
+        assert set(vals) == set(OpenMeteoForecastData.__annotations__), (
+            "Values must contain all forecast data columns"
+        )
+        for arr in [lat, lon, elev, *vals.values()]:
+            assert len(arr) == len(ts), "Columns have different lengths"
+
+        self.ts = np.asarray(ts, dtype="datetime64[ms]")
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.elev = np.asarray(elev, dtype=np.float64)
+        self.vals = {
+            k: np.asarray(vals[k], dtype=np.float64)
+            for k in OpenMeteoForecastData.__annotations__
+        }
+
+        assert np.all((self.lat >= -90) & (self.lat <= 90)), (
+            "Latitude must be within [-90, 90]"
+        )
+        assert np.all((self.lon >= -180) & (self.lon <= 180)), (
+            "Longitude must be within [-180, 180]"
+        )
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __repr__(self):
+        return f"ForecastFrame: {len(self)} data points at {len(self.locations())} location(s)"
+
+    def locations(self) -> list[tuple[float, float]]:
+        """Distinct (lat, lon) pairs, in order of appearance."""
+
+        pairs = np.stack([self.lat, self.lon], axis=1)
+        _, idx = np.unique(pairs, axis=0, return_index=True)
+        return [(self.lat[i].item(), self.lon[i].item()) for i in sorted(idx)]
+
+    def take(self, idx: np.ndarray | slice) -> "ForecastFrame":
+        """Select rows by slice, index array or boolean mask."""
+
+        return ForecastFrame(
+            self.ts[idx],
+            self.lat[idx],
+            self.lon[idx],
+            self.elev[idx],
+            {k: v[idx] for k, v in self.vals.items()},
+        )
+
+    def between(self, start: datetime, end: datetime) -> "ForecastFrame":
+        """Select rows with start <= ts < end."""
+
+        ts_start = np.datetime64(start, "ms")
+        ts_end = np.datetime64(end, "ms")
+        return self.take((self.ts >= ts_start) & (self.ts < ts_end))
+
+    def near(self, lat: float, lon: float, tol=0.1) -> "ForecastFrame":
+        """Select rows within a lat/lon tolerance of a location."""
+
+        return self.take(
+            (np.abs(self.lat - lat) <= tol) & (np.abs(self.lon - lon) <= tol)
+        )
+
+    def with_location(self, lat: float, lon: float) -> "ForecastFrame":
+        """Copy of the frame with all rows moved to a location (e.g. the requested instead of the API's grid point)."""
+
+        return ForecastFrame(
+            self.ts,
+            np.full(len(self), lat),
+            np.full(len(self), lon),
+            self.elev,
+            self.vals,
+        )
+
+    def split(self) -> list["ForecastFrame"]:
+        """Split the frame into one frame per location."""
+
+        return [
+            self.take((self.lat == lat) & (self.lon == lon))
+            for lat, lon in self.locations()
+        ]
+
+    def tocolumns(self) -> dict[str, np.ndarray]:
+        """Columns as stored in the DB (lat/lon rounded to 6 digits)."""
+
+        return {
+            "ts": self.ts,
+            "lat": np.round(self.lat, 6),
+            "lon": np.round(self.lon, 6),
+            "elev_m": self.elev,
+            **self.vals,
+        }
+
+    def topoints(self) -> list[OpenMeteoForecastDataPoint]:
+        """Convert the frame into a list of data points (missing values become None)."""
+
+        cols = {
+            k: np.where(np.isnan(v), None, v).tolist() for k, v in self.vals.items()
+        }
+        lats = self.lat.tolist()
+        lons = self.lon.tolist()
+        elevs = self.elev.tolist()
+        return [
+            OpenMeteoForecastDataPoint(
+                ts,
+                lats[idx],
+                lons[idx],
+                elevs[idx],
+                OpenMeteoForecastData(**{k: v[idx] for k, v in cols.items()}),
             )
+            for idx, ts in enumerate(self.ts.tolist())
+        ]
+
+    @staticmethod
+    def frompoints(data: list[OpenMeteoForecastDataPoint]) -> "ForecastFrame":
+        """Create a frame from a list of data points (None values become NaN)."""
 
-        return data_points
+        return ForecastFrame(
+            np.array([d.ts for d in data], dtype="datetime64[ms]"),
+            np.array([d.lat for d in data], dtype=np.float64),
+            np.array([d.lon for d in data], dtype=np.float64),
+            np.array([d.elev for d in data], dtype=np.float64),
+            {
+                k: np.array([getattr(d, k) for d in data], dtype=np.float64)
+                for k in OpenMeteoForecastData.__annotations__
+            },
+        )
+
+    @staticmethod
+    def fromjson(data: ApiForecastData) -> "ForecastFrame":
+        """Create a frame from an OpenMeteo API response for a single location."""
+
+        hourly = data["hourly"]
+        num = len(hourly["time"])
+
+        return ForecastFrame(
+            np.array(hourly["time"], dtype="datetime64[ms]"),
+            np.full(num, data["latitude"], dtype=np.float64),
+            np.full(num, data["longitude"], dtype=np.float64),
+            np.full(num, data["elevation"], dtype=np.float64),
+            {k: np.array(hourly[a], dtype=np.float64) for k, a in API_KEYS.items()},
+        )
+
+    @staticmethod
+    def fromrelation(rel: "DuckDBPyRelation") -> "ForecastFrame":
+        """Create a frame from a DuckDB query on a forecast table (NULL values become NaN)."""
+
+        cols = rel.fetchnumpy()
+        return ForecastFrame(
+            cols["ts"],
+            cols["lat"],
+            cols["lon"],
+            np.ma.filled(cols["elev_m"].astype(np.float64), np.nan),
+            {
+                k: np.ma.filled(cols[k].astype(np.float64), np.nan)
+                for k in OpenMeteoForecastData.__annotations__
+            },
+        )
+
+    @staticmethod
+    def concat(frames: list["ForecastFrame"]) -> "ForecastFrame":
+        """Concatenate several frames into one."""
+
+        assert len(frames) > 0, "Concatenation requires at least 1 frame"
+        return ForecastFrame(
+            np.concatenate([f.ts for f in frames]),
+            np.concatenate([f.lat for f in frames]),
+            np.concatenate([f.lon for f in frames]),
+            np.concatenate([f.elev for f in frames]),
+            {
+                k: np.concatenate([f.vals[k] for f in frames])
+                for k in OpenMeteoForecastData.__annotations__
+            },
+        )
@@ -0,0 +1,236 @@
+import copy
+from typing import Literal
+
+import numpy as np
+import torch
+from torch import nn, optim
+from torch.utils.data import DataLoader
+
+from src.model.dataset import Batch, as_tensor
+from src.model.features import FeatureMatrix
+
+Backend = Literal["eager", "script", "compile"]
+
+
+class GRUModel(nn.Module):
+    """Gated recurrent unit model with one price output per input hour"""
+
+    def __init__(self, input_size: int, num_layers=2, hidden_size=128, dropout=0.2):
+        super().__init__()
+        self.gru = nn.GRU(input_size, hidden_size, num_layers, batch_first=True)
+        self.dropout = nn.Dropout(dropout)
+        self.fc = nn.Sequential(
+            nn.Linear(hidden_size, hidden_size // 2),
+            nn.Linear(hidden_size // 2, 8),
+            nn.Linear(8, 1),
+        )
+
+    def forward(self, x):
+        x, _ = self.gru(x)
+        x = self.dropout(x)
+        x = self.fc(x)
+        return x
+
+
+class LSTMModel(nn.Module):
+    """Long short-term memory model with one price output per input hour"""
+
+    def __init__(self, input_size: int, num_layers=2, hidden_size=128, dropout=0.2):
+        super().__init__()
+        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+        self.dropout = nn.Dropout(dropout)
+        self.fc = nn.Sequential(
+            nn.Linear(hidden_size, hidden_size // 2),
+            nn.Linear(hidden_size // 2, 8),
+            nn.Linear(8, 1),
+        )
+
+    def forward(self, x):
+        x, _ = self.lstm(x)
+        x = self.dropout(x)
+        x = self.fc(x)
+        return x
+
+
+MODELS: dict[str, type[GRUModel] | type[LSTMModel]] = {
+    "gru": GRUModel,
+    "lstm": LSTMModel,
+}
+
+
+def num_params(model: nn.Module) -> int:
+    return sum(p.numel() for p in model.parameters() if p.requires_grad)
+
+
+def model_config(model: GRUModel | LSTMModel) -> dict:
+    """Arguments to re-create a model (see `MODELS`)."""
+
+    rnn = model.gru if isinstance(model, GRUModel) else model.lstm
+    return {
+        "model": "gru" if isinstance(model, GRUModel) else "lstm",
+        "input_size": rnn.input_size,
+        "num_layers": rnn.num_layers,
+        "hidden_size": rnn.hidden_size,
+        "dropout": model.dropout.p,
+    }
+
+
+def train_epoch(
+    model: nn.Module,
+    loader: DataLoader[Batch],
+    optimizer: optim.Optimizer,
+    max_norm=1.0,
+) -> float:
+    """Train a model for one epoch and return the mean batch loss (MSE).
+
+    Only the outputs of each window's last hours are scored, one per target.
+    """
+
+    model.train()
+    total = 0.0
+    for X, y in loader:
+        optimizer.zero_grad()
+        loss = nn.functional.mse_loss(model(X)[:, -y.shape[1] :, 0], y)
+        loss.backward()
+        nn.utils.clip_grad_norm_(model.parameters(), max_norm=max_norm)
+        optimizer.step()
+        total += loss.item()
+    return total / max(len(loader), 1)
+
+
+def eval_loss(model: nn.Module, loader: DataLoader[Batch]) -> float:
+    """Mean batch loss (MSE) of a model, as scored by `train_epoch`."""
+
+    model.eval()
+    total = 0.0
+    with torch.inference_mode():
+        for X, y in loader:
+            total += nn.functional.mse_loss(model(X)[:, -y.shape[1] :, 0], y).item()
+    return total / max(len(loader), 1)
+
+
+class PricePredictor:
+    """Batched CPU inference of next-day prices with a trained GRU/LSTM model.
+
+    The model is run in inference mode, optionally compiled (`backend`: TorchScript or
+    `torch.compile`) and with its linear and recurrent layers quantized to int8
+    (`quantize`). Outputs are scaled back to prices with `price_mean` and `price_std`.
+    """
+
+    def __init__(
+        self,
+        model: GRUModel | LSTMModel,
+        horizon=24,
+        price_mean=0.0,
+        price_std=1.0,
+        backend: Backend = "eager",
+        quantize=False,
+        keys: list[str] | None = None,
+        lookback=24,
+    ):
+        assert horizon > 0, "Horizon must be > 0"
+        assert lookback >= horizon, "Lookback must be >= horizon"
+        assert price_std > 0, "Price std must be > 0"
+        assert backend in ("eager", "script", "compile"), "Unknown backend"
+
+        self.config = model_config(model)
+        self.horizon = horizon
+        self.price_mean = price_mean
+        self.price_std = price_std
+        self.backend: Backend = backend
+        self.quantized = quantize
+        # Input features of the model, which are read from a `FeatureMatrix`
+        self.keys = keys
+        self.lookback = lookback
+
+        # Keep the trained model untouched
+        self.model = copy.deepcopy(model).eval()
+        for p in self.model.parameters():
+            p.requires_grad_(False)
+        self.net: nn.Module = self.model
+        if quantize:
+            self.net = torch.ao.quantization.quantize_dynamic(
+                self.net, {nn.Linear, nn.GRU, nn.LSTM}, dtype=torch.qint8
+            )
+        if backend == "script":
+            self.net = torch.jit.freeze(torch.jit.script(self.net))
+        elif backend == "compile":
+            self.net = torch.compile(self.net, dynamic=True)
+
+    def __repr__(self):
+        c = self.config
+        opts = [self.backend] + (["int8"] if self.quantized else [])
+        return (
+            f"PricePredictor: {c['model']} {c['num_layers']}×{c['hidden_size']} "
+            + f"→ {self.horizon}h ({', '.join(opts)})"
+        )
+
+    def predict(
+        self, x: np.ndarray | torch.Tensor, horizon: int | None = None
+    ) -> np.ndarray:
+        """Prices (days × horizon) for a batch of input windows (days × lookback × features).
+
+        The forecast of each day is the output of its window's last `horizon` hours,
+        as scored in training (see `train_epoch`). A single window is also accepted.
+        """
+
+        horizon = horizon or self.horizon
+        X = as_tensor(x).to(torch.float32)
+        single = X.ndim == 2
+        X = X.unsqueeze(0) if single else X
+        assert X.ndim == 3, "Windows must be days × lookback × features"
+        assert X.shape[1] >= horizon, "Lookback must be >= horizon"
+        assert X.shape[2] == self.config["input_size"], "Feature count mismatch"
+
+        with torch.inference_mode():
+            out = self.net(X)[:, -horizon:, 0]
+        prices = out.numpy() * self.price_std + self.price_mean
+        return prices[0] if single else prices
+
+    def __call__(self, history: FeatureMatrix, hours: np.ndarray) -> np.ndarray:
+        """Forecast of the last hours of a history (see `src.util.backtest`).
+
+        The model's features are normalized with the stored stats and unknown values are
+        set to their mean.
+        """
+
+        assert self.keys is not None, "Predictor requires feature keys"
+        fm = history.normalized()
+        x = np.stack([fm.col(k) for k in self.keys], axis=1)
+        x = x[-max(self.lookback, len(hours)) :]
+        return self.predict(np.nan_to_num(x), len(hours))
+
+    def save(self, path: str):
+        """Save the model weights and settings (not the backend or quantization)."""
+
+        torch.save(
+            {
+                "config": self.config,
+                "state": self.model.state_dict(),
+                "horizon": self.horizon,
+                "price_mean": self.price_mean,
+                "price_std": self.price_std,
+                "keys": self.keys,
+                "lookback": self.lookback,
+            },
+            path,
+        )
+
+    @staticmethod
+    def fromfile(path: str, backend: Backend = "eager", quantize=False):
+        """Load a predictor saved with `save`."""
+
+        data = torch.load(path, weights_only=True)
+        config = dict(data["config"])
+        model = MODELS[config.pop("model")](**config)
+        model.load_state_dict(data["state"])
+        return PricePredictor(
+            model,
+            data["horizon"],
+            data["price_mean"],
+            data["price_std"],
+            backend,
+            quantize,
+            data["keys"],
+            data["lookback"],
+        )
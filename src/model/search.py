@@ -0,0 +1,126 @@
+import hashlib
+import json
+from typing import Literal, TypedDict
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+from src.util.db import insert_columns
+
+TrialStatus = Literal["trained", "stopped", "pruned"]
+
+
+class TrialParams(TypedDict):
+    model: str
+    num_layers: int
+    hidden_size: int
+    dropout: float
+    lr: float
+    lookback: int
+    seed: int
+
+
+def trial_id(params: TrialParams) -> str:
+    """Stable ID of a hyperparameter configuration."""
+
+    data = json.dumps(params, sort_keys=True).encode()
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+class TrialResult:
+    """Validation loss of a hyperparameter search trial after one rung of training"""
+
+    def __init__(
+        self,
+        search: str,
+        params: TrialParams,
+        rung: int,
+        epochs: int,
+        val_loss: float,
+        status: TrialStatus = "trained",
+    ):
+        assert rung >= 0, "Rung must be >= 0"
+        assert epochs >= 0, "Epochs must be >= 0"
+        assert status in ("trained", "stopped", "pruned"), "Unknown status"
+
+        self.search = search
+        self.trial = trial_id(params)
+        self.params = params
+        self.rung = rung
+        self.epochs = epochs
+        self.val_loss = val_loss
+        self.status: TrialStatus = status
+
+    def __repr__(self):
+        p = self.params
+        return (
+            f"TrialResult: {p['model']} {p['num_layers']}×{p['hidden_size']} "
+            + f"(lookback {p['lookback']}h, run {p['seed']}) {self.val_loss:.4f} "
+            + f"after {self.epochs} epochs [{self.status}]"
+        )
+
+    @staticmethod
+    def init_table(con: DuckDBPyConnection, tbl_name="hyperparam_trials"):
+        stmt = f"""
+        CREATE OR REPLACE TABLE {tbl_name} (
+            search VARCHAR,
+            trial VARCHAR,
+            params JSON,
+            rung INTEGER,
+            epochs INTEGER,
+            val_loss DOUBLE,
+            status VARCHAR,
+            updated_at TIMESTAMP DEFAULT now()::TIMESTAMP,
+            PRIMARY KEY (search, trial, rung)
+        );
+        """
+        con.execute(stmt)
+
+    @staticmethod
+    def upsert_many(
+        results: list["TrialResult"],
+        con: DuckDBPyConnection,
+        tbl_name="hyperparam_trials",
+    ):
+        if len(results) == 0:
+            return
+        keys = {(r.search, r.trial, r.rung) for r in results}
+        assert len(keys) == len(results), "Results must be unique"
+
+        con.executemany(
+            f"DELETE FROM {tbl_name} WHERE search = ? AND trial = ? AND rung = ?",
+            [list(k) for k in keys],
+        )
+        insert_columns(
+            con,
+            tbl_name,
+            {
+                "search": np.array([r.search for r in results]),
+                "trial": np.array([r.trial for r in results]),
+                "params": np.array([json.dumps(r.params) for r in results]),
+                "rung": np.array([r.rung for r in results], dtype=np.int32),
+                "epochs": np.array([r.epochs for r in results], dtype=np.int32),
+                "val_loss": np.array([r.val_loss for r in results], dtype=np.float64),
+                "status": np.array([r.status for r in results]),
+            },
+        )
+
+    @staticmethod
+    def fromdb(
+        con: DuckDBPyConnection, search: str, tbl_name="hyperparam_trials"
+    ) -> list["TrialResult"]:
+        """All results of a search, ordered by rung and validation loss."""
+
+        rows = con.execute(
+            f"""
+            SELECT params, rung, epochs, val_loss, status
+            FROM {tbl_name}
+            WHERE search = ?
+            ORDER BY rung, val_loss, trial
+            """,
+            [search],
+        ).fetchall()
+        return [
+            TrialResult(search, json.loads(params), rung, epochs, loss, status)
+            for params, rung, epochs, loss, status in rows
+        ]
@@ -1,27 +1,73 @@
+from datetime import datetime
+
 import src.util.log as log
-from src.model.open_meteo import OpenMeteoForecastData, OpenMeteoForecastDataPoint
+from src.model.open_meteo import ForecastFrame, OpenMeteoForecastDataPoint
 from src.util.db import get_db_connection
-from src.util.geo import get_german_states, merge_forecasts
+from src.util.geo import (
+    get_german_grid,
+    get_german_states,
+    merge_forecasts,
+    merge_forecasts_db,
+    weight_matrix,
+)
 
 TBL_NAME = "open_meteo_agg_hourly"
+GRID_SRC_TBL_NAME = "open_meteo_grid_hourly"
+GRID_TBL_NAME = "open_meteo_grid_agg_hourly"
+START_YEAR = 2022  # We have None values before 2022
+
 
+def aggregate_forecasts(
+    in_db=True,
+    incremental=False,
+    grid: tuple[int, int] | None = None,
+    split_weights=False,
+):
+    con = get_db_connection()
+    if grid:
+        cells = get_german_grid(*grid, split_weights)
+        log.msg(f"Aggregate forecasts for {len(cells)} grid cells")
+        log.info(
+            f"Merging forecasts into '{GRID_TBL_NAME}'",
+            " (incremental)" if incremental else "",
+        )
+        num_hours = merge_forecasts_db(
+            con,
+            cells,
+            datetime(START_YEAR, 1, 1),
+            incremental,
+            src_tbl=GRID_SRC_TBL_NAME,
+            dst_tbl=GRID_TBL_NAME,
+            tol=0,
+        )
+        log.success("Done", f" ({num_hours} hours)")
+        return
 
-def aggregate_forecasts():
-    states = get_german_states()
+    states = get_german_states(split_weights)
     log.msg(f"Aggregate forecasts for {len(states)} German states")
 
+    if in_db:
+        log.info(
+            f"Merging forecasts into '{TBL_NAME}'",
+            " (incremental)" if incremental else "",
+        )
+        num_hours = merge_forecasts_db(
+            con, states, datetime(START_YEAR, 1, 1), incremental, dst_tbl=TBL_NAME
+        )
+        log.success("Done", f" ({num_hours} hours)")
+        return
+
     log.info(f"Init DB table '{TBL_NAME}'")
-    con = get_db_connection()
     OpenMeteoForecastDataPoint.init_table(con, TBL_NAME)
 
     [(start, end)] = con.sql(
         "SELECT MIN(ts), MAX(ts) FROM open_meteo_hourly"
     ).fetchall()
-    start_year = max(2022, start.year)  # We have None values before 2022
+    start_year = max(START_YEAR, start.year)
     end_year = end.year
     for year in range(start_year, end_year + 1):
         log.info(f"Merging forecasts in {year}")
-        forecasts: list[list[OpenMeteoForecastDataPoint]] = []
+        forecasts: list[ForecastFrame] = []
         for state in states:
             stmt = f"""
                 SELECT *
@@ -31,17 +77,8 @@ def aggregate_forecasts():
                   AND lon >= {(state.lon - 0.1):6f} AND lon <= {(state.lon + 0.1):6f}
                 ORDER BY ts
             """
-            res = con.sql(stmt).fetchall()
-            points: list[OpenMeteoForecastDataPoint] = []
-            for row in res:
-                (ts, lat, lon, elev, *vals) = row
-                d = OpenMeteoForecastData(
-                    **dict(zip(OpenMeteoForecastData.__annotations__.keys(), vals))
-                )
-                dp = OpenMeteoForecastDataPoint(ts, lat, lon, elev, d)
-                points.append(dp)
-            forecasts.append(points)
-        merged = merge_forecasts(forecasts, [s.weight for s in states])
+            forecasts.append(ForecastFrame.fromrelation(con.sql(stmt)))
+        merged = merge_forecasts(forecasts, weight_matrix(states))
         OpenMeteoForecastDataPoint.upsert_many(merged, con, TBL_NAME)
 
     log.success("Done")
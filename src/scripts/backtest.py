@@ -0,0 +1,33 @@
+from datetime import date
+
+import src.util.log as log
+from src.util.backtest import Forecaster, backtest, score, seasonal_naive
+from src.util.db import get_db_connection
+
+
+def run_backtest(
+    name: str,
+    forecaster: Forecaster,
+    start: date,
+    end: date,
+    reset=False,
+    workers: int | None = None,
+):
+    log.msg(f"Backtest '{name}' from {start} to {end}")
+
+    con = get_db_connection()
+    num_days = backtest(con, name, forecaster, start, end, workers=workers, reset=reset)
+    log.info(f"Forecast {num_days} days", " (other days were cached)")
+
+    res = score(con, name, start=start, end=end)
+    for hour in range(24):
+        log.info(
+            f"{hour:02d}:00 MAE {res.mae[hour]:6.2f}",
+            f" RMSE {res.rmse[hour]:6.2f}, pinball {res.pinball[hour]:6.2f}"
+            + f" ({res.count[hour]} days)",
+        )
+    log.success(f"{res}")
+
+
+if __name__ == "__main__":
+    run_backtest("seasonal_naive", seasonal_naive, date(2024, 1, 1), date(2025, 1, 1))
@@ -0,0 +1,17 @@
+import src.util.log as log
+from src.model.features import FEATURES_VERSION, TBL_NAME, FeaturesHourly
+from src.util.db import get_db_connection
+from src.util.features import build_features as build_features_db
+
+
+def build_features(reset=False):
+    log.msg(f"Build training features (version {FEATURES_VERSION})")
+
+    con = get_db_connection()
+    log.info(f"Writing features into '{TBL_NAME}'", "" if reset else " (incremental)")
+    num_hours = build_features_db(con, incremental=not reset)
+    log.success("Done", f" ({num_hours} hours, up to {FeaturesHourly.last_ts(con)})")
+
+
+if __name__ == "__main__":
+    build_features()
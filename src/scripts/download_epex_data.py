@@ -1,31 +1,82 @@
-from datetime import datetime
+from datetime import date, datetime
 
 import src.util.log as log
-from src.api.energy_charts import get_weekly_market_data
-from src.model.energy_charts import EpexMarketDataPoint
+from src.api.energy_charts import get_weekly_market_frame, is_final, num_iso_weeks
+from src.model.energy_charts import EpexMarketDataPoint, EpexMarketFrame
 from src.util.db import get_db_connection
+from src.util.http import RateLimiter
+from src.util.pipeline import fetch_concurrently
 
+# Be nice to energy-charts.info, there is no documented rate limit
+MAX_REQ_PER_SEC = 5
 
-def download_data(reset=False, year=datetime.now().year):
-    log.msg("Download EPEX spot data")
+Week = tuple[int, int]
+
+
+def missing_weeks(from_year: int, to_year: int, complete: set[Week]) -> list[Week]:
+    """ISO (year, week) pairs between two years (inclusive) that aren't complete yet.
+
+    Only weeks that have already ended are considered. Weeks whose data isn't final yet
+    (see `is_final`) are fetched again, even if they are complete.
+    """
+
+    today = date.today()
+    curr_year, curr_week, _ = today.isocalendar()
+    weeks = [
+        (year, week)
+        for year in range(from_year, min(to_year, curr_year) + 1)
+        for week in range(1, num_iso_weeks(year) + 1)
+        if year < curr_year or week < curr_week
+    ]
+    return [w for w in weeks if w not in complete or not is_final(*w)]
+
+
+def backfill(
+    from_year=2015,
+    to_year=datetime.now().year,
+    workers=4,
+    limiter: RateLimiter | None = None,
+):
+    log.msg(f"Backfill EPEX spot data ({from_year} - {to_year})")
 
     con = get_db_connection()
-    if reset:
+    stmt = "SELECT count(*) FROM information_schema.tables WHERE table_name = 'epex_market'"
+    if con.sql(stmt).fetchall() == [(0,)]:
         EpexMarketDataPoint.init_table(con)
-    curr_year = datetime.now().year
-    curr_week = datetime.now().isocalendar().week
-    to_week = curr_week if year == curr_year else 53
-    weeks = range(1, to_week)
-    for week in weeks:
-        data = get_weekly_market_data(year, week)
-        EpexMarketDataPoint.upsert_many(data, con)
-        log.info(f"{year}-{week:02d}: {len(data)} data points", " ✓")
+
+    tasks = missing_weeks(from_year, to_year, EpexMarketDataPoint.complete_weeks(con))
+    log.info(f"Fetching {len(tasks)} missing weeks")
+
+    def fetch(task: Week) -> EpexMarketFrame:
+        return get_weekly_market_frame(*task)
+
+    def write(task: Week, data: EpexMarketFrame):
+        # One transaction per week, so an interrupted run resumes with the next week
+        con.begin()
+        try:
+            # Re-fetched weeks that weren't final yet replace the stored data
+            if len(data) > 0:
+                EpexMarketDataPoint.delete_week(con, *task)
+            EpexMarketDataPoint.upsert_many(data, con)
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        log.info(f"{task[0]}-{task[1]:02d}: {len(data)} data points", " ✓")
+
+    fetch_concurrently(
+        tasks, fetch, write, workers, limiter or RateLimiter(MAX_REQ_PER_SEC)
+    )
 
     log.success("Done")
 
 
+def download_data(reset=False, year=datetime.now().year, workers=4):
+    con = get_db_connection()
+    if reset:
+        EpexMarketDataPoint.init_table(con)
+    backfill(year, year, workers)
+
+
 if __name__ == "__main__":
-    for year in range(2015, 2025):
-        log.msg(f"--- YEAR: {year} ---")
-        download_data(year=year)
-        log.msg("")
+    backfill(2015, 2024)
@@ -1,56 +1,125 @@
-from calendar import monthrange
-from datetime import datetime
-
-from dateutil.parser import parse
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
 
 import src.util.log as log
-from src.api.open_meteo import get_historical_forecast
-from src.model.open_meteo import OpenMeteoForecastDataPoint
+from src.api.open_meteo import (
+    ForecastFrameReader,
+    iter_historical_forecast_frames,
+    request_cost,
+)
+from src.model.forecast import Location
+from src.model.geo import LatLon
+from src.model.open_meteo import ForecastFrame, OpenMeteoForecastDataPoint
+from src.util.coverage import CoverageIndex
 from src.util.db import get_db_connection
-from src.util.geo import get_german_states
+from src.util.geo import get_german_grid, get_german_states
+from src.util.http import QuotaExceededError, RateLimiter
+from src.util.pipeline import fetch_concurrently
+from src.util.plan import PlannedRequest, plan_requests
+
+# OpenMeteo free tier: 600 calls/min, 10k calls/day
+MAX_REQ_PER_SEC = 5
+MAX_CALLS_PER_DAY = 10000
+# Locations and days per request
+MAX_LOCS = 16
+MAX_DAYS = 92
+# Grid cells are stored with their own coordinates, in a separate table
+GRID_TBL_NAME = "open_meteo_grid_hourly"
+# Keeps the request URL below ~4k characters
+MAX_GRID_LOCS = 128
 
+Task = PlannedRequest[Location]
 
-def download_data(reset=False, year=datetime.now().year):
-    log.msg("Download OpenMeteo weather forecasts")
+
+def download_data(
+    reset=False,
+    year=datetime.now().year,
+    workers=4,
+    limiter: RateLimiter | None = None,
+    grid: tuple[int, int] | None = None,
+):
+    suffix = f" ({grid[0]}×{grid[1]} grid per state)" if grid else ""
+    log.msg(f"Download OpenMeteo weather forecasts{suffix}")
 
     con = get_db_connection()
+    tbl_name = GRID_TBL_NAME if grid else "open_meteo_hourly"
     if reset:
-        OpenMeteoForecastDataPoint.init_table(con)
+        OpenMeteoForecastDataPoint.init_table(con, tbl_name)
 
-    states = get_german_states()
+    states = get_german_grid(*grid) if grid else get_german_states()
 
     curr_year = datetime.now().year
     curr_month = datetime.now().month
-    to_month = curr_month if year == curr_year else 13
-    months = range(1, to_month)
-    for state in states:
-        for month in months:
-            num_days = monthrange(year, month)[1]
-            start = parse(f"{year}-{month}-01")
-            end = parse(f"{year}-{month}-{num_days}")
-            stmt = f"""
-                SELECT count(*)
-                FROM open_meteo_hourly
-                WHERE ts >= '{start.isoformat()[:10]}' AND ts <= '{end.isoformat()[:10]}'
-                  AND lat >= {(state.lat - 0.1):6f} AND lat <= {(state.lat + 0.1):6f}
-                  AND lon >= {(state.lon - 0.1):6f} AND lon <= {(state.lon + 0.1):6f}
-            """
-            res = con.sql(stmt).fetchall()
-            if res[0][0] >= (num_days - 1) * 24:
-                log.info(
-                    f"{year}-{month:02d}: up to date",
-                    " ✓",
-                    f" → [{state.name}]",
-                )
-                continue
-            data = get_historical_forecast(state.lat, state.lon, start, end)
-            OpenMeteoForecastDataPoint.upsert_many(data, con)
+    start = date(year, 1, 1)
+    # Only complete months: up to the end of last month in the current year
+    end = (
+        date(year, curr_month, 1) - timedelta(days=1)
+        if year == curr_year
+        else date(year, 12, 31)
+    )
+    if end < start:
+        log.info(f"{year}: no complete months yet")
+        log.success("Done")
+        return
+
+    index = CoverageIndex.build(con, states, start, end, tbl_name, 0 if grid else 0.1)
+    log.info(f"{index}")
+    missing = index.missing_ranges()
+    for state, num in zip(states, index.num_missing()):
+        if num == 0 and not grid:
+            log.info(f"{year}: up to date", " ✓", f" → [{state.name}]")
+
+    tasks = plan_requests(missing, MAX_GRID_LOCS if grid else MAX_LOCS, MAX_DAYS)
+    num_hours = index.num_missing().sum()
+    log.info(f"Fetching {num_hours} missing location hours with {len(tasks)} requests")
+
+    # Responses are downloaded in the worker threads, but decoded one location at a
+    # time while writing, so memory doesn't grow with the number of locations
+    def fetch(task: Task) -> ForecastFrameReader:
+        locs = [LatLon(state.lat, state.lon) for state in task.keys]
+        return iter_historical_forecast_frames(locs, task.start, task.end)
+
+    def write(task: Task, data: ForecastFrameReader):
+        # Closes the response file, also if not all frames are read
+        with data:
+            write_frames(task, data)
+
+    def write_frames(task: Task, data: Iterator[ForecastFrame]):
+        if grid:
+            # Nearby cells may share the API's grid point, so rows are stored with the
+            # cells' coordinates. One insert per request keeps many cells fast.
+            frame = ForecastFrame.concat(
+                [f.with_location(c.lat, c.lon) for c, f in zip(task.keys, data)]
+            )
+            OpenMeteoForecastDataPoint.upsert_many(frame, con, tbl_name)
             log.info(
-                f"{year}-{month:02d}: {len(data)} data points",
+                f"{task.start.isoformat()} - {task.end.isoformat()}: {len(frame)} data points",
+                " ✓",
+                f" → [{len(task.keys)} cells]",
+            )
+            return
+
+        for state, frame in zip(task.keys, data):
+            OpenMeteoForecastDataPoint.upsert_many(frame, con, tbl_name)
+            log.info(
+                f"{task.start.isoformat()} - {task.end.isoformat()}: {len(frame)} data points",
                 " ✓",
                 f" → [{state.name}]",
             )
 
+    try:
+        fetch_concurrently(
+            tasks,
+            fetch,
+            write,
+            workers,
+            limiter or RateLimiter(MAX_REQ_PER_SEC, MAX_CALLS_PER_DAY),
+            lambda task: request_cost(len(task.keys), task.num_days),
+        )
+    except QuotaExceededError as e:
+        log.error(f"{e}, try again tomorrow")
+        return
+
     log.success("Done")
 
 
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+import src.util.log as log
+from src.util.coverage import CoverageIndex
+from src.util.db import get_db_connection
+from src.util.geo import get_german_states
+
+
+def report_coverage(start: date | None = None, end: date | None = None):
+    log.msg("Report OpenMeteo forecast coverage")
+
+    start = start or date(date.today().year, 1, 1)
+    end = end or date.today() - timedelta(days=1)
+    con = get_db_connection()
+    states = get_german_states()
+    index = CoverageIndex.build(con, states, start, end)
+    log.info(f"{index}")
+
+    missing = index.missing_ranges()
+    for state, num in zip(states, index.num_missing()):
+        last = index.last_hour(state)
+        last_str = last.isoformat()[:13] if last else "no data"
+        if num == 0:
+            log.info(f"up to date, last hour {last_str}", " ✓", f" → [{state.name}]")
+            continue
+        ranges = ", ".join(
+            f"{r.start.isoformat()} - {r.end.isoformat()}" for r in missing[state]
+        )
+        log.error(
+            f"{num} hours missing, last hour {last_str}", f" → [{state.name}] {ranges}"
+        )
+
+    log.success("Done")
+
+
+if __name__ == "__main__":
+    report_coverage()
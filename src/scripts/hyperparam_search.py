@@ -0,0 +1,40 @@
+import src.util.log as log
+from src.model.features import LAGGED_KEYS, WEATHER_KEYS, FeaturesHourly
+from src.model.search import TrialResult
+from src.util.db import get_db_connection
+from src.util.search import param_grid, search
+
+TARGET = "idc_av_price_eurmwh"
+
+
+def hyperparam_search(name: str, models=("gru", "lstm"), runs=5, workers=None):
+    log.msg(f"Hyperparameter search '{name}'")
+
+    con = get_db_connection()
+    fm = FeaturesHourly.load(con, [*WEATHER_KEYS, *LAGGED_KEYS, TARGET]).normalized()
+    x, y = fm.x[:, :-1], fm.col(TARGET)
+    # Validate on the last 20% of the days
+    split = int(len(fm) // 24 * 0.8) * 24
+    data = {
+        "x_train": x[:split],
+        "y_train": y[:split],
+        "x_val": x[split:],
+        "y_val": y[split:],
+    }
+    trials = param_grid(models, [2, 3, 4], [64, 96, 128, 192, 256, 384], runs=runs)
+    log.info(
+        f"Training {len(trials)} trials on {split} hours",
+        f" ({len(fm) - split} for validation)",
+    )
+
+    def on_result(res: TrialResult):
+        log.info(f"{res}", f" (rung {res.rung})")
+
+    results = search(con, name, trials, data, workers=workers, on_result=on_result)
+    log.success(f"Best of {len(results)} trials")
+    for res in results[:10]:
+        log.info(f"{res}")
+
+
+if __name__ == "__main__":
+    hyperparam_search("gru-lstm")
@@ -0,0 +1,31 @@
+import asyncio
+
+from src.util.cache import get_http_cache
+
+
+class AsyncHttpClient:
+    """Asyncio client for cached HTTP GET requests, with a concurrency limit and timeouts.
+
+    Requests run on worker threads through the shared response cache and HTTP session,
+    so they share pooled connections, retries and cached responses with the sync API.
+    """
+
+    def __init__(self, max_concurrency=8, timeout=30.0):
+        assert max_concurrency > 0, "Concurrency limit must be > 0"
+        assert timeout > 0, "Timeout must be > 0"
+
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(max_concurrency)
+
+    def __repr__(self):
+        return f"AsyncHttpClient: {self.max_concurrency} concurrent requests, {self.timeout:.0f}s timeout"
+
+    async def get(self, url: str, immutable=False) -> bytes:
+        """Fetch the response body for a URL (raises `TimeoutError` after `timeout` seconds)."""
+
+        async with self._sem:
+            return await asyncio.wait_for(
+                asyncio.to_thread(get_http_cache().get, url, immutable, self.timeout),
+                self.timeout,
+            )
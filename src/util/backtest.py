@@ -0,0 +1,333 @@
+import math
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+from src.model.backtest import TBL_NAME, BacktestForecasts, BacktestScore
+from src.model.features import (
+    LAG_HOURS,
+    LAGGED_KEYS,
+    MARKET_KEYS,
+    FeatureMatrix,
+    FeaturesHourly,
+)
+from src.model.features import TBL_NAME as FEATURES_TBL
+from src.util.features import from_ms
+from src.util.gaps import HOUR_MS
+from src.util.search import SharedArray, attach, share
+from src.util.tz import from_local_wall_ms, to_local_wall_ms
+
+DAY_MS = 24 * HOUR_MS
+# The day-ahead auction for a delivery day closes at noon (local time) on the day before
+GATE_CLOSURE_HOUR = 12
+# Market data that is published for the whole next day at gate closure
+DAY_AHEAD_KEYS = ["daa_price_eurmwh"]
+
+# Forecast (hours × quantiles, or hours for a single quantile) of the delivery hours,
+# given the features known at gate closure (see `day_history`)
+Forecaster = Callable[[FeatureMatrix, np.ndarray], np.ndarray]
+
+
+class DeliveryDays(NamedTuple):
+    """Local delivery days with their UTC start, end and gate closure (in ms)"""
+
+    day: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    gate: np.ndarray
+
+
+def delivery_days(start: date, end: date, gate_hour=GATE_CLOSURE_HOUR) -> DeliveryDays:
+    """Local days with start <= day < end (which have 23 or 25 hours on DST transitions)."""
+
+    day = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    wall = day.astype("datetime64[ms]").astype(np.int64)
+    return DeliveryDays(
+        day,
+        from_local_wall_ms(wall),
+        from_local_wall_ms(wall + DAY_MS),
+        from_local_wall_ms(wall - DAY_MS + gate_hour * HOUR_MS),
+    )
+
+
+def known_until(keys: list[str], day_start: int, gate: int) -> np.ndarray:
+    """Per feature, the first hour (in ms) that isn't known yet at gate closure.
+
+    Weather forecasts are known for the delivery day. Market data is known up to gate
+    closure, except for day-ahead prices, which are known up to the delivery day.
+    """
+
+    until = {k: day_start if k in DAY_AHEAD_KEYS else gate for k in MARKET_KEYS} | {
+        lk: (day_start if k in DAY_AHEAD_KEYS else gate) + LAG_HOURS * HOUR_MS
+        for k, lk in zip(MARKET_KEYS, LAGGED_KEYS)
+    }
+    return np.array([until.get(k, np.iinfo(np.int64).max) for k in keys])
+
+
+def day_history(
+    fm: FeatureMatrix, day_start: int, day_end: int, gate: int, lookback_days: int
+) -> FeatureMatrix | None:
+    """Features of the delivery day and the days before, as known at gate closure.
+
+    Unknown values are NaN. Returns None if an hour of the delivery day is missing.
+    """
+
+    ts = fm.ts.astype(np.int64)
+    lo, start, hi = np.searchsorted(
+        ts, [day_start - lookback_days * DAY_MS, day_start, day_end]
+    )
+    num_hours = (day_end - day_start) // HOUR_MS
+    if hi - start != num_hours or ts[start] != day_start:
+        return None
+
+    x = fm.x[lo:hi].copy()
+    unknown = ts[lo:hi, None] >= known_until(fm.keys, day_start, gate)[None, :]
+    np.copyto(x, np.nan, where=unknown)
+    return FeatureMatrix(fm.ts[lo:hi], x, fm.keys, fm.mean, fm.std)
+
+
+def forecast_day(
+    fm: FeatureMatrix,
+    forecaster: Forecaster,
+    num_quantiles: int,
+    day_start: int,
+    day_end: int,
+    gate: int,
+    lookback_days: int,
+) -> np.ndarray | None:
+    """Forecast (hours × quantiles) of a delivery day, or None if its features are missing."""
+
+    history = day_history(fm, day_start, day_end, gate, lookback_days)
+    if history is None:
+        return None
+    num_hours = (day_end - day_start) // HOUR_MS
+    vals = np.asarray(forecaster(history, history.ts[-num_hours:]), dtype=np.float64)
+    vals = vals.reshape(num_hours, -1)
+    assert vals.shape[1] == num_quantiles, "Forecast must have one value per quantile"
+    return vals
+
+
+def seasonal_naive(history: FeatureMatrix, hours: np.ndarray) -> np.ndarray:
+    """Baseline forecaster: the day-ahead price of the same hour on the previous day."""
+
+    return history.col(f"daa_price_eurmwh_lag{LAG_HOURS}h")[-len(hours) :]
+
+
+# Feature matrix and settings of the worker process, set once by `init_worker`
+_WORKER: dict = {}
+
+
+def init_worker(
+    refs: dict[str, SharedArray],
+    keys: list[str],
+    mean: np.ndarray,
+    std: np.ndarray,
+    forecaster: Forecaster,
+    num_quantiles: int,
+    lookback_days: int,
+):
+    blocks: list[SharedMemory] = []
+    arrays = {}
+    for k, ref in refs.items():
+        shm, arrays[k] = attach(ref)
+        blocks.append(shm)
+    _WORKER.update(
+        blocks=blocks,
+        fm=FeatureMatrix(arrays["ts"], arrays["x"], keys, mean, std),
+        forecaster=forecaster,
+        num_quantiles=num_quantiles,
+        lookback_days=lookback_days,
+    )
+
+
+def run_days(days: DeliveryDays) -> list[tuple[int, np.ndarray]]:
+    """Forecast delivery days in a worker. Returns the index and forecast of every day."""
+
+    w = _WORKER
+    results = []
+    for idx in range(len(days.day)):
+        vals = forecast_day(
+            w["fm"],
+            w["forecaster"],
+            w["num_quantiles"],
+            int(days.start[idx]),
+            int(days.end[idx]),
+            int(days.gate[idx]),
+            w["lookback_days"],
+        )
+        if vals is not None:
+            results.append((idx, vals))
+    return results
+
+
+def backtest(
+    con: DuckDBPyConnection,
+    name: str,
+    forecaster: Forecaster,
+    start: date,
+    end: date,
+    quantiles=(0.5,),
+    lookback_days=28,
+    gate_hour=GATE_CLOSURE_HOUR,
+    workers: int | None = None,
+    reset=False,
+    on_day: Callable[[date], None] | None = None,
+) -> int:
+    """Replay history day by day (start <= day < end) and cache the forecasts in the DB.
+
+    For every local delivery day, the forecaster gets the features of the day and the
+    `lookback_days` before it as they were known at gate closure (see `known_until`)
+    and returns the delivery hours' forecast for every quantile. Days with cached
+    forecasts are skipped (unless `reset`), so scoring (see `score`) doesn't re-run the
+    forecaster. Days are forecast in parallel on `workers` processes (default: all
+    cores), which requires a picklable forecaster (e.g. a module-level function).
+    Returns the number of days that were forecast.
+    """
+
+    assert start < end, "Start must be before end"
+    assert len(quantiles) > 0, "Quantiles must not be empty"
+    assert all(0 < q < 1 for q in quantiles), "Quantiles must be within (0, 1)"
+
+    BacktestForecasts.init_table(con)
+    if reset:
+        BacktestForecasts.delete(con, name)
+    cached = BacktestForecasts.days(con, name)
+    days = delivery_days(start, end, gate_hour)
+    todo = np.array([d not in cached for d in days.day.tolist()], dtype=bool)
+    days = DeliveryDays(*(v[todo] for v in days))
+    if len(days.day) == 0:
+        return 0
+
+    fm = FeaturesHourly.load(
+        con,
+        start=from_ms(int(days.start[0]) - lookback_days * DAY_MS),
+        end=from_ms(int(days.end[-1])),
+        fill_nan=False,
+    )
+    quantiles = list(quantiles)
+    num_done = 0
+
+    def store(chunk: DeliveryDays, results: list[tuple[int, np.ndarray]]):
+        nonlocal num_done
+        if len(results) == 0:
+            return
+        day, ts, vals = [], [], []
+        for idx, v in results:
+            hours = np.arange(chunk.start[idx], chunk.end[idx], HOUR_MS)
+            day.append(np.full(len(hours), chunk.day[idx]))
+            ts.append(hours.astype("datetime64[ms]"))
+            vals.append(v)
+        BacktestForecasts.upsert_many(
+            name,
+            np.concatenate(day),
+            np.concatenate(ts),
+            quantiles,
+            np.concatenate(vals),
+            con,
+        )
+        num_done += len(results)
+        if on_day:
+            for idx, _ in results:
+                on_day(chunk.day[idx].item())
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for idx in range(len(days.day)):
+            chunk = DeliveryDays(*(v[idx : idx + 1] for v in days))
+            vals = forecast_day(
+                fm,
+                forecaster,
+                len(quantiles),
+                int(chunk.start[0]),
+                int(chunk.end[0]),
+                int(chunk.gate[0]),
+                lookback_days,
+            )
+            store(chunk, [] if vals is None else [(0, vals)])
+        return num_done
+
+    blocks, refs = [], {}
+    for k, v in {"ts": fm.ts, "x": fm.x}.items():
+        shm, refs[k] = share(np.ascontiguousarray(v))
+        blocks.append(shm)
+    # A few chunks per worker balance the load while keeping the overhead low
+    size = math.ceil(len(days.day) / (workers * 4))
+    chunks = [
+        DeliveryDays(*(v[i : i + size] for v in days))
+        for i in range(0, len(days.day), size)
+    ]
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=get_context("spawn"),
+            initializer=init_worker,
+            initargs=(
+                refs,
+                fm.keys,
+                fm.mean,
+                fm.std,
+                forecaster,
+                len(quantiles),
+                lookback_days,
+            ),
+        ) as pool:
+            pending = {pool.submit(run_days, c): c for c in chunks}
+            for fut in as_completed(pending):
+                store(pending[fut], fut.result())
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    return num_done
+
+
+def score(
+    con: DuckDBPyConnection,
+    name: str,
+    target="daa_price_eurmwh",
+    start: date | None = None,
+    end: date | None = None,
+) -> BacktestScore:
+    """Errors of the cached forecasts of a backtest per local hour of day.
+
+    MAE and RMSE are computed for the quantile closest to the median, the pinball loss
+    is averaged over all quantiles. Hours without a forecast or actual value are skipped.
+    """
+
+    conds = ["f.name = ?", f"t.{target} IS NOT NULL", "f.value IS NOT NULL"]
+    if start:
+        conds.append(f"f.day >= '{start.isoformat()}'")
+    if end:
+        conds.append(f"f.day < '{end.isoformat()}'")
+    cols = con.execute(
+        f"""
+        SELECT f.ts, f.quantile, f.value, t.{target} AS actual
+        FROM {TBL_NAME} f JOIN {FEATURES_TBL} t USING (ts)
+        WHERE {" AND ".join(conds)}
+        """,
+        [name],
+    ).fetchnumpy()
+
+    ts = cols["ts"].astype("datetime64[ms]").astype(np.int64)
+    hour = (to_local_wall_ms(ts) // HOUR_MS) % 24
+    q, err = cols["quantile"], cols["actual"] - cols["value"]
+
+    def per_hour(vals: np.ndarray, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        num = np.bincount(hour[mask], minlength=24)
+        total = np.bincount(hour[mask], weights=vals[mask], minlength=24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return num, total / num
+
+    median = np.isclose(q, q[np.argmin(np.abs(q - 0.5))]) if len(q) else q == 0.5
+    count, mae = per_hour(np.abs(err), median)
+    _, mse = per_hour(err**2, median)
+    _, pinball = per_hour(np.maximum(q * err, (q - 1) * err), np.ones(len(q), bool))
+    return BacktestScore(name, count, mae, np.sqrt(mse), pinball)
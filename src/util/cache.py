@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable
+from typing import BinaryIO
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.util.db import data_dir
+from src.util.http import get_http_session
+
+HTTP_CACHE: "ResponseCache | None" = None
+HTTP_CACHE_DIR = f"{data_dir}/cache/http"
+CHUNK_SIZE = 1 << 20
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for caching (lower-case scheme/host, sorted query params)."""
+
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path, query, "")
+    )
+
+
+class ResponseCache:
+    """On-disk cache for HTTP GET responses, keyed by the hash of the normalized URL.
+
+    Immutable responses (e.g. historical data) never expire. All other responses are
+    fresh for `ttl` seconds, after which they are revalidated with `If-None-Match` /
+    `If-Modified-Since` if the server sent an `ETag` / `Last-Modified` header. Once the
+    cache grows beyond `max_bytes`, the least recently used responses are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes=1 << 30, ttl=3600.0):
+        assert max_bytes > 0, "Cache size must be > 0"
+        assert ttl >= 0, "TTL must be >= 0"
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(e.stat().st_size for e in self._entries())
+
+    def __repr__(self):
+        return (
+            f"ResponseCache: {self.size / 1e6:.1f}/{self.max_bytes / 1e6:.1f} MB "
+            + f"({self.hits} hits, {self.misses} misses, {self.revalidations} revalidations)"
+        )
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [e for e in os.scandir(self.cache_dir) if e.name.endswith(".body")]
+
+    def _path(self, key: str) -> str:
+        return f"{self.cache_dir}/{key}"
+
+    def _write_meta(self, key: str, meta: dict):
+        path = f"{self._path(key)}.meta"
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _read_meta(self, key: str) -> dict | None:
+        try:
+            with open(f"{self._path(key)}.meta") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _store(self, key: str, meta: dict, chunks: Iterable[bytes]) -> BinaryIO:
+        # Stream the body into a temporary file, so large responses never sit in memory
+        path = f"{self._path(key)}.body"
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.writelines(chunks)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            try:
+                self.size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            self._write_meta(key, meta)
+            # Open before evicting, the body stays readable even if it is evicted itself,
+            # and the handle is returned to the caller, who closes it.
+            f = open(path, "rb")  # noqa: SIM115
+            self.size += size
+            if self.size > self.max_bytes:
+                self._evict()
+        return f
+
+    def _evict(self):
+        # Least recently used first (hits touch the body's modification time)
+        for entry in sorted(self._entries(), key=lambda e: e.stat().st_mtime):
+            if self.size <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            for ext in [".body", ".meta"]:
+                try:
+                    os.remove(f"{self._path(entry.name[:-5])}{ext}")
+                except FileNotFoundError:
+                    pass
+            self.size -= size
+
+    def _open_body(self, key: str) -> BinaryIO | None:
+        """Open a cached body, or return None if it was evicted (or never stored)."""
+
+        try:
+            # The handle is returned to the caller, who closes it
+            return open(f"{self._path(key)}.body", "rb")  # noqa: SIM115
+        except FileNotFoundError:
+            return None
+
+    def open(self, url: str, immutable=False, timeout: float | None = None) -> BinaryIO:
+        """Open the response body for a URL as a file, from the cache if possible.
+
+        Responses are streamed to disk, so they are never fully loaded into memory.
+        """
+
+        url = normalize_url(url)
+        key = hashlib.sha256(url.encode()).hexdigest()
+        meta = self._read_meta(key)
+
+        fresh = meta and (
+            meta["immutable"] or time.time() - meta["fetched_at"] < self.ttl
+        )
+        if fresh:
+            f = self._open_body(key)
+            if f:
+                with self._lock:
+                    self.hits += 1
+                os.utime(f.name)
+                return f
+            meta = None
+        return self._fetch(url, key, meta, immutable, timeout)
+
+    def _fetch(
+        self,
+        url: str,
+        key: str,
+        meta: dict | None,
+        immutable: bool,
+        timeout: float | None,
+    ) -> BinaryIO:
+        """Request a URL and store the response.
+
+        With the metadata of a cached response, the request is conditional and the
+        cached body is reused if it is unchanged.
+        """
+
+        headers: dict[str, str] = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        with get_http_session().get(
+            url, headers=headers, stream=True, timeout=timeout
+        ) as res:
+            if meta and res.status_code == 304:
+                f = self._open_body(key)
+                if f is None:
+                    # The body was evicted since, so fetch it again unconditionally
+                    return self._fetch(url, key, None, immutable, timeout)
+                with self._lock:
+                    self.revalidations += 1
+                self._write_meta(key, {**meta, "fetched_at": time.time()})
+                return f
+            res.raise_for_status()
+
+            with self._lock:
+                self.misses += 1
+            meta = {
+                "url": url,
+                "immutable": immutable,
+                "fetched_at": time.time(),
+                "etag": res.headers.get("ETag"),
+                "last_modified": res.headers.get("Last-Modified"),
+            }
+            return self._store(key, meta, res.iter_content(CHUNK_SIZE))
+
+    def get(self, url: str, immutable=False, timeout: float | None = None) -> bytes:
+        """Fetch the response body for a URL, from the cache if possible."""
+
+        with self.open(url, immutable, timeout) as f:
+            return f.read()
+
+    def clear(self):
+        """Remove all cached responses and reset the counters."""
+
+        with self._lock:
+            for entry in os.scandir(self.cache_dir):
+                os.remove(entry.path)
+            self.size = 0
+            self.hits = self.misses = self.revalidations = 0
+
+
+def get_http_cache() -> ResponseCache:
+    global HTTP_CACHE
+    if not HTTP_CACHE:
+        HTTP_CACHE = ResponseCache(HTTP_CACHE_DIR)
+    return HTTP_CACHE
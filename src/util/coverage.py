@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+from src.model.forecast import Location
+from src.util.geo import match_locations
+from src.util.plan import DateRange
+
+FULL_DAY = (1 << 24) - 1
+
+
+class CoverageIndex:
+    """Hourly data coverage of a forecast table, as a 24-bit hour mask per location and day"""
+
+    def __init__(self, locs: list[Location], start: date, bits: np.ndarray):
+        assert bits.shape[0] == len(locs), "Coverage must have one row per location"
+
+        self.locs = locs
+        self.days = np.arange(
+            np.datetime64(start, "D"), np.datetime64(start, "D") + bits.shape[1]
+        )
+        self.bits = bits.astype(np.uint32)
+
+    def __repr__(self):
+        cov = 100 * (1 - self.num_missing().sum() / (self.bits.size * 24))
+        return f"CoverageIndex: {len(self.locs)} locations × {len(self.days)} days ({cov:.1f}% covered)"
+
+    @property
+    def hours(self) -> np.ndarray:
+        """Covered hours as a boolean (location × day × hour) array."""
+
+        return ((self.bits[:, :, None] >> np.arange(24, dtype=np.uint32)) & 1).astype(
+            bool
+        )
+
+    def num_missing(self) -> np.ndarray:
+        """Number of missing hours per location."""
+
+        return 24 * len(self.days) - self.hours.sum(axis=(1, 2))
+
+    def missing_hours(self, loc: Location) -> np.ndarray:
+        """Timestamps of all missing hours for a location."""
+
+        cov = self.hours[self.locs.index(loc)]
+        day_idx, hour = np.nonzero(~cov)
+        return self.days[day_idx] + hour.astype("timedelta64[h]")
+
+    def last_hour(self, loc: Location) -> datetime | None:
+        """Latest covered hour for a location (None if there is no data)."""
+
+        cov = self.hours[self.locs.index(loc)].reshape(-1)
+        idx = np.nonzero(cov)[0]
+        if len(idx) == 0:
+            return None
+        ts = self.days[0] + np.timedelta64(int(idx[-1]), "h")
+        return ts.astype("datetime64[s]").item()
+
+    def missing_ranges(self) -> dict[Location, list[DateRange]]:
+        """Ranges of consecutive days with at least one missing hour, per location."""
+
+        missing: dict[Location, list[DateRange]] = {}
+        for loc, row in zip(self.locs, self.bits):
+            idx = np.nonzero(row != FULL_DAY)[0]
+            if len(idx) == 0:
+                continue
+            # Split wherever consecutive missing days are not adjacent
+            breaks = np.nonzero(np.diff(idx) > 1)[0]
+            starts = np.concatenate([idx[:1], idx[breaks + 1]])
+            ends = np.concatenate([idx[breaks], idx[-1:]])
+            missing[loc] = [
+                DateRange(self.days[s].item(), self.days[e].item())
+                for s, e in zip(starts, ends)
+            ]
+        return missing
+
+    @staticmethod
+    def build(
+        con: DuckDBPyConnection,
+        locs: list[Location],
+        start: date,
+        end: date,
+        tbl_name="open_meteo_hourly",
+        tol=0.1,
+    ) -> "CoverageIndex":
+        """Build the index for a date range (including end) with one pass over a forecast table."""
+
+        assert end >= start, "End must not be before start"
+
+        num_days = (end - start).days + 1
+        loc_cols = {
+            "idx": np.arange(len(locs), dtype=np.int64),
+            "lat": np.array([loc.lat for loc in locs], dtype=np.float64),
+            "lon": np.array([loc.lon for loc in locs], dtype=np.float64),
+        }
+        stmt = f"""
+            SELECT l.idx, datediff('day', DATE '{start.isoformat()}', h.ts::DATE) AS day,
+                   bit_or(1::UINTEGER << hour(h.ts)) AS hours
+            FROM {tbl_name} h
+            JOIN coverage_locs l ON {match_locations("h", "l", tol)}
+            WHERE h.ts >= '{start.isoformat()}'
+              AND h.ts < '{(end + timedelta(days=1)).isoformat()}'
+            GROUP BY ALL
+        """
+        con.register("coverage_locs", loc_cols)
+        try:
+            res = con.sql(stmt).fetchnumpy()
+        finally:
+            con.unregister("coverage_locs")
+
+        bits = np.zeros((len(locs), num_days), dtype=np.uint32)
+        bits[res["idx"], res["day"]] = res["hours"]
+        return CoverageIndex(locs, start, bits)
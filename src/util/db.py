@@ -1,16 +1,52 @@
 import os
+from typing import TYPE_CHECKING
 
-import duckdb
-from duckdb import DuckDBPyConnection
+import numpy as np
+
+if TYPE_CHECKING:
+    from duckdb import DuckDBPyConnection
 
 data_dir = os.path.normpath(f"{__file__}/../../../data")
 db_filepath = f"{data_dir}/db/local.db"
 
-DB_CONN: DuckDBPyConnection | None = None
+DB_CONN: "DuckDBPyConnection | None" = None
 
 
-def get_db_connection() -> DuckDBPyConnection:
+def get_db_connection() -> "DuckDBPyConnection":
     global DB_CONN
     if not DB_CONN:
+        import duckdb
+
         DB_CONN = duckdb.connect(db_filepath)
     return DB_CONN
+
+
+def insert_columns(
+    con: "DuckDBPyConnection", tbl_name: str, cols: dict[str, np.ndarray]
+):
+    """Bulk insert columnar data into a table, ignoring rows with existing keys.
+
+    The arrays are registered as a relation and inserted in one statement. NaN values
+    in float columns are stored as NULL.
+    """
+
+    assert len(cols) > 0, "Columns must not be empty"
+    lengths = {len(v) for v in cols.values()}
+    assert len(lengths) == 1, "Columns have different lengths"
+
+    view_name = f"{tbl_name}_buf"
+    sel_str = ", ".join(
+        [
+            f"nullif({k}, 'NaN'::DOUBLE)" if v.dtype.kind == "f" else k
+            for k, v in cols.items()
+        ]
+    )
+    stmt = f"""
+    INSERT OR IGNORE INTO {tbl_name} ({", ".join(cols)})
+    SELECT {sel_str} FROM {view_name};
+    """
+    con.register(view_name, cols)
+    try:
+        con.execute(stmt)
+    finally:
+        con.unregister(view_name)
@@ -0,0 +1,183 @@
+import numpy as np
+
+from src.util.gaps import HOUR_MS
+from src.util.tz import to_local_wall_ms
+
+
+def local_day_hour(ts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Local day (days since 1970-01-01) and hour of day of UTC timestamps."""
+
+    wall = to_local_wall_ms(np.asarray(ts, dtype="datetime64[ms]").astype(np.int64))
+    hours = wall // HOUR_MS
+    return hours // 24, hours % 24
+
+
+def combine(preds: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted sum of forecasts (hours × forecasters), with weights per forecaster or per hour."""
+
+    assert preds.ndim == 2, "Forecasts must be hours × forecasters"
+    assert weights.shape in [preds.shape[1:], preds.shape], (
+        "Weights must match forecasts"
+    )
+    return np.sum(preds * weights, axis=1)
+
+
+def blend_grid(
+    base: np.ndarray,
+    pred: np.ndarray,
+    actual: np.ndarray,
+    factors: np.ndarray | None = None,
+    hours: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Mean absolute error of `(1 - f) * base + f * pred` for every blend factor `f`.
+
+    All factors are evaluated at once, without computing every blend. With `hours` (hour of day of every value), errors
+    are computed per hour of day (24 × factors). Returns the factors and their errors.
+    """
+
+    factors = np.linspace(0, 1, 101) if factors is None else np.asarray(factors)
+    assert base.shape == pred.shape == actual.shape, "Values must have the same shape"
+
+    valid = ~(np.isnan(base) | np.isnan(pred) | np.isnan(actual))
+    resid, diff = (actual - base)[valid], (pred - base)[valid]
+    if hours is None:
+        return factors, _abs_errors(resid, diff, factors) / max(len(resid), 1)
+
+    hours = np.asarray(hours)[valid]
+    err = np.full((24, len(factors)), np.nan)
+    for h in range(24):
+        mask = hours == h
+        if mask.any():
+            err[h] = _abs_errors(resid[mask], diff[mask], factors) / mask.sum()
+    return factors, err
+
+
+def _abs_errors(resid: np.ndarray, diff: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """Sum of `|resid - f * diff|` for every factor `f`.
+
+    The sum is piecewise linear in `f` with break points at `resid / diff`, so it is
+    evaluated for all factors from cumulative sums over the sorted break points.
+    """
+
+    nonzero = diff != 0
+    const = np.abs(resid[~nonzero]).sum()
+    w = np.abs(diff[nonzero])
+    t = resid[nonzero] / diff[nonzero]
+    order = np.argsort(t)
+    t, w = t[order], w[order]
+    cum_w = np.concatenate([[0], np.cumsum(w)])
+    cum_wt = np.concatenate([[0], np.cumsum(w * t)])
+
+    idx = np.searchsorted(t, factors)
+    below = factors * cum_w[idx] - cum_wt[idx]
+    above = (cum_wt[-1] - cum_wt[idx]) - factors * (cum_w[-1] - cum_w[idx])
+    return const + below + above
+
+
+def _grams(
+    preds: np.ndarray, actual: np.ndarray, groups: np.ndarray, num_groups: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per group: Gram matrix of the forecasts, their products with the actual values and
+    the number of hours (hours with missing values are skipped)."""
+
+    valid = ~(np.isnan(preds).any(axis=1) | np.isnan(actual))
+    x, y, g = preds[valid], actual[valid], groups[valid]
+    k = x.shape[1]
+    gram = np.empty((num_groups, k, k))
+    for i in range(k):
+        for j in range(i, k):
+            gram[:, i, j] = gram[:, j, i] = np.bincount(
+                g, x[:, i] * x[:, j], minlength=num_groups
+            )
+    xty = np.stack(
+        [np.bincount(g, x[:, i] * y, minlength=num_groups) for i in range(k)], axis=-1
+    )
+    return gram, xty, np.bincount(g, minlength=num_groups)
+
+
+def _solve(gram: np.ndarray, xty: np.ndarray, count: np.ndarray, ridge: float):
+    """Weights that sum to 1 and minimize the squared error (NaN without any hours).
+
+    Solves the equality-constrained least squares problem in closed form, for any
+    number of problems at once (leading axes).
+    """
+
+    k = gram.shape[-1]
+    # Scale-aware regularization keeps near-identical forecasters solvable
+    scale = np.trace(gram, axis1=-2, axis2=-1) / k
+    reg = (ridge * count + 1e-9 * scale)[..., None, None] * np.eye(k)
+    empty = count == 0
+
+    kkt = np.zeros((*gram.shape[:-2], k + 1, k + 1))
+    kkt[..., :k, :k] = np.where(empty[..., None, None], np.eye(k), gram + reg)
+    kkt[..., :k, k] = kkt[..., k, :k] = 1
+    rhs = np.concatenate([xty, np.ones((*xty.shape[:-1], 1))], axis=-1)
+    weights = np.linalg.solve(kkt, rhs[..., None])[..., :k, 0]
+    weights[empty] = np.nan
+    return weights
+
+
+def fit_weights(
+    preds: np.ndarray,
+    actual: np.ndarray,
+    hours: np.ndarray | None = None,
+    ridge=0.0,
+) -> np.ndarray:
+    """Ensemble weights (summing to 1) with the least squared error, in closed form.
+
+    `preds` holds the forecasts of any number of forecasters (hours × forecasters). With
+    `hours` (hour of day of every row), separate weights are fit per hour of day
+    (24 × forecasters). `ridge` shrinks the weights towards 0, relative to the number of
+    hours, which evens them out. Hours with a missing value are skipped.
+    """
+
+    assert preds.ndim == 2 and len(preds) == len(actual), (
+        "Forecasts must be hours × forecasters"
+    )
+    assert ridge >= 0, "Ridge must be >= 0"
+
+    groups = np.zeros(len(preds), dtype=np.int64) if hours is None else hours
+    num = 1 if hours is None else 24
+    weights = _solve(*_grams(preds, actual, groups, num), ridge)
+    return weights[0] if hours is None else weights
+
+
+def rolling_weights(
+    preds: np.ndarray,
+    actual: np.ndarray,
+    ts: np.ndarray,
+    window_days=365,
+    per_hour=False,
+    ridge=0.0,
+) -> np.ndarray:
+    """Ensemble weights for every hour (hours × forecasters), refit every local day.
+
+    The weights of a day are fit on the `window_days` days before it (see
+    `fit_weights`), so they only use past errors. Days without any hours in their window
+    get NaN weights. All days are fit at once from cumulative sums of daily Gram
+    matrices, so refitting every day over years of hourly data stays fast.
+    """
+
+    assert window_days > 0, "Window must be > 0 days"
+    day, hour = local_day_hour(ts)
+    days, day_idx = np.unique(day, return_inverse=True)
+    num_groups = 24 if per_hour else 1
+    groups = day_idx * num_groups + (hour if per_hour else 0)
+
+    gram, xty, count = _grams(preds, actual, groups, len(days) * num_groups)
+    k = preds.shape[1]
+    cum = [
+        np.concatenate([np.zeros((1, *v.shape[1:])), v.cumsum(axis=0)])
+        for v in [
+            gram.reshape(len(days), num_groups, k, k),
+            xty.reshape(len(days), num_groups, k),
+            count.reshape(len(days), num_groups),
+        ]
+    ]
+    # Days in [day - window_days, day)
+    lo = np.searchsorted(days, days - window_days)
+    hi = np.arange(len(days))
+    gram_w, xty_w, count_w = [c[hi] - c[lo] for c in cum]
+
+    weights = _solve(gram_w, xty_w, count_w, ridge)
+    return weights[day_idx, hour if per_hour else 0]
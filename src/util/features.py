@@ -0,0 +1,121 @@
+from datetime import datetime
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+from src.model.features import (
+    LAG_HOURS,
+    LAGGED_KEYS,
+    MARKET_KEYS,
+    TBL_NAME,
+    WEATHER_KEYS,
+    FeaturesHourly,
+)
+from src.util.gaps import HOUR_MS, fill_hourly
+from src.util.tz import from_local_wall_ms
+
+# Longest run of missing hours that is filled with the previous hour (e.g. the
+# repeated hour when the clocks fall back, which is only stored once)
+MAX_FILL_HOURS = 3
+
+
+def to_ms(ts: datetime) -> int:
+    return np.datetime64(ts, "ms").astype(np.int64).item()
+
+
+def from_ms(ms: int) -> datetime:
+    return np.datetime64(int(ms), "ms").item()
+
+
+def fetch_columns(
+    con: DuckDBPyConnection,
+    tbl_name: str,
+    keys: list[str],
+    start: datetime,
+    end: datetime,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Timestamps (in ms) and values (NULL values become NaN) for start <= ts <= end."""
+
+    cols = con.sql(f"""
+        SELECT ts, {", ".join(keys)}
+        FROM {tbl_name}
+        WHERE ts >= '{start.isoformat()}' AND ts <= '{end.isoformat()}'
+        ORDER BY ts
+    """).fetchnumpy()
+    ts = cols["ts"].astype("datetime64[ms]").astype(np.int64)
+    return ts, {k: np.ma.filled(cols[k].astype(np.float64), np.nan) for k in keys}
+
+
+def build_features(
+    con: DuckDBPyConnection, incremental=True, weather_tbl="open_meteo_agg_hourly"
+) -> int:
+    """Materialize the hourly training features in the DB. Returns the number of hours written.
+
+    Weather forecasts (stored in UTC) and market data (stored in local wall clock time)
+    are aligned on a complete UTC hourly grid. Each hour holds its weather forecast, its
+    market data and the market data from `LAG_HOURS` earlier, so hours are added as soon
+    as the lagged market data is available.
+    In incremental mode, only hours after the last stored day are (re)computed, since
+    the market data of the last day may not have been available on the previous run.
+    The table is rebuilt whenever it was created by a different feature version.
+    """
+
+    if not incremental or not FeaturesHourly.is_current(con):
+        FeaturesHourly.init_table(con)
+
+    [(w_start, w_end)] = con.sql(
+        f"SELECT min(ts), max(ts) FROM {weather_tbl}"
+    ).fetchall()
+    [(m_start, m_end)] = con.sql("SELECT min(ts), max(ts) FROM epex_market").fetchall()
+    if w_start is None or m_start is None:
+        return 0
+
+    m_start_ms, m_end_ms = from_local_wall_ms(np.array([to_ms(m_start), to_ms(m_end)]))
+    lag_ms = LAG_HOURS * HOUR_MS
+    start_ms = max(to_ms(w_start), m_start_ms + lag_ms)
+    end_ms = min(to_ms(w_end), m_end_ms + lag_ms)
+
+    last_ts = FeaturesHourly.last_ts(con)
+    if last_ts:
+        start_ms = max(start_ms, to_ms(last_ts) - lag_ms + HOUR_MS)
+    if end_ms < start_ms:
+        return 0
+
+    grid = np.arange(start_ms, end_ms + HOUR_MS, HOUR_MS)
+    fill_ms = MAX_FILL_HOURS * HOUR_MS
+
+    w_ts, w_vals = fetch_columns(
+        con, weather_tbl, WEATHER_KEYS, from_ms(start_ms - fill_ms), from_ms(end_ms)
+    )
+    # Wall clock times are up to a few hours off UTC, so fetch generously
+    m_wall, m_vals = fetch_columns(
+        con,
+        "epex_market",
+        MARKET_KEYS,
+        from_ms(start_ms - lag_ms - fill_ms - 3 * HOUR_MS),
+        from_ms(end_ms + 3 * HOUR_MS),
+    )
+    m_ts = from_local_wall_ms(m_wall)
+
+    _, weather = fill_hourly(w_ts, w_vals, grid, max_gap=MAX_FILL_HOURS)
+    _, market = fill_hourly(m_ts, m_vals, grid, max_gap=MAX_FILL_HOURS)
+    _, lagged = fill_hourly(m_ts, m_vals, grid - lag_ms, max_gap=MAX_FILL_HOURS)
+    vals = {
+        **weather,
+        **market,
+        **{lk: lagged[k] for k, lk in zip(MARKET_KEYS, LAGGED_KEYS)},
+    }
+
+    con.begin()
+    try:
+        con.execute(
+            f"DELETE FROM {TBL_NAME} WHERE ts >= '{from_ms(start_ms).isoformat()}'"
+        )
+        FeaturesHourly.upsert_many(grid.astype("datetime64[ms]"), vals, con)
+        FeaturesHourly.update_stats(con)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+
+    return len(grid)
@@ -0,0 +1,107 @@
+from typing import Literal
+
+import numpy as np
+
+HOUR_MS = 3600 * 1000
+
+FillMethod = Literal["ffill", "interpolate", "seasonal"]
+Duplicates = Literal["first", "last", "mean"]
+
+
+def dedupe(
+    hours: np.ndarray, vals: dict[str, np.ndarray], keep: Duplicates = "first"
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Sort hours and collapse repeated hours (e.g. when the clocks fall back in local time) into one."""
+
+    order = np.argsort(hours, kind="stable")
+    hours = hours[order]
+    vals = {k: v[order] for k, v in vals.items()}
+    uniq, first, inv, counts = np.unique(
+        hours, return_index=True, return_inverse=True, return_counts=True
+    )
+    if len(uniq) == len(hours):
+        return hours, vals
+
+    if keep == "mean":
+        return uniq, {k: np.bincount(inv, v) / counts for k, v in vals.items()}
+    idx = first if keep == "first" else first + counts - 1
+    return uniq, {k: v[idx] for k, v in vals.items()}
+
+
+def fill_hourly(
+    ts: np.ndarray,
+    vals: dict[str, np.ndarray],
+    grid: np.ndarray | None = None,
+    method: FillMethod = "ffill",
+    max_gap: int | None = None,
+    duplicates: Duplicates = "first",
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Reindex hourly columns onto a complete hourly grid and fill the missing hours.
+
+    The grid defaults to every hour from the first to the last timestamp. Missing hours
+    are filled with the previous hour (`ffill`), linearly between the neighbouring
+    hours (`interpolate`) or with the same hour on the last day that has it
+    (`seasonal`, falls back to `ffill`). Gaps longer than `max_gap` hours, hours
+    before the first and after the last timestamp become NaN. Repeated hours are
+    collapsed into one first (see `dedupe`). Returns the grid and the filled columns.
+    """
+
+    assert method in ("ffill", "interpolate", "seasonal"), f"Unknown method '{method}'"
+    assert duplicates in ("first", "last", "mean"), f"Unknown duplicates '{duplicates}'"
+    for v in vals.values():
+        assert len(v) == len(ts), "Timestamps and values have different lengths"
+
+    ms = np.asarray(ts, dtype="datetime64[ms]").astype(np.int64)
+    assert np.all(ms % HOUR_MS == 0), "Timestamps must be full hours"
+    hours, vals = dedupe(
+        ms // HOUR_MS,
+        {k: np.asarray(v, dtype=np.float64) for k, v in vals.items()},
+        duplicates,
+    )
+
+    if grid is None:
+        grid_hours = np.arange(hours[0], hours[-1] + 1) if len(hours) else hours
+    else:
+        grid_ms = np.asarray(grid, dtype="datetime64[ms]").astype(np.int64)
+        assert np.all(grid_ms % HOUR_MS == 0), "Grid must consist of full hours"
+        grid_hours = grid_ms // HOUR_MS
+    grid_ts = (grid_hours * HOUR_MS).astype("datetime64[ms]")
+    if len(hours) == 0:
+        return grid_ts, {k: np.full(len(grid_hours), np.nan) for k in vals}
+
+    # Last hour at or before and first hour at or after each grid hour
+    before = np.searchsorted(hours, grid_hours, side="right") - 1
+    after = np.searchsorted(hours, grid_hours, side="left")
+    inside = (before >= 0) & (after < len(hours))
+    before = np.maximum(before, 0)
+    after = np.minimum(after, len(hours) - 1)
+    present = hours[before] == grid_hours
+    valid = inside
+    if max_gap is not None:
+        valid = inside & (present | (hours[after] - hours[before] - 1 <= max_gap))
+
+    src = before.copy()
+    if method == "seasonal":
+        # Look up the same hour on earlier days, one day at a time
+        todo = np.nonzero(valid & ~present)[0]
+        day = 1
+        while len(todo):
+            prev_day = grid_hours[todo] - 24 * day
+            has_day = prev_day >= hours[0]
+            todo, prev_day = todo[has_day], prev_day[has_day]
+            idx = np.searchsorted(hours, prev_day)
+            found = hours[idx] == prev_day
+            src[todo[found]] = idx[found]
+            todo = todo[~found]
+            day += 1
+
+    filled: dict[str, np.ndarray] = {}
+    for k, v in vals.items():
+        out = v[src]
+        if method == "interpolate":
+            span = np.maximum(hours[after] - hours[before], 1)
+            frac = (grid_hours - hours[before]) / span
+            out = out + frac * (v[after] - out)
+        filled[k] = np.where(valid, out, np.nan)
+
+    return grid_ts, filled
@@ -1,25 +1,36 @@
 import json
 import os
-from typing import NamedTuple
+from datetime import datetime
+from typing import TYPE_CHECKING, overload
+
+import numpy as np
 
 from src.model.forecast import Location
-from src.model.geo import GeoStateInfo
+from src.model.geo import BBox, GeoStateInfo
 from src.model.open_meteo import (
-    ZERO_FC_DATA,
+    ForecastFrame,
     OpenMeteoForecastData,
     OpenMeteoForecastDataPoint,
 )
-from src.util.math import normalize
+from src.util.math import normalize, weighted_nanmean
+
+if TYPE_CHECKING:
+    from duckdb import DuckDBPyConnection
 
 data_dir = os.path.normpath(f"{__file__}/../../../data")
 bbox_filepath = f"{data_dir}/geo/german-states.json"
 
+# Columns that are merged (coordinates are weighted like the other non-solar/wind columns)
+MERGE_KEYS = ["lat", "lon", "elev_m", *OpenMeteoForecastData.__annotations__]
 
-LatLon = NamedTuple("LatLon", [("lat", float), ("lon", float)])
 
+def get_german_states(split_weights=False) -> list[Location]:
+    """Return a list of forecast locations, one for every German state.
 
-def get_german_states() -> list[Location]:
-    """Return a list of forecast locations, one for every German state."""
+    States are weighted by their installed solar and wind capacity. With
+    `split_weights`, solar and wind columns are weighted by the solar and wind
+    capacity respectively, and all other columns by the state's area.
+    """
 
     states: list[Location] = []
     with open(bbox_filepath) as f:
@@ -27,37 +38,265 @@ def get_german_states() -> list[Location]:
         for key in data:
             lat = data[key]["stationLat"]
             lon = data[key]["stationLon"]
-            cap = data[key]["instSolCapGw"] + data[key]["instWndCapGw"]
-            states.append(Location(key, lat, lon, cap))
+            sol_cap = data[key]["instSolCapGw"]
+            wnd_cap = data[key]["instWndCapGw"]
+            if split_weights:
+                area = BBox.fromjson(data[key]).weight
+                states.append(Location(key, lat, lon, area, sol_cap, wnd_cap))
+            else:
+                states.append(Location(key, lat, lon, sol_cap + wnd_cap))
 
     return states
 
 
+def get_german_grid(rows=4, cols=4, split_weights=False) -> list[Location]:
+    """Return a list of forecast locations, one for every cell of a rows × cols grid per German state.
+
+    Each state's capacity is spread over its cells proportional to their area, so the
+    cells of a state weigh as much as the state's station in `get_german_states`
+    (also with `split_weights`).
+    """
+
+    cells: list[Location] = []
+    for state, bbox in zip(get_german_states(split_weights), get_german_bboxes()):
+        for idx, cell in enumerate(bbox.tile(rows, cols)):
+            share = cell.weight / bbox.weight
+            cells.append(
+                Location(
+                    f"{state.name}-{idx // cols}-{idx % cols}",
+                    round(cell.lat_cnt, 6),
+                    round(cell.lon_cnt, 6),
+                    state.weight * share,
+                    state.sol_weight * share,
+                    state.wnd_weight * share,
+                )
+            )
+
+    return cells
+
+
+def get_german_bboxes() -> list[BBox]:
+    """Return the bounding boxes of all German states (in the order of `get_german_states`)."""
+
+    with open(bbox_filepath) as f:
+        data: dict[str, GeoStateInfo] = json.load(f)
+        return [BBox.fromjson(data[key]) for key in data]
+
+
+def weight_matrix(locs: list[Location]) -> np.ndarray:
+    """Weights of each location (rows) for each merged column (lat, lon, elev, forecast data)."""
+
+    return np.array([[loc.weight_for(k) for k in MERGE_KEYS] for loc in locs])
+
+
+@overload
+def merge_forecasts(
+    forecasts: list[ForecastFrame], weights: list[float] | np.ndarray | None = None
+) -> ForecastFrame: ...
+
+
+@overload
 def merge_forecasts(
     forecasts: list[list[OpenMeteoForecastDataPoint]],
-    weights: list[float] | None = None,
-) -> list[OpenMeteoForecastDataPoint]:
-    """Merges several OpenMeteo forecasts into one, using optional weights."""
+    weights: list[float] | np.ndarray | None = None,
+) -> list[OpenMeteoForecastDataPoint]: ...
+
+
+def merge_forecasts(
+    forecasts: list[ForecastFrame] | list[list[OpenMeteoForecastDataPoint]],
+    weights: list[float] | np.ndarray | None = None,
+) -> ForecastFrame | list[OpenMeteoForecastDataPoint]:
+    """Merges several OpenMeteo forecasts into one, using optional weights.
 
-    w = weights or [1.0 for x in forecasts]
-    w = normalize(w)
+    Weights are either one per forecast, or a (forecast × column) matrix with separate
+    weights for every column in `MERGE_KEYS` (see `weight_matrix`). Missing (None/NaN)
+    values are skipped and the weights of the remaining forecasts are renormalized for
+    that value.
+    """
+
+    w: list[float] | np.ndarray
+    if isinstance(weights, np.ndarray) and weights.ndim == 2:
+        assert weights.shape[1] == len(MERGE_KEYS), (
+            "Weight matrix must have one column per merged column"
+        )
+        w = weights / weights.sum(axis=0)
+    else:
+        w = normalize(list(weights) if weights is not None else [1.0] * len(forecasts))
 
     assert len(forecasts) > 1, "Merging requires at least 2 forecasts"
     assert len(forecasts) == len(w), "Number of forecasts and weights must match"
     for fc in forecasts[1:]:
         assert len(fc) == len(forecasts[0]), "Forecasts have different lengths"
 
-    merged: list[OpenMeteoForecastDataPoint] = [
-        OpenMeteoForecastDataPoint(dp.ts, 0, 0, 0, ZERO_FC_DATA) for dp in forecasts[0]
-    ]
-    for fcidx, fc in enumerate(forecasts):
-        for dpidx, dp in enumerate(merged):
-            assert dp.ts == fc[dpidx].ts
-            dp.lat += fc[dpidx].lat * w[fcidx]
-            dp.lon += fc[dpidx].lon * w[fcidx]
-            dp.elev += fc[dpidx].elev * w[fcidx]
-            for k in OpenMeteoForecastData.__annotations__:
-                v = getattr(dp, k)
-                setattr(dp, k, v + getattr(fc[dpidx], k) * w[fcidx])
-
-    return merged
+    if isinstance(forecasts[0], ForecastFrame):
+        return _merge_frames(forecasts, w)  # type: ignore[arg-type]
+    frames = [ForecastFrame.frompoints(fc) for fc in forecasts]  # type: ignore[arg-type]
+    return _merge_frames(frames, w).topoints()
+
+
+def _merge_frames(
+    frames: list[ForecastFrame], w: list[float] | np.ndarray
+) -> ForecastFrame:
+    """Stacks single-location frames into a (location × hour × variable) array and reduces it."""
+
+    ts = np.stack([fc.ts for fc in frames])
+    assert (ts == ts[0]).all(), "Forecasts have different timestamps"
+
+    keys = list(OpenMeteoForecastData.__annotations__)
+    cube = np.stack(
+        [
+            np.column_stack([fc.lat, fc.lon, fc.elev, *[fc.vals[k] for k in keys]])
+            for fc in frames
+        ]
+    )
+    merged = weighted_nanmean(cube, np.array(w))
+
+    return ForecastFrame(
+        ts[0],
+        merged[:, 0],
+        merged[:, 1],
+        merged[:, 2],
+        {k: merged[:, idx + 3] for idx, k in enumerate(keys)},
+    )
+
+
+def merge_forecasts_db(
+    con: "DuckDBPyConnection",
+    locs: list[Location],
+    start: datetime | None = None,
+    incremental=False,
+    src_tbl="open_meteo_hourly",
+    dst_tbl="open_meteo_agg_hourly",
+    tol=0.1,
+) -> int:
+    """Merges the forecasts of several locations into one inside the DB, using the location weights.
+
+    Source rows are matched to locations within ±`tol`° (exact coordinates for `tol=0`,
+    e.g. for grid cells) and aggregated with one `GROUP BY ts` query. Solar and wind
+    columns are weighted by the locations' solar and wind weights. Hours for which not
+    every location has data are skipped, missing values are skipped with renormalized
+    weights (as in `merge_forecasts`).
+    In incremental mode, only hours whose source rows changed since the last run are
+    recomputed. Otherwise (or when the locations changed), all hours from `start` on are
+    recomputed and earlier merged hours are kept. Merged hours without any source rows
+    are removed. Returns the number of merged hours written.
+    """
+
+    assert len(locs) > 1, "Merging requires at least 2 locations"
+
+    loc_tbl = f"{dst_tbl}_locations"
+    src_state_tbl = f"{dst_tbl}_sources"
+    keys = MERGE_KEYS
+
+    # Start over unless there is a previous run with the same locations
+    [(num_tbls,)] = con.execute(
+        "SELECT count(*) FROM duckdb_tables() WHERE table_name IN (?, ?, ?)",
+        [dst_tbl, loc_tbl, src_state_tbl],
+    ).fetchall()
+    curr_locs = sorted(
+        (loc.name, loc.lat, loc.lon, loc.weight, loc.sol_weight, loc.wnd_weight)
+        for loc in locs
+    )
+    prev_locs = (
+        con.sql(f"SELECT * FROM {loc_tbl} ORDER BY name").fetchall()
+        if num_tbls == 3
+        else []
+    )
+    start_str = start.isoformat() if start else "-infinity"
+    if not incremental or prev_locs != curr_locs:
+        # Merged hours before the start are kept
+        [(has_dst,)] = con.execute(
+            "SELECT count(*) FROM duckdb_tables() WHERE table_name = ?", [dst_tbl]
+        ).fetchall()
+        if has_dst:
+            con.execute(f"DELETE FROM {dst_tbl} WHERE ts >= '{start_str}'")
+        else:
+            OpenMeteoForecastDataPoint.init_table(con, dst_tbl)
+        Location.init_table(con, loc_tbl)
+        Location.upsert_many(locs, con, loc_tbl)
+        con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {src_state_tbl} (
+            ts TIMESTAMP_MS PRIMARY KEY,
+            num_rows BIGINT,
+            checksum UBIGINT
+        );
+        DELETE FROM {src_state_tbl} WHERE ts >= '{start_str}';
+        """)
+
+    join_str = f"""
+        FROM {src_tbl} h
+        JOIN {loc_tbl} l
+          ON {match_locations("h", "l", tol)}
+    """
+    agg_str = ",\n".join(
+        [
+            f"sum(h.{k} * l.{w}) / sum(l.{w}) FILTER (WHERE h.{k} IS NOT NULL) AS {k}"
+            for k, w in zip(keys, map(Location.weight_key, keys))
+        ]
+    )
+
+    con.begin()
+    try:
+        # Find hours whose source rows differ from the last run
+        con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {dst_tbl}_changed AS
+        SELECT src.*
+        FROM (
+            SELECT h.ts, count(*) AS num_rows, bit_xor(hash(h.ts, {", ".join(f"h.{k}" for k in keys)})) AS checksum
+            {join_str}
+            WHERE h.ts >= '{start_str}'
+            GROUP BY h.ts
+        ) src
+        LEFT JOIN {src_state_tbl} prev ON src.ts = prev.ts
+        WHERE prev.ts IS NULL
+           OR prev.num_rows != src.num_rows
+           OR prev.checksum != src.checksum;
+        """)
+        con.execute(f"""
+        DELETE FROM {dst_tbl} WHERE ts IN (SELECT ts FROM {dst_tbl}_changed);
+        """)
+        # Hours whose source rows were all deleted
+        for tbl in [dst_tbl, src_state_tbl]:
+            con.execute(f"""
+            DELETE FROM {tbl}
+            WHERE ts >= '{start_str}'
+              AND ts NOT IN (
+                SELECT DISTINCT h.ts {join_str} WHERE h.ts >= '{start_str}'
+              );
+            """)
+        [(num_hours,)] = con.execute(f"""
+        INSERT INTO {dst_tbl} (ts, {", ".join(keys)})
+        SELECT h.ts, {agg_str}
+        {join_str}
+        WHERE h.ts IN (SELECT ts FROM {dst_tbl}_changed)
+        GROUP BY h.ts
+        HAVING count(DISTINCT l.name) = {len(locs)}
+        """).fetchall()
+        con.execute(f"""
+        INSERT OR REPLACE INTO {src_state_tbl}
+        SELECT * FROM {dst_tbl}_changed;
+        """)
+        con.execute(f"DROP TABLE {dst_tbl}_changed")
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+
+    return num_hours
+
+
+def match_locations(data_alias: str, loc_alias: str, tol: float) -> str:
+    """SQL join condition matching forecast rows to locations within ±`tol`°.
+
+    Uses an equality (hash) join for `tol=0`, which scales to many locations.
+    """
+
+    assert tol >= 0, "Tolerance must be >= 0"
+
+    d, loc = data_alias, loc_alias
+    if tol == 0:
+        return f"{d}.lat = {loc}.lat AND {d}.lon = {loc}.lon"
+    return (
+        f"{d}.lat BETWEEN {loc}.lat - {tol} AND {loc}.lat + {tol} "
+        + f"AND {d}.lon BETWEEN {loc}.lon - {tol} AND {loc}.lon + {tol}"
+    )
@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import date
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_SESSION: requests.Session | None = None
+
+
+class QuotaExceededError(Exception):
+    """Raised when a rate limiter's daily request quota is used up"""
+
+
+def make_http_session(pool_size=16, retries=5, backoff=1.0) -> requests.Session:
+    """Create an HTTP session with pooled keep-alive connections.
+
+    Failed GET requests (429 and 5xx) are retried with exponential backoff, honoring the
+    server's `Retry-After` header.
+    """
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    global HTTP_SESSION
+    if not HTTP_SESSION:
+        HTTP_SESSION = make_http_session()
+    return HTTP_SESSION
+
+
+class RateLimiter:
+    """Thread-safe limiter for the request rate (per second) and the request quota (per day)"""
+
+    def __init__(self, per_sec: float, per_day: float | None = None):
+        assert per_sec > 0, "Rate must be > 0"
+        assert per_day is None or per_day > 0, "Daily quota must be > 0"
+
+        self.per_sec = per_sec
+        self.per_day = per_day
+        self.used = 0.0
+        self._day = date.today()
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        quota = f"{self.used:.0f}/{self.per_day:.0f}" if self.per_day else "no quota"
+        return f"RateLimiter: {self.per_sec:.1f} req/s ({quota})"
+
+    def acquire(self, cost=1.0):
+        """Block until the next request may be sent. `cost` is charged against the daily quota."""
+
+        with self._lock:
+            if date.today() != self._day:
+                self._day = date.today()
+                self.used = 0.0
+            if self.per_day is not None and self.used + cost > self.per_day:
+                raise QuotaExceededError(
+                    f"Daily quota of {self.per_day:.0f} exceeded ({self.used:.0f} used)"
+                )
+            self.used += cost
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + 1 / self.per_sec
+        if wait > 0:
+            time.sleep(wait)
@@ -1,8 +1,42 @@
 from typing import TypeVar
 
+import numpy as np
+
 T = TypeVar("T", int, float)
 
 
 def normalize(vals: list[T]) -> list[float]:
     s = sum(vals)
     return [(e / s) for e in vals]
+
+
+def weighted_nanmean(vals: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted mean over the first axis of an array, ignoring NaN values.
+
+    Weights are either one per entry of the first axis, or a (first × last axis)
+    matrix with separate weights per column. The weights of missing values are
+    redistributed among the remaining values. Where all values are missing, the result
+    is NaN.
+    """
+
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.ndim == 2:
+        assert vals.ndim >= 2, "Weight matrices require at least 2 dimensions"
+        assert weights.shape == (vals.shape[0], vals.shape[-1]), (
+            "Weight matrix must match first and last axis"
+        )
+        w = weights.reshape(weights.shape[0], *[1] * (vals.ndim - 2), -1)
+    else:
+        assert weights.shape == vals.shape[:1], (
+            "Number of weights must match first axis"
+        )
+        w = weights.reshape(-1, *[1] * (vals.ndim - 1))
+
+    valid = ~np.isnan(vals)
+    total = np.sum(np.where(valid, vals, 0) * w, axis=0)
+    if valid.all():
+        return total / weights.sum(axis=0)
+
+    wsum = np.sum(valid * w, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(wsum > 0, total / wsum, np.nan)
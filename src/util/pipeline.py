@@ -0,0 +1,66 @@
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TypeVar
+
+from src.util.http import RateLimiter
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+def fetch_concurrently(
+    tasks: Iterable[T],
+    fetch: Callable[[T], R],
+    write: Callable[[T, R], None],
+    workers=4,
+    limiter: RateLimiter | None = None,
+    cost: Callable[[T], float] | None = None,
+) -> int:
+    """Fetch tasks on a bounded thread pool and write the results from the calling thread.
+
+    Results are written one at a time in order of completion, so `write` doesn't need
+    to be thread-safe (e.g. DuckDB inserts). At most `2 * workers` tasks are in flight.
+    If a fetch fails (e.g. the limiter's quota is used up), pending tasks are cancelled
+    and the error is raised once all completed results are written. Returns the number
+    of written results.
+    """
+
+    assert workers > 0, "Number of workers must be > 0"
+
+    def run(task: T) -> R:
+        if limiter:
+            limiter.acquire(cost(task) if cost else 1.0)
+        return fetch(task)
+
+    num_written = 0
+    error: BaseException | None = None
+    pending: dict[Future[R], T] = {}
+    task_iter = iter(tasks)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while error is None and len(pending) < 2 * workers:
+                task = next(task_iter, _DONE)
+                if task is _DONE:
+                    break
+                pending[pool.submit(run, task)] = task  # type: ignore[arg-type]
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                task = pending.pop(fut)
+                if fut.cancelled():
+                    continue
+                if fut.exception() is not None:
+                    if error is None:
+                        error = fut.exception()
+                        for f in pending:
+                            f.cancel()
+                    continue
+                write(task, fut.result())
+                num_written += 1
+
+    if error is not None:
+        raise error
+    return num_written
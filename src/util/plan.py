@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+from typing import Generic, NamedTuple, TypeVar
+
+K = TypeVar("K")
+
+
+class DateRange(NamedTuple):
+    """Range of days, including start and end"""
+
+    start: date
+    end: date
+
+
+class PlannedRequest(NamedTuple, Generic[K]):
+    """One API request covering several locations and a range of days"""
+
+    keys: list[K]
+    start: date
+    end: date
+
+    @property
+    def num_days(self) -> int:
+        return (self.end - self.start).days + 1
+
+
+def plan_requests(
+    missing: dict[K, list[DateRange]], max_locs=16, max_days=92
+) -> list[PlannedRequest[K]]:
+    """Group missing (location, date range) cells into as few multi-location requests as possible.
+
+    Consecutive days that are missing for the same set of locations are combined into
+    one request, split into chunks of at most `max_locs` locations and `max_days` days.
+    """
+
+    assert max_locs > 0, "Max. number of locations must be > 0"
+    assert max_days > 0, "Max. number of days must be > 0"
+
+    order = {k: idx for idx, k in enumerate(missing)}
+    days: dict[date, set[K]] = {}
+    for k, ranges in missing.items():
+        for r in ranges:
+            assert r.end >= r.start, "Date range must not end before it starts"
+            for n in range((r.end - r.start).days + 1):
+                days.setdefault(r.start + timedelta(days=n), set()).add(k)
+
+    # Sweep days in order and extend the current run while the location set is the same
+    runs: list[tuple[list[K], date, date]] = []
+    for day in sorted(days):
+        keys = sorted(days[day], key=order.__getitem__)
+        if runs:
+            prev_keys, start, end = runs[-1]
+            if (
+                prev_keys == keys
+                and day == end + timedelta(days=1)
+                and (day - start).days < max_days
+            ):
+                runs[-1] = (keys, start, day)
+                continue
+        runs.append((keys, day, day))
+
+    return [
+        PlannedRequest(keys[idx : idx + max_locs], start, end)
+        for keys, start, end in runs
+        for idx in range(0, len(keys), max_locs)
+    ]
@@ -0,0 +1,320 @@
+import itertools
+import math
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+from src.model.search import TrialParams, TrialResult, trial_id
+
+data_dir = os.path.normpath(f"{__file__}/../../../data")
+CKPT_DIR = f"{data_dir}/cache/search"
+
+
+class SharedArray(NamedTuple):
+    """Reference to an array in shared memory, which can be passed to other processes"""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+def share(x: np.ndarray) -> tuple[SharedMemory, SharedArray]:
+    """Copy an array into a new shared memory block (the caller must unlink it)."""
+
+    shm = SharedMemory(create=True, size=max(x.nbytes, 1))
+    np.ndarray(x.shape, x.dtype, shm.buf)[:] = x
+    return shm, SharedArray(shm.name, x.shape, x.dtype.str)
+
+
+def attach(ref: SharedArray) -> tuple[SharedMemory, np.ndarray]:
+    """Map a shared array without copying (keep the block referenced while it's used)."""
+
+    shm = SharedMemory(ref.name)
+    return shm, np.ndarray(ref.shape, np.dtype(ref.dtype), shm.buf)
+
+
+class TrialTask(NamedTuple):
+    """Train a trial from `start` up to `end` epochs, continuing from its checkpoint"""
+
+    params: TrialParams
+    start: int
+    end: int
+    ckpt_path: str
+    horizon: int
+    batch_size: int
+    patience: int
+
+
+class TrialUpdate(NamedTuple):
+    epochs: int
+    val_loss: float
+    stopped: bool
+
+
+# Shared arrays and thread count of the worker process, set once by `init_worker`
+_SHARED: dict[str, tuple[SharedMemory, np.ndarray]] = {}
+_NUM_THREADS = 1
+
+
+def init_worker(refs: dict[str, SharedArray], num_threads: int):
+    """Limit the worker's threads and map the shared training data."""
+
+    global _NUM_THREADS
+    _NUM_THREADS = num_threads
+    # Also caps the OpenMP / MKL pools, which are sized when torch is imported
+    for var in ["OMP_NUM_THREADS", "MKL_NUM_THREADS"]:
+        os.environ[var] = str(num_threads)
+    for k, ref in refs.items():
+        _SHARED[k] = attach(ref)
+
+
+def shared(key: str) -> np.ndarray:
+    return _SHARED[key][1]
+
+
+def run_trial(task: TrialTask) -> TrialUpdate:
+    """Train a GRU/LSTM model on the shared data (see `init_worker`) with early stopping.
+
+    Training stops early once the validation loss hasn't improved for `patience`
+    epochs. Model, optimizer and scheduler state are checkpointed after the last epoch.
+    """
+
+    import torch
+    from torch import optim
+
+    from src.model.dataset import WindowDataset
+    from src.model.rnn import MODELS, eval_loss, train_epoch
+
+    torch.set_num_threads(_NUM_THREADS)
+    p = task.params
+    torch.manual_seed(p["seed"])
+    windows = {
+        k: WindowDataset(
+            shared(f"x_{k}"),
+            shared(f"y_{k}"),
+            p["lookback"],
+            task.horizon,
+            offset=-task.horizon,
+        )
+        for k in ["train", "val"]
+    }
+    train_loader = windows["train"].loader(task.batch_size, shuffle=True)
+    val_loader = windows["val"].loader(task.batch_size)
+
+    model = MODELS[p["model"]](
+        shared("x_train").shape[1], p["num_layers"], p["hidden_size"], p["dropout"]
+    )
+    optimizer = optim.Adam(model.parameters(), lr=p["lr"])
+    scheduler = optim.lr_scheduler.ReduceLROnPlateau(
+        optimizer, mode="min", factor=0.5, patience=5
+    )
+
+    epoch, best_loss, bad_epochs = 0, math.inf, 0
+    best_state = model.state_dict()
+    if task.start > 0 and os.path.exists(task.ckpt_path):
+        ckpt = torch.load(task.ckpt_path, weights_only=False)
+        model.load_state_dict(ckpt["model"])
+        optimizer.load_state_dict(ckpt["optimizer"])
+        scheduler.load_state_dict(ckpt["scheduler"])
+        torch.set_rng_state(ckpt["rng"])
+        epoch, best_loss, bad_epochs = ckpt["epoch"], ckpt["best_loss"], ckpt["bad"]
+        best_state = ckpt["best"]
+
+    while epoch < task.end and bad_epochs < task.patience:
+        train_epoch(model, train_loader, optimizer)
+        val_loss = eval_loss(model, val_loader)
+        scheduler.step(val_loss)
+        epoch += 1
+        if val_loss < best_loss:
+            best_loss, bad_epochs = val_loss, 0
+            best_state = {k: v.clone() for k, v in model.state_dict().items()}
+        else:
+            bad_epochs += 1
+
+    os.makedirs(os.path.dirname(task.ckpt_path), exist_ok=True)
+    torch.save(
+        {
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "scheduler": scheduler.state_dict(),
+            "rng": torch.get_rng_state(),
+            "epoch": epoch,
+            "best_loss": best_loss,
+            "bad": bad_epochs,
+            "best": best_state,
+        },
+        task.ckpt_path,
+    )
+    return TrialUpdate(epoch, best_loss, bad_epochs >= task.patience)
+
+
+def param_grid(
+    models: Sequence[str],
+    num_layers: Sequence[int],
+    hidden_sizes: Sequence[int],
+    lookbacks: Sequence[int] = (24,),
+    lrs: Sequence[float] = (1e-3,),
+    dropout=0.2,
+    runs=1,
+) -> list[TrialParams]:
+    """Every combination of the given hyperparameters, `runs` times with different seeds."""
+
+    return [
+        TrialParams(
+            model=m,
+            num_layers=n,
+            hidden_size=h,
+            dropout=dropout,
+            lr=lr,
+            lookback=lb,
+            seed=s,
+        )
+        for m, n, h, lb, lr, s in itertools.product(
+            models, num_layers, hidden_sizes, lookbacks, lrs, range(runs)
+        )
+    ]
+
+
+def rung_epochs(min_epochs: int, max_epochs: int, eta: int) -> list[int]:
+    """Epochs a trial has been trained for after each rung of successive halving."""
+
+    assert 0 < min_epochs <= max_epochs, "Epochs must be within [1, max_epochs]"
+    assert eta > 1, "Reduction factor must be > 1"
+    epochs = [min_epochs]
+    while epochs[-1] * eta < max_epochs:
+        epochs.append(epochs[-1] * eta)
+    return epochs if epochs[-1] == max_epochs else [*epochs, max_epochs]
+
+
+def search(
+    con: DuckDBPyConnection,
+    name: str,
+    trials: list[TrialParams],
+    data: dict[str, np.ndarray],
+    min_epochs=4,
+    max_epochs=108,
+    eta=3,
+    patience=10,
+    horizon=24,
+    batch_size=8,
+    workers: int | None = None,
+    threads: int | None = None,
+    ckpt_dir=CKPT_DIR,
+    train: Callable[[TrialTask], TrialUpdate] = run_trial,
+    on_result: Callable[[TrialResult], None] | None = None,
+    tbl_name="hyperparam_trials",
+) -> list[TrialResult]:
+    """Run a hyperparameter search with successive halving on a process pool.
+
+    All trials are trained for `min_epochs`, then only the best `1 / eta` of them
+    continue for `eta` times as many epochs, and so on up to `max_epochs`. `data` holds
+    the training and validation inputs (`x_train`, `x_val`) and targets (`y_train`,
+    `y_val`), which are copied into shared memory once and mapped by every worker.
+    Each worker uses `threads` intra-op threads (default: cores / workers).
+    Results are stored in the DB as soon as a trial completes a rung, and trials are
+    checkpointed, so an interrupted search with the same name resumes where it stopped.
+    Returns the final result of every trial, best first.
+    """
+
+    assert len(trials) > 0, "Search requires at least 1 trial"
+    assert set(data) == {"x_train", "y_train", "x_val", "y_val"}, "Missing data"
+    num_cores = os.cpu_count() or 1
+    workers = workers or max(1, min(len(trials), num_cores))
+    threads = threads or max(1, num_cores // workers)
+
+    [(num_tbls,)] = con.execute(
+        "SELECT count(*) FROM duckdb_tables() WHERE table_name = ?", [tbl_name]
+    ).fetchall()
+    if num_tbls == 0:
+        TrialResult.init_table(con, tbl_name)
+    done = {(r.trial, r.rung): r for r in TrialResult.fromdb(con, name, tbl_name)}
+
+    def ckpt_path(params: TrialParams) -> str:
+        return f"{ckpt_dir}/{name}/{trial_id(params)}.pt"
+
+    blocks: list[SharedMemory] = []
+    refs: dict[str, SharedArray] = {}
+    for k, v in data.items():
+        shm, refs[k] = share(np.ascontiguousarray(v))
+        blocks.append(shm)
+
+    alive = {trial_id(p): p for p in trials}
+    latest: dict[str, TrialResult] = {}
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=init_worker,
+            initargs=(refs, threads),
+        ) as pool:
+            prev_epochs = 0
+            for rung, epochs in enumerate(rung_epochs(min_epochs, max_epochs, eta)):
+                results: dict[str, TrialResult] = {}
+                pending = {}
+                for tid, params in alive.items():
+                    if (tid, rung) in done:
+                        results[tid] = done[(tid, rung)]
+                    elif tid in latest and latest[tid].status == "stopped":
+                        # Stopped trials keep their loss without further training
+                        prev = latest[tid]
+                        results[tid] = TrialResult(
+                            name, params, rung, prev.epochs, prev.val_loss, "stopped"
+                        )
+                        TrialResult.upsert_many([results[tid]], con, tbl_name)
+                    else:
+                        task = TrialTask(
+                            params,
+                            prev_epochs,
+                            epochs,
+                            ckpt_path(params),
+                            horizon,
+                            batch_size,
+                            patience,
+                        )
+                        pending[pool.submit(train, task)] = params
+
+                for fut in as_completed(pending):
+                    params = pending[fut]
+                    update = fut.result()
+                    res = TrialResult(
+                        name,
+                        params,
+                        rung,
+                        update.epochs,
+                        update.val_loss,
+                        "stopped" if update.stopped else "trained",
+                    )
+                    TrialResult.upsert_many([res], con, tbl_name)
+                    results[res.trial] = res
+                    if on_result:
+                        on_result(res)
+
+                # Keep the best trials for the next rung
+                ranked = sorted(results.values(), key=lambda r: (r.val_loss, r.trial))
+                num_keep = (
+                    max(1, math.ceil(len(ranked) / eta))
+                    if epochs < max_epochs
+                    else len(ranked)
+                )
+                pruned = []
+                for idx, res in enumerate(ranked):
+                    latest[res.trial] = res
+                    if idx >= num_keep:
+                        del alive[res.trial]
+                        if res.status != "pruned":
+                            res.status = "pruned"
+                            pruned.append(res)
+                TrialResult.upsert_many(pruned, con, tbl_name)
+                prev_epochs = epochs
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    return sorted(latest.values(), key=lambda r: (-r.rung, r.val_loss, r.trial))
@@ -0,0 +1,360 @@
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TypedDict
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+import src.util.log as log
+from src.model.features import (
+    FEATURE_KEYS,
+    LAG_HOURS,
+    LAGGED_KEYS,
+    MARKET_KEYS,
+    WEATHER_KEYS,
+    FeatureMatrix,
+    FeaturesHourly,
+)
+from src.model.open_meteo import ForecastFrame
+from src.util.backtest import DAY_MS, Forecaster, delivery_days, forecast_day
+from src.util.features import MAX_FILL_HOURS, build_features, fetch_columns, from_ms
+from src.util.gaps import HOUR_MS, fill_hourly
+from src.util.tz import from_local_wall_ms
+
+# Fetches the current weather forecast (merged over all locations, in UTC)
+WeatherFetcher = Callable[[], ForecastFrame]
+
+
+class MissingDataError(Exception):
+    """Raised when the data needed for a forecast is missing"""
+
+
+class PriceForecast(TypedDict):
+    day: str
+    ts: list[str]
+    quantiles: list[float]
+    prices: list[list[float]]
+    updated_at: str
+
+
+class LiveWeather:
+    """Fetches the current weather forecast for Germany, merged over the German states.
+
+    The locations are loaded once, requests share the HTTP session and response cache.
+    """
+
+    def __init__(self):
+        from src.util.geo import get_german_states
+
+        self.locs = get_german_states()
+
+    def __call__(self) -> ForecastFrame:
+        from src.api.live import fetch_merged_forecast
+        from src.util.aio import AsyncHttpClient
+
+        return asyncio.run(fetch_merged_forecast(self.locs, AsyncHttpClient()))
+
+
+class ForecastService:
+    """Next-day price forecasts for a long-running process, with warm caches.
+
+    The DB connection, the forecaster (e.g. a loaded model), the features of the last
+    `lookback_days`, the recent market data and the live weather forecast (see
+    `LiveWeather`) are kept in memory. `refresh` only loads what changed since the last
+    refresh, and forecasts are cached until new data arrives. Without `fetch_weather`,
+    only the stored weather forecasts are used.
+    """
+
+    def __init__(
+        self,
+        con: DuckDBPyConnection,
+        forecaster: Forecaster,
+        quantiles=(0.5,),
+        lookback_days=28,
+        fetch_weather: WeatherFetcher | None = None,
+        weather_ttl=3600.0,
+        weather_tbl="open_meteo_agg_hourly",
+    ):
+        assert lookback_days > 0, "Lookback must be > 0 days"
+        assert weather_ttl > 0, "Weather TTL must be > 0"
+
+        self.con = con
+        self.forecaster = forecaster
+        self.quantiles = list(quantiles)
+        self.lookback_days = lookback_days
+        self.fetch_weather = fetch_weather
+        self.weather_ttl = weather_ttl
+        self.weather_tbl = weather_tbl
+        # Guards the DB connection and the caches against concurrent requests
+        self.lock = threading.RLock()
+
+        self.window: FeatureMatrix | None = None
+        self.market: tuple[np.ndarray, dict[str, np.ndarray]] | None = None
+        self.weather: ForecastFrame | None = None
+        self.weather_at = 0.0
+        self.sources: tuple | None = None
+        # Incremented whenever the data changes, which invalidates cached forecasts
+        self.version = 0
+        self.forecasts: dict[tuple[date, int], PriceForecast] = {}
+
+    def __repr__(self):
+        hours = len(self.window) if self.window is not None else 0
+        return (
+            f"ForecastService: {hours} feature hours in memory (version {self.version})"
+        )
+
+    def source_state(self) -> tuple:
+        """Last timestamps of the source tables, which change when new data arrives."""
+
+        [row] = self.con.sql(f"""
+            SELECT (SELECT max(ts) FROM {self.weather_tbl}),
+                   (SELECT max(ts) FROM epex_market)
+        """).fetchall()
+        return row
+
+    def refresh(self, now: datetime | None = None) -> bool:
+        """Load new DB data and re-fetch the weather forecast once it's stale.
+
+        Returns whether any data changed.
+        """
+
+        with self.lock:
+            changed = False
+            try:
+                sources = self.source_state()
+                if sources != self.sources:
+                    build_features(self.con, weather_tbl=self.weather_tbl)
+                    self._load_window(now)
+                    self._load_market(now)
+                    self.sources = sources
+                    changed = True
+
+                if self.fetch_weather and (
+                    self.weather is None
+                    or time.monotonic() - self.weather_at > self.weather_ttl
+                ):
+                    self.weather = self.fetch_weather()
+                    self.weather_at = time.monotonic()
+                    changed = True
+            finally:
+                # Also when the weather fetch fails after new DB data was loaded
+                if changed:
+                    self.version += 1
+                    self.forecasts.clear()
+            return changed
+
+    def _window_start(self, now: datetime | None) -> int:
+        today = np.datetime64((now or datetime.now()).date(), "ms").astype(np.int64)
+        return int(today) - (self.lookback_days + 1) * DAY_MS
+
+    def _load_window(self, now: datetime | None):
+        """Append new feature hours to the window and drop those that are too old."""
+
+        start = self._window_start(now)
+        window = self.window
+        if window is not None and len(window) > 0:
+            last = int(window.ts[-1].astype(np.int64))
+            # The last stored day is recomputed by incremental feature builds
+            keep = window.ts.astype(np.int64) < last - DAY_MS
+            new = FeaturesHourly.load(
+                self.con, start=from_ms(last - DAY_MS), fill_nan=False
+            )
+            keep &= window.ts.astype(np.int64) >= start
+            self.window = FeatureMatrix(
+                np.concatenate([window.ts[keep], new.ts]),
+                np.concatenate([window.x[keep], new.x]),
+                FEATURE_KEYS,
+                new.mean,
+                new.std,
+            )
+        else:
+            self.window = FeaturesHourly.load(
+                self.con, start=from_ms(start), fill_nan=False
+            )
+
+    def _load_market(self, now: datetime | None):
+        """Market data of the last days on a UTC grid, for hours beyond the features."""
+
+        start = self._window_start(now)
+        [(end,)] = self.con.sql("SELECT max(ts) FROM epex_market").fetchall()
+        if end is None:
+            self.market = None
+            return
+        m_wall, m_vals = fetch_columns(
+            self.con, "epex_market", MARKET_KEYS, from_ms(start), end
+        )
+        m_ts = from_local_wall_ms(m_wall)
+        grid = np.arange(start, m_ts[-1] + HOUR_MS, HOUR_MS) if len(m_ts) else m_ts
+        _, vals = fill_hourly(m_ts, m_vals, grid, max_gap=MAX_FILL_HOURS)
+        self.market = grid, vals
+
+    def history(self, end: int) -> FeatureMatrix:
+        """Features of the window up to `end` (in ms), completed with recent data.
+
+        Hours after the stored features get their weather from the live forecast and
+        their (lagged) market data from the recent market data.
+        """
+
+        window = self.window
+        if window is None:
+            raise RuntimeError("Service must be refreshed first")
+        start = end - (self.lookback_days + 2) * DAY_MS
+        grid = np.arange(start, end, HOUR_MS)
+        x = np.full((len(grid), len(FEATURE_KEYS)), np.nan, dtype=window.x.dtype)
+        col = {k: i for i, k in enumerate(FEATURE_KEYS)}
+
+        def fill(
+            ts: np.ndarray, vals: dict[str, np.ndarray], keys: list[tuple[str, str]]
+        ):
+            idx = (ts - start) // HOUR_MS
+            ok = (idx >= 0) & (idx < len(grid))
+            for k, dst in keys:
+                target = x[idx[ok], col[dst]]
+                x[idx[ok], col[dst]] = np.where(np.isnan(target), vals[k][ok], target)
+
+        if len(window) > 0:
+            ts = window.ts.astype(np.int64)
+            idx = (ts - start) // HOUR_MS
+            ok = (idx >= 0) & (idx < len(grid))
+            x[idx[ok]] = window.x[ok]
+        if self.market is not None:
+            m_ts, m_vals = self.market
+            fill(m_ts, m_vals, [(k, k) for k in MARKET_KEYS])
+            fill(
+                m_ts + LAG_HOURS * HOUR_MS,
+                m_vals,
+                list(zip(MARKET_KEYS, LAGGED_KEYS)),
+            )
+        if self.weather is not None:
+            w = self.weather
+            fill(w.ts.astype(np.int64), w.vals, [(k, k) for k in WEATHER_KEYS])
+
+        return FeatureMatrix(
+            grid.astype("datetime64[ms]"), x, FEATURE_KEYS, window.mean, window.std
+        )
+
+    def forecast(self, day: date | None = None) -> PriceForecast:
+        """Price forecast of a local delivery day (default: tomorrow)."""
+
+        day = day or date.today() + timedelta(days=1)
+        with self.lock:
+            if self.window is None:
+                self.refresh()
+            key = (day, self.version)
+            if key in self.forecasts:
+                return self.forecasts[key]
+
+            days = delivery_days(day, day + timedelta(days=1))
+            start, end, gate = (int(v[0]) for v in days[1:])
+            history = self.history(end)
+            weather = history.x[-((end - start) // HOUR_MS) :, : len(WEATHER_KEYS)]
+            if np.isnan(weather).all():
+                raise MissingDataError("Weather of the delivery day is missing")
+            vals = forecast_day(
+                history,
+                self.forecaster,
+                len(self.quantiles),
+                start,
+                end,
+                gate,
+                self.lookback_days,
+            )
+            if vals is None:
+                raise MissingDataError("Features of the delivery day are missing")
+
+            hours = np.arange(start, end, HOUR_MS).astype("datetime64[ms]")
+            res = PriceForecast(
+                day=day.isoformat(),
+                ts=[f"{t}Z" for t in hours.astype("datetime64[s]")],
+                quantiles=self.quantiles,
+                # Hours without a forecast are null
+                prices=[
+                    [None if np.isnan(v) else v for v in row]
+                    for row in np.round(vals, 4).tolist()
+                ],
+                updated_at=datetime.now().isoformat(timespec="seconds"),
+            )
+            self.forecasts[key] = res
+            return res
+
+
+def make_server(
+    service: ForecastService, host="127.0.0.1", port=8050
+) -> ThreadingHTTPServer:
+    """HTTP server for a forecast service (`port` 0 picks a free port).
+
+    - `GET /forecast?day=YYYY-MM-DD` returns the price forecast of a day (default:
+      tomorrow) as JSON
+    - `GET /health` returns the service state
+
+    Missing data results in a 404, any other error (e.g. of the DB or the weather API)
+    in a 503.
+    """
+
+    class RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/forecast":
+                try:
+                    day = date.fromisoformat(query["day"]) if "day" in query else None
+                except ValueError:
+                    return self.respond(400, {"error": "Invalid day"})
+                try:
+                    return self.respond(200, service.forecast(day))
+                except MissingDataError as e:
+                    return self.respond(404, {"error": f"{e}"})
+                except Exception as e:  # noqa: BLE001
+                    # Any other error (e.g. of the DB or the weather API) still gets a
+                    # response, the next request may succeed
+                    log.error("Forecast failed", f" ({e!r})")
+                    return self.respond(503, {"error": "Forecast unavailable"})
+            if url.path == "/health":
+                return self.respond(200, {"status": "ok", "version": service.version})
+            self.respond(404, {"error": "Not found"})
+
+        def respond(self, status: int, data: dict):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(service: ForecastService, host="127.0.0.1", port=8050, refresh_s=600.0):
+    """Serve forecasts until interrupted, refreshing the data every `refresh_s` seconds."""
+
+    service.refresh()
+    server = make_server(service, host, port)
+    stop = threading.Event()
+
+    def refresh():
+        while not stop.wait(refresh_s):
+            try:
+                service.refresh()
+            except Exception as e:  # noqa: BLE001
+                # Keep serving the last data, the next refresh may succeed
+                log.error("Refresh failed", f" ({e})")
+
+    threading.Thread(target=refresh, daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
@@ -0,0 +1,78 @@
+import codecs
+import json
+import re
+from collections.abc import Iterator
+from typing import Any, BinaryIO
+
+CHUNK_SIZE = 1 << 20
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_values(f: BinaryIO, chunk_size=CHUNK_SIZE) -> Iterator[Any]:
+    """Decode a JSON array from a file one element at a time (a single value is yielded as is).
+
+    The file is read in chunks, so only the current element and the undecoded rest of
+    the buffer are held in memory, rather than the whole document.
+    """
+
+    assert chunk_size > 0, "Chunk size must be > 0"
+
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def read():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        eof = len(chunk) == 0
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        pos = WHITESPACE.match(buf, pos).end()  # type: ignore[union-attr]
+        while pos == len(buf) and not eof:
+            read()
+            pos = WHITESPACE.match(buf, pos).end()  # type: ignore[union-attr]
+
+    def decode() -> Any:
+        nonlocal buf, pos
+        while True:
+            try:
+                val, end = decoder.raw_decode(buf, pos)
+                # A number at the end of the buffer might continue in the next chunk
+                if end < len(buf) or eof:
+                    # Drop the decoded text right away
+                    buf = buf[end:]
+                    pos = 0
+                    return val
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            # Read at least as much as is buffered, so large values are decoded in
+            # O(log n) instead of O(n) attempts
+            target = max(1, 2 * (len(buf) - pos))
+            while len(buf) - pos < target and not eof:
+                read()
+
+    skip_whitespace()
+    if buf[pos : pos + 1] != "[":
+        yield decode()
+        return
+
+    pos += 1
+    skip_whitespace()
+    if buf[pos : pos + 1] == "]":
+        return
+    while True:
+        yield decode()
+        skip_whitespace()
+        sep = buf[pos : pos + 1]
+        if sep == "]":
+            return
+        if sep != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+        pos += 1
+        skip_whitespace()
@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+
+DAY_S = 86400
+
+
+def utc_offsets(ts: np.ndarray) -> np.ndarray:
+    """Return the local UTC offset (in s) for every Unix timestamp (in s).
+
+    Offsets are looked up once per day and only resolved per timestamp on days with
+    a daylight-saving transition.
+    """
+
+    ts = np.asarray(ts, dtype=np.int64)
+    if len(ts) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    days, inv = np.unique(ts // DAY_S, return_inverse=True)
+    day_start = np.array([time.localtime(d * DAY_S).tm_gmtoff for d in days])
+    day_end = np.array([time.localtime((d + 1) * DAY_S).tm_gmtoff for d in days])
+    offsets = day_start[inv].astype(np.int64)
+
+    mask = np.isin(inv, np.nonzero(day_start != day_end)[0])
+    offsets[mask] = [time.localtime(t).tm_gmtoff for t in ts[mask].tolist()]
+
+    return offsets
+
+
+def to_local_wall_ms(ts_ms: np.ndarray) -> np.ndarray:
+    """Convert Unix timestamps (in ms) to local wall clock time, expressed as if it were UTC.
+
+    This is the vectorized form of `calendar.timegm(time.localtime(ts / 1e3)) * 1e3`.
+    """
+
+    secs = np.floor_divide(np.asarray(ts_ms, dtype=np.int64), 1000)
+    return (secs + utc_offsets(secs)) * 1000
+
+
+def from_local_wall_ms(wall_ms: np.ndarray) -> np.ndarray:
+    """Convert local wall clock times (in ms, expressed as if they were UTC) back to Unix timestamps (in ms).
+
+    This is the inverse of `to_local_wall_ms`. Wall clock times that occur twice when
+    the clocks fall back resolve to their first occurrence.
+    """
+
+    wall = np.asarray(wall_ms, dtype=np.int64)
+    secs = np.floor_divide(wall, 1000)
+    ms = wall - secs * 1000
+
+    # The offset either side of a transition (at most one per day)
+    before = utc_offsets(secs - DAY_S)
+    after = utc_offsets(secs + DAY_S)
+    first = secs - np.maximum(before, after)
+    second = secs - np.minimum(before, after)
+    ts = np.where(first + utc_offsets(first) == secs, first, second)
+
+    return ts * 1000 + ms
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+def num_windows(
+    num_rows: int, lookback: int, horizon: int, stride: int, offset=0
+) -> int:
+    """Number of (lookback, horizon) windows that fit into `num_rows` rows."""
+
+    assert lookback > 0 and horizon > 0, "Lookback and horizon must be > 0"
+    assert stride > 0, "Stride must be > 0"
+    assert lookback + offset >= 0, "Targets must not start before the window"
+    span = max(lookback, lookback + offset + horizon)
+    return max(0, (num_rows - span) // stride + 1)
+
+
+def sliding_windows(
+    x: np.ndarray,
+    target: int | np.ndarray,
+    lookback=24,
+    horizon=24,
+    stride=24,
+    offset=0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sliding windows over the rows of a (rows × features) matrix, as read-only views.
+
+    Window `i` holds the `lookback` rows starting at row `i * stride` and `horizon`
+    targets, starting `offset` rows after the window (e.g. `-horizon` for the targets
+    of the window's last rows). Targets are either a column of the matrix or a separate
+    series with one value per row. Returns the inputs (windows × lookback × features)
+    and targets (windows × horizon), which share the arrays' memory instead of copying
+    every window.
+    """
+
+    assert x.ndim == 2, "Matrix must be rows × features"
+    x = np.ascontiguousarray(x)
+    if isinstance(target, int):
+        assert 0 <= target < x.shape[1], "Target must be a feature column"
+        y = x[:, target]
+    else:
+        assert target.shape == (len(x),), "Targets must have one value per row"
+        y = target
+    num = num_windows(len(x), lookback, horizon, stride, offset)
+    row, col = x.strides
+
+    inputs = np.lib.stride_tricks.as_strided(
+        x, (num, lookback, x.shape[1]), (stride * row, row, col), writeable=False
+    )
+    targets = np.lib.stride_tricks.as_strided(
+        y[lookback + offset :],
+        (num, horizon),
+        (stride * y.strides[0], y.strides[0]),
+        writeable=False,
+    )
+    return inputs, targets
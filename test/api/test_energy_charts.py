@@ -1,6 +1,8 @@
+from datetime import date
+
 import pytest
 
-from src.api.energy_charts import get_weekly_market_data
+from src.api.energy_charts import get_weekly_market_data, get_weekly_market_frame
 
 
 @pytest.mark.vcr
@@ -9,7 +11,7 @@ def test_get_weekly_market_data():
     with pytest.raises(AssertionError):
         get_weekly_market_data(-1999, 1)
     with pytest.raises(AssertionError):
-        get_weekly_market_data(2026, 1)
+        get_weekly_market_data(date.today().isocalendar().year + 1, 1)
     with pytest.raises(AssertionError):
         get_weekly_market_data(2024, -1)
     with pytest.raises(AssertionError):
@@ -18,3 +20,11 @@ def test_get_weekly_market_data():
     # Works as expected
     md = get_weekly_market_data(2024, 1)
     assert len(md) == 7 * 24
+
+
+@pytest.mark.vcr
+def test_get_weekly_market_frame():
+    mf = get_weekly_market_frame(2024, 1)
+    assert len(mf) == 7 * 24
+    assert mf.ts[1] - mf.ts[0] == 3600 * 1000
+    assert len(mf.vals["daa_price_eurmwh"]) == 7 * 24
@@ -0,0 +1,59 @@
+import asyncio
+import json
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+import src.api.energy_charts as energy_charts
+import src.api.live as live
+from src.api.live import fetch_live_data
+
+SERIES = [
+    "Hydro pumped storage consumption",
+    "Cross border electricity trading",
+    "Non-Renewable",
+    "Renewable",
+    "Load",
+    "Day Ahead Auction",
+    "Intraday Continuous Average Price",
+    "Intraday Continuous Low Price",
+    "Intraday Continuous High Price",
+]
+
+
+def fake_date(today: date) -> type[date]:
+    class FakeDate(date):
+        @classmethod
+        def today(cls):
+            return cls(today.year, today.month, today.day)
+
+    return FakeDate
+
+
+@pytest.mark.parametrize(
+    "today,week",
+    [
+        # ISO week 1 of the next year
+        (date(2024, 12, 30), "2025_01"),
+        # ISO week 53
+        (date(2026, 12, 31), "2026_53"),
+        (date(2027, 1, 3), "2026_53"),
+    ],
+)
+def test_fetch_live_data_year_end(local_server, today, week):
+    def handle(path: str, query: dict[str, str]):
+        data: list[dict] = [{"name": {"en": name}, "data": [1.0]} for name in SERIES]
+        data[0]["xAxisValues"] = [1735513200000]
+        return 200, {}, json.dumps(data).encode()
+
+    server = local_server(handle)
+    with (
+        patch.object(live, "date", fake_date(today)),
+        patch.object(energy_charts, "date", fake_date(today)),
+        patch.object(energy_charts, "MARKET_DATA_URL", server.url),
+    ):
+        forecasts, market = asyncio.run(fetch_live_data({}))
+    assert forecasts == {}
+    assert len(market) == 1
+    assert server.requests == [f"/week_{week}.json"]
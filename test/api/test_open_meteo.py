@@ -1,13 +1,23 @@
+import asyncio
+from datetime import date
+from unittest.mock import patch
+
 import pytest
 from dateutil.parser import parse
 
+import src.api.open_meteo as open_meteo
 from src.api.open_meteo import (
     get_forecast,
+    get_forecast_frames_async,
     get_forecasts,
     get_historical_forecast,
+    get_historical_forecast_frames,
+    get_historical_forecast_frames_async,
     get_historical_forecasts,
+    iter_historical_forecast_frames,
 )
-from src.util.geo import LatLon
+from src.model.geo import LatLon
+from src.util.aio import AsyncHttpClient
 
 
 @pytest.mark.vcr
@@ -80,3 +90,80 @@ def test_get_historical_forecasts():
     assert [getattr(dp, "temperature_2m_degc") for dp in fc[:2]] == [11.7, 11.4]
     assert [getattr(dp, "temperature_2m_degc") for dp in fc[240:242]] == [9.3, 9.3]
     assert [getattr(dp, "temperature_2m_degc") for dp in fc[480:482]] == [16.0, 15.7]
+
+
+@pytest.mark.vcr
+def test_get_historical_forecast_frames(http_cache):
+    locs = [
+        LatLon(48.662587, 9.00161),
+        LatLon(48.917408, 11.4061),
+        LatLon(52.505774, 13.4244),
+    ]
+    fcs = get_historical_forecast_frames(locs, parse("2023-01-01"), parse("2023-01-10"))
+    assert [len(fc) for fc in fcs] == [10 * 24] * 3
+    assert [fc.locations() for fc in fcs] == [
+        [(48.66, 9)],
+        [(48.92, 11.4)],
+        [(52.5, 13.419998)],
+    ]
+    assert fcs[1].vals["temperature_2m_degc"][:2].tolist() == [9.3, 9.3]
+
+    # Serves repeated requests from the cache
+    get_historical_forecast_frames(locs, parse("2023-01-01"), parse("2023-01-10"))
+    assert (http_cache.hits, http_cache.misses) == (1, 1)
+
+
+def test_iter_historical_forecast_frames(local_server, forecast_body):
+    def handle(path: str, query: dict[str, str]):
+        if path == "/partial":
+            query = {**query, "latitude": "48", "longitude": "10"}
+        return 200, {}, forecast_body(query)
+
+    server = local_server(handle)
+    locs = [LatLon(48 + i, 10) for i in range(3)]
+    start, end = date(2023, 1, 1), date(2023, 1, 31)
+
+    # Downloads right away, but decodes one location at a time
+    with patch.object(open_meteo, "HISTORICAL_FORECAST_URL", server.url):
+        frames = iter_historical_forecast_frames(locs, start, end)
+        assert len(server.requests) == 1
+        assert [f.locations() for f in frames] == [[(loc.lat, 10)] for loc in locs]
+        assert frames._f.closed
+
+        # Closes the response file when the reader is closed before reading
+        with iter_historical_forecast_frames(locs, start, end) as frames:
+            f = frames._f
+            assert not f.closed
+        assert f.closed
+
+    # Rejects responses that don't match the requested locations
+    with patch.object(open_meteo, "HISTORICAL_FORECAST_URL", f"{server.url}/partial"):
+        with pytest.raises(AssertionError):
+            list(iter_historical_forecast_frames(locs, start, end))
+
+
+def test_get_forecast_frames_async(local_server, forecast_body):
+    def handle(path: str, query: dict[str, str]):
+        query = {"start_date": "2023-01-01", "end_date": "2023-01-07", **query}
+        return 200, {}, forecast_body(query)
+
+    server = local_server(handle, latency=0.1)
+    locs = [LatLon(48 + i, 10) for i in range(3)]
+    start, end = date(2023, 1, 1), date(2023, 1, 31)
+
+    async def fetch():
+        client = AsyncHttpClient()
+        return await asyncio.gather(
+            get_forecast_frames_async(locs, client),
+            get_historical_forecast_frames_async(locs, start, end, client),
+        )
+
+    with (
+        patch.object(open_meteo, "FORECAST_URL", server.url),
+        patch.object(open_meteo, "HISTORICAL_FORECAST_URL", server.url),
+    ):
+        # Fetches live and historical forecasts concurrently
+        forecasts, historical = asyncio.run(fetch())
+        assert [len(f) for f in forecasts] == [7 * 24] * 3
+        assert [len(f) for f in historical] == [31 * 24] * 3
+        assert len(server.requests) == 2
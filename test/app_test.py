@@ -0,0 +1,80 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["duckdb", "numpy", "pandas", "requests", "torch", "chronos"]
+
+
+def import_times(*args: str) -> list[tuple[str, int]]:
+    """Imports of a Python command with their cumulative time (in µs), from
+    `-X importtime`. Nested imports are indented."""
+
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [
+        (name, int(cumulative))
+        for line in res.stderr.splitlines()
+        if line.startswith("import time:") and "imported package" not in line
+        for _, cumulative, name in [line.split("|")]
+    ]
+
+
+def startup_time(*args: str) -> int:
+    """Total import time (in µs) of a Python command, the fastest of 3 runs."""
+
+    return min(
+        sum(t for name, t in import_times(*args) if not name.startswith("  "))
+        for _ in range(3)
+    )
+
+
+def imported(code: str) -> set[str]:
+    res = subprocess.run(
+        [sys.executable, "-c", f"import sys; {code}; print(*sys.modules)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {name.split(".")[0] for name in res.stdout.split()}
+
+
+def test_startup():
+    modules = {
+        name.strip().split(".")[0]
+        for name, _ in import_times("-m", "src.app", "--help")
+    }
+    assert "argparse" in modules
+    for name in HEAVY_MODULES:
+        assert name not in modules, f"{name} is imported on startup"
+
+    # Relative to the imports of a bare interpreter on the same machine, so it doesn't
+    # depend on the machine's speed (importing NumPy alone takes about 3x as long)
+    total = startup_time("-m", "src.app", "--help")
+    baseline = startup_time("-c", "pass")
+    assert total < 2 * baseline, (
+        f"Startup imports took {total / 1e3:.0f}ms (bare: {baseline / 1e3:.0f}ms)"
+    )
+
+
+@pytest.mark.parametrize(
+    "module,lazy",
+    [
+        ("src.model.geo", ["duckdb", "numpy"]),
+        ("src.util.geo", ["duckdb", "requests"]),
+        ("src.api.open_meteo", ["duckdb", "torch"]),
+        ("src.api.live", ["duckdb", "torch"]),
+        ("src.util.backtest", ["torch", "chronos", "pandas"]),
+        ("src.util.search", ["torch", "pandas"]),
+        ("src.util.service", ["torch", "chronos", "pandas"]),
+        ("src.model.chronos", ["torch", "chronos", "pandas"]),
+    ],
+)
+def test_lazy_imports(module, lazy):
+    modules = imported(f"import {module}")
+    for name in lazy:
+        assert name not in modules, f"{module} imports {name}"
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from collections.abc import Callable, Iterator
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import src.util.cache as cache
+from src.model.open_meteo import ApiForecastValues
+from src.util.cache import ResponseCache
+
+# (path, query) -> (status, headers, body)
+Handler = Callable[[str, dict[str, str]], tuple[int, dict[str, str], bytes]]
+
+
+class LocalServer:
+    """Local stand-in HTTP server with configurable latency and per-request handler"""
+
+    def __init__(self, handle: Handler, latency=0.0):
+        self.handle = handle
+        self.latency = latency
+        self.requests: list[str] = []
+        self.headers: list[dict[str, str]] = []
+        self.lock = threading.Lock()
+        server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append(self.path)
+                    server.headers.append(dict(self.headers))
+                time.sleep(server.latency)
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, headers, body = server.handle(url.path, query)
+                self.send_response(status)
+                for k, v in {**headers, "Content-Length": str(len(body))}.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        )
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def http_cache(tmp_path, monkeypatch) -> ResponseCache:
+    """Isolate each test from the on-disk HTTP response cache."""
+
+    monkeypatch.setattr(cache, "HTTP_CACHE", ResponseCache(f"{tmp_path}/http_cache"))
+    return cache.HTTP_CACHE
+
+
+@pytest.fixture
+def local_server() -> Iterator[Callable[..., LocalServer]]:
+    servers: list[LocalServer] = []
+
+    def start(handle: Handler, latency=0.0) -> LocalServer:
+        servers.append(LocalServer(handle, latency))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def make_forecast_response(lat: float, lon: float, start: date, end: date) -> dict:
+    """Synthetic OpenMeteo API response with constant hourly values."""
+
+    num_hours = ((end - start).days + 1) * 24
+    start_ts = datetime(start.year, start.month, start.day)
+    times = [(start_ts + timedelta(hours=h)).isoformat()[:16] for h in range(num_hours)]
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "generationtime_ms": 0.1,
+        "utc_offset_seconds": 0,
+        "timezone": "GMT",
+        "timezone_abbreviation": "GMT",
+        "elevation": 100.0,
+        "hourly_units": {},
+        "hourly": {
+            "time": times,
+            **{k: [1.0] * num_hours for k in ApiForecastValues.__annotations__},
+        },
+    }
+
+
+def make_forecast_body(query: dict[str, str]) -> bytes:
+    """Respond to an OpenMeteo forecast query for one or more locations."""
+
+    lats = [float(v) for v in query["latitude"].split(",")]
+    lons = [float(v) for v in query["longitude"].split(",")]
+    start = date.fromisoformat(query["start_date"])
+    end = date.fromisoformat(query["end_date"])
+    data = [
+        make_forecast_response(lat, lon, start, end) for lat, lon in zip(lats, lons)
+    ]
+    return json.dumps(data if len(data) > 1 else data[0]).encode()
+
+
+@pytest.fixture
+def forecast_body() -> Callable[[dict[str, str]], bytes]:
+    return make_forecast_body
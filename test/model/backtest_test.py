@@ -0,0 +1,50 @@
+from datetime import date
+
+import duckdb
+import numpy as np
+import pytest
+
+from src.model.backtest import BacktestForecasts, BacktestScore
+
+
+def test_backtest_forecasts():
+    con = duckdb.connect(":memory:")
+    BacktestForecasts.init_table(con)
+    ts = np.datetime64("2024-01-01T00:00", "ms") + np.arange(3) * np.timedelta64(1, "h")
+    day = np.array(["2024-01-01", "2024-01-01", "2024-01-02"], dtype="datetime64[D]")
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        BacktestForecasts.upsert_many("a", day, ts, [0.5], np.zeros((3, 2)), con)
+
+    BacktestForecasts.upsert_many("a", day, ts, [0.1, 0.9], np.zeros((3, 2)), con)
+    BacktestForecasts.upsert_many("b", day[:1], ts[:1], [0.5], np.zeros((1, 1)), con)
+    assert BacktestForecasts.days(con, "a") == {date(2024, 1, 1), date(2024, 1, 2)}
+
+    # Replaces the forecasts of the same days
+    BacktestForecasts.upsert_many("a", day[:1], ts[:1], [0.5], np.ones((1, 1)), con)
+    assert con.sql(
+        "SELECT day, quantile, value FROM backtest_forecasts WHERE name = 'a' ORDER BY ts"
+    ).fetchall() == [
+        (date(2024, 1, 1), 0.5, 1.0),
+        (date(2024, 1, 2), 0.1, 0.0),
+        (date(2024, 1, 2), 0.9, 0.0),
+    ]
+
+    BacktestForecasts.delete(con, "a")
+    assert BacktestForecasts.days(con, "a") == set()
+    assert BacktestForecasts.days(con, "b") == {date(2024, 1, 1)}
+
+
+def test_backtest_score():
+    with pytest.raises(AssertionError):
+        BacktestScore("s", np.ones(23), np.ones(23), np.ones(23), np.ones(23))
+
+    count = np.array([0] + [1] * 22 + [2])
+    mae = np.array([np.nan] + [1.0] * 22 + [4.0])
+    score = BacktestScore("s", count, mae, mae, mae / 2)
+    assert score.total_mae == pytest.approx(30 / 24)
+    assert score.total_rmse == pytest.approx(np.sqrt(54 / 24))
+    assert (
+        f"{score}" == "BacktestScore 's': MAE 1.25, RMSE 1.50, pinball 0.62 (24 hours)"
+    )
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from src.model.chronos import ChronosForecaster
+from src.model.features import FeatureMatrix
+
+
+class FakePipeline:
+    """Forecasts the last context value plus the quantile level, and records every call"""
+
+    def __init__(self):
+        self.calls: list[list[dict]] = []
+
+    def predict_quantiles(self, inputs, prediction_length, quantile_levels, batch_size):
+        self.calls.append(inputs)
+        quantiles = [
+            np.broadcast_to(
+                inp["target"][-1] + np.array(quantile_levels),
+                (1, prediction_length, len(quantile_levels)),
+            )
+            for inp in inputs
+        ]
+        return quantiles, [q[..., 0] for q in quantiles]
+
+
+@pytest.fixture
+def fm() -> FeatureMatrix:
+    ts = np.datetime64("2024-01-01T00:00", "ms") + np.arange(5 * 24) * np.timedelta64(
+        1, "h"
+    )
+    x = np.stack([np.arange(5 * 24), -np.arange(5 * 24)], axis=1).astype(np.float32)
+    return FeatureMatrix(ts, x, ["price", "wind"], np.zeros(2), np.ones(2))
+
+
+def test_chronos_forecaster(fm):
+    pipeline = FakePipeline()
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        ChronosForecaster(pipeline, "price", ["price"])
+    with pytest.raises(AssertionError):
+        ChronosForecaster(pipeline, "price", ["wind"], batch_size=0)
+
+    model = ChronosForecaster(
+        pipeline, "price", ["wind"], context_hours=48, batch_size=2
+    )
+    assert (
+        f"{model}"
+        == "ChronosForecaster: price with 1 covariates (48h → 24h, batches of 2)"
+    )
+    with pytest.raises(AssertionError):
+        model.predict(fm, np.array([0]))
+    with pytest.raises(AssertionError):
+        model.predict(fm, np.array([4 * 24 + 1]))
+
+    # Passes each forecast's own context, in batches
+    out = model.predict(fm, np.array([24, 48, 72]))
+    assert out.shape == (3, 24, 3)
+    assert [len(c) for c in pipeline.calls] == [2, 1]
+    first, second = pipeline.calls[0]
+    assert first["target"].tolist() == list(range(24))
+    assert second["target"].tolist() == list(range(0, 48))
+    assert second["past_covariates"]["wind"].tolist() == [-v for v in range(0, 48)]
+    assert second["future_covariates"]["wind"].tolist() == [-v for v in range(48, 72)]
+    assert pipeline.calls[1][0]["target"].tolist() == list(range(24, 72))
+    # Contexts are views into the feature matrix
+    assert np.shares_memory(first["target"], fm.x)
+
+    assert np.allclose(out[:, 0, 1], [23.5, 47.5, 71.5])
+    assert np.allclose(out[2, :, 0], 71.1)
+    assert model.throughput > 0
+
+
+def test_chronos_forecaster_days(fm):
+    model = ChronosForecaster(FakePipeline(), "price", ["wind"])
+
+    # Forecasts every day with a context and complete covariates
+    ts, out = model.predict_days(fm)
+    assert [f"{t}"[:10] for t in ts.astype("datetime64[D]")] == [
+        "2024-01-02",
+        "2024-01-03",
+        "2024-01-04",
+        "2024-01-05",
+    ]
+    assert out.shape == (4, 24, 3)
+
+    # Forecasts the last hours of a backtest history
+    vals = model(fm, fm.ts[-23:])
+    assert vals.shape == (23, 3)
+    assert np.allclose(vals[:, 1], 96.5)
+
+
+def test_chronos_forecaster_tiny_model(fm):
+    chronos2 = pytest.importorskip("chronos.chronos2")
+    torch = pytest.importorskip("torch")
+
+    # Randomly initialized model, so nothing is downloaded
+    torch.manual_seed(0)
+    config = chronos2.Chronos2CoreConfig(
+        d_model=32,
+        d_kv=8,
+        d_ff=64,
+        num_layers=1,
+        num_heads=4,
+        chronos_config={
+            "context_length": 128,
+            "input_patch_size": 16,
+            "input_patch_stride": 16,
+            "output_patch_size": 16,
+            "quantiles": [0.1, 0.5, 0.9],
+            "use_reg_token": True,
+        },
+    )
+    pipeline = chronos2.Chronos2Pipeline(chronos2.Chronos2Model(config))
+
+    model = ChronosForecaster(
+        pipeline, "price", ["wind"], context_hours=48, batch_size=2, threads=1
+    )
+    out = model.predict(fm, np.array([24, 48, 72]))
+    assert out.shape == (3, 24, 3)
+    assert np.isfinite(out).all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.model.dataset import WindowDataset
+from src.util.windows import sliding_windows
+
+
+@pytest.fixture
+def matrix() -> np.ndarray:
+    return np.arange(30 * 24 * 5, dtype=np.float32).reshape(-1, 5)
+
+
+def test_window_dataset(matrix):
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        WindowDataset(matrix[:, 0], 0)
+    with pytest.raises(AssertionError):
+        WindowDataset(matrix, 5)
+
+    ds = WindowDataset(matrix, 3, lookback=7 * 24, horizon=24, stride=24)
+    inputs, targets = sliding_windows(matrix, 3, 7 * 24, 24, 24)
+    assert len(ds) == len(inputs) == 23
+    assert f"{ds}" == "WindowDataset: 23 windows (168h → 24h, every 24h) over 720 rows"
+
+    # Windows are views into the matrix
+    X, y = ds[2]
+    assert np.array_equal(X.numpy(), inputs[2])
+    assert np.array_equal(y.numpy(), targets[2])
+    assert X.untyped_storage().data_ptr() == ds.x.untyped_storage().data_ptr()
+    assert y.untyped_storage().data_ptr() == ds.x.untyped_storage().data_ptr()
+    assert ds.x.data_ptr() == matrix.ctypes.data
+
+
+def test_window_dataset_loader(matrix):
+    ds = WindowDataset(matrix, 3, lookback=48, horizon=24, stride=12)
+    inputs, targets = sliding_windows(matrix, 3, 48, 24, 12)
+
+    batches = list(ds.loader(batch_size=8))
+    assert [len(X) for X, _ in batches] == [8] * 6 + [7]
+    X, y = batches[1]
+    assert X.shape == (8, 48, 5)
+    assert X.is_contiguous()
+    assert np.array_equal(X.numpy(), inputs[8:16])
+    assert np.array_equal(y.numpy(), targets[8:16])
+
+    # Shuffled batches cover every window once
+    seen = torch.cat([y[:, 0] for _, y in ds.loader(batch_size=8, shuffle=True)])
+    assert sorted(seen.tolist()) == sorted(targets[:, 0].tolist())
+
+
+def test_window_dataset_fromfile(matrix, tmp_path):
+    path = tmp_path / "features.npy"
+    np.save(path, matrix)
+
+    ds = WindowDataset.fromfile(str(path), 3)
+    assert len(ds) == 29
+    X, y = ds[28]
+    assert np.array_equal(X.numpy(), matrix[-48:-24])
+    assert np.array_equal(y.numpy(), matrix[-24:, 3])
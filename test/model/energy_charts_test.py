@@ -1,7 +1,15 @@
+import calendar
+import time
+
 import duckdb
+import numpy as np
 import pytest
 
-from src.model.energy_charts import EpexMarketData, EpexMarketDataPoint
+from src.model.energy_charts import (
+    EpexMarketData,
+    EpexMarketDataPoint,
+    EpexMarketFrame,
+)
 
 
 def test_init(em_data_1):
@@ -39,6 +47,48 @@ def test_upsert_many(em_data_1, em_data_2):
     assert [(2,)] == con.sql(stmt).fetchall()
 
 
+def test_upsert_many_frame(em_data_1):
+    con = duckdb.connect(":memory:")
+    EpexMarketDataPoint.init_table(con)
+
+    # Stores local wall clock time and missing values as NULL
+    ts = np.arange(1729987200000, 1729987200000 + 4 * 3600000, 3600000)
+    frame = EpexMarketFrame.frompoints(
+        [EpexMarketDataPoint(int(t), {**em_data_1, "load_kw": None}) for t in ts]
+    )
+    EpexMarketDataPoint.upsert_many(frame, con)
+    res = con.sql("SELECT epoch_ms(ts), load_kw FROM epex_market ORDER BY ts")
+    expected = sorted(
+        {round(calendar.timegm(time.localtime(t / 1e3)) * 1e3) for t in ts.tolist()}
+    )
+    assert res.fetchall() == [(t, None) for t in expected]
+
+    # Ignores existing rows
+    EpexMarketDataPoint.upsert_many(frame, con)
+    assert [(len(expected),)] == con.sql("SELECT count(*) FROM epex_market").fetchall()
+
+
+def test_frame(em_data_1, em_data_2):
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        EpexMarketFrame(np.array([1, 2]), {"load_kw": np.array([1.0, 2.0])})
+    with pytest.raises(AssertionError):
+        EpexMarketFrame(np.array([1]), {k: np.array([1.0, 2.0]) for k in em_data_1})
+
+    # Converts from and to data points
+    dp1 = EpexMarketDataPoint(1757887200000, vals=em_data_1)
+    dp2 = EpexMarketDataPoint(1757890800000, vals={**em_data_2, "ren_prod_kw": None})
+    frame = EpexMarketFrame.frompoints([dp1, dp2])
+    assert len(frame) == 2
+    assert f"{frame}" == "EpexMarketFrame: 2 data points"
+    assert frame.ts.tolist() == [1757887200000, 1757890800000]
+    assert np.isnan(frame.vals["ren_prod_kw"][1])
+    [p1, p2] = frame.topoints()
+    assert (p1.ts, p2.ts) == (dp1.ts, dp2.ts)
+    assert getattr(p2, "ren_prod_kw") is None
+    assert getattr(p2, "daa_price_eurmwh") == 3.87
+
+
 @pytest.fixture
 def em_data_1() -> EpexMarketData:
     return {
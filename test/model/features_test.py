@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from src.model.features import FeatureMatrix
+
+
+def test_feature_matrix():
+    ts = np.datetime64("2024-01-01T00:00", "ms") + np.arange(4) * np.timedelta64(1, "h")
+    x = np.array([[1, 10], [2, 10], [3, 10], [4, 10]], dtype=np.float32)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        FeatureMatrix(ts[:3], x, ["a", "b"], np.zeros(2), np.ones(2))
+    with pytest.raises(AssertionError):
+        FeatureMatrix(ts, x, ["a", "b"], np.zeros(1), np.ones(2))
+
+    fm = FeatureMatrix(ts, x, ["a", "b"], np.array([2.5, 10]), np.array([0.5, 0]))
+    assert len(fm) == 4
+    assert f"{fm}" == "FeatureMatrix: 4 hours × 2 features"
+    assert fm.col("b").tolist() == [10] * 4
+
+    # Normalizes with the stored stats (constant features are only centered)
+    norm = fm.normalized()
+    assert norm.x.dtype == np.float32
+    assert norm.col("a").tolist() == [-3, -1, 1, 3]
+    assert norm.col("b").tolist() == [0] * 4
+    assert fm.denormalize(norm.col("a"), "a").tolist() == [1, 2, 3, 4]
@@ -15,6 +15,10 @@ def test_init():
         Location("Neverland", 0, -200)
     with pytest.raises(AssertionError):
         Location("Neverland", 0, 200)
+    with pytest.raises(AssertionError):
+        Location("Neverland", 0, 0, 1, sol_weight=-1)
+    with pytest.raises(AssertionError):
+        Location("Neverland", 0, 0, 1, wnd_weight=-1)
 
     # Works as expected
     loc = Location("Bavaria", 48.60359999365066, 11.477256502649954, 26.8)
@@ -22,6 +26,15 @@ def test_init():
     assert loc.lat == 48.60359999365066
     assert loc.lon == 11.477256502649954
     assert loc.weight == 26.8
+    assert (loc.sol_weight, loc.wnd_weight) == (26.8, 26.8)
+
+
+def test_weight_for():
+    loc = Location("Bavaria", 48.6, 11.5, 70, sol_weight=27.1, wnd_weight=2.7)
+    assert loc.weight_for("global_tilted_irradiance_wm2") == 27.1
+    assert loc.weight_for("wind_speed_80m_kmh") == 2.7
+    assert loc.weight_for("temperature_2m_degc") == 70
+    assert loc.weight_for("lat") == 70
 
 
 def test_repr():
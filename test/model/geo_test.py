@@ -39,6 +39,23 @@ def test_repr():
     assert f"{bb}" == "GeoBoundingBox (-90, -90) - (90, 90)"
 
 
+def test_tile(json_data):
+    bb = BBox.fromjson(json_data)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        bb.tile(0, 2)
+
+    # Covers the bounding box with equally sized cells
+    cells = bb.tile(2, 3)
+    assert len(cells) == 6
+    assert (cells[0].min_lat, cells[0].min_lon) == (bb.min_lat, bb.min_lon)
+    assert (cells[-1].max_lat, cells[-1].max_lon) == (bb.max_lat, bb.max_lon)
+    assert cells[1].min_lon == cells[0].max_lon
+    assert cells[3].min_lat == cells[0].max_lat
+    assert sum(c.weight for c in cells) == pytest.approx(bb.weight)
+
+
 def test_fromjson(json_data):
     bb = BBox.fromjson(json_data)
     assert bb.min_lat == 47.2703623267
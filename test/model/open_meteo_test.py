@@ -1,8 +1,13 @@
 import duckdb
+import numpy as np
 import pytest
 from dateutil.parser import parse
 
-from src.model.open_meteo import OpenMeteoForecastData, OpenMeteoForecastDataPoint
+from src.model.open_meteo import (
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
 
 
 def test_init(fc_data_1: OpenMeteoForecastData):
@@ -46,6 +51,32 @@ def test_upsert_many(fc_data_1, fc_data_2):
     stmt = "SELECT count(*) FROM open_meteo_hourly WHERE ts >= '2023-01-01'"
     assert [(2,)] == con.sql(stmt).fetchall()
 
+    # Ignores existing rows
+    OpenMeteoForecastDataPoint.upsert_many([dp1, dp2], con)
+    assert [(2,)] == con.sql(stmt).fetchall()
+
+    # Stores timestamps, coordinates and missing values as expected
+    dp3 = OpenMeteoForecastDataPoint(
+        parse("2023-01-01T02:00"),
+        52.1234567,
+        13,
+        38,
+        {**fc_data_2, "visibility_m": None},
+    )
+    OpenMeteoForecastDataPoint.upsert_many([dp3], con)
+    stmt = """
+        SELECT ts, lat, visibility_m, cloud_cover_low_perc
+        FROM open_meteo_hourly
+        WHERE ts >= '2023-01-01T02:00'
+    """
+    [(ts, lat, vis, ccl)] = con.sql(stmt).fetchall()
+    assert (ts.isoformat()[:16], lat, vis, ccl) == (
+        "2023-01-01T02:00",
+        52.123457,
+        None,
+        29,
+    )
+
 
 def test_fromjson(json_data):
     dps = OpenMeteoForecastDataPoint.fromjson(json_data)
@@ -55,6 +86,90 @@ def test_fromjson(json_data):
     assert getattr(dps[30], "precipitation_mm") == 0.4
 
 
+def test_frame_init(fc_data_1):
+    frame = ForecastFrame.frompoints(
+        [OpenMeteoForecastDataPoint(parse("2023-01-01"), 1, 2, 3, fc_data_1)]
+    )
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        ForecastFrame(frame.ts, frame.lat, frame.lon, frame.elev, {})
+    with pytest.raises(AssertionError):
+        ForecastFrame(frame.ts, frame.lat[:0], frame.lon, frame.elev, frame.vals)
+    with pytest.raises(AssertionError):
+        ForecastFrame(frame.ts, frame.lat + 100, frame.lon, frame.elev, frame.vals)
+    with pytest.raises(AssertionError):
+        ForecastFrame(frame.ts, frame.lat, frame.lon - 200, frame.elev, frame.vals)
+
+    # Works as expected
+    assert len(frame) == 1
+    assert f"{frame}" == "ForecastFrame: 1 data points at 1 location(s)"
+    assert frame.vals["visibility_m"][0] == 24140
+
+
+def test_frame_conversion(json_data):
+    points = OpenMeteoForecastDataPoint.fromjson(json_data)
+    points[3].visibility_m = None  # type: ignore[attr-defined]
+    frame = ForecastFrame.frompoints(points)
+    assert len(frame) == 48
+    assert np.isnan(frame.vals["visibility_m"][3])
+
+    # Converts back to identical data points
+    for dp, fp in zip(points, frame.topoints()):
+        assert (dp.ts, dp.lat, dp.lon, dp.elev) == (fp.ts, fp.lat, fp.lon, fp.elev)
+        for k in OpenMeteoForecastData.__annotations__:
+            assert getattr(dp, k) == getattr(fp, k)
+
+    # Decodes JSON data directly
+    jf = ForecastFrame.fromjson(json_data)
+    assert jf.ts[15] == np.datetime64("2023-01-01T15:00")
+    assert (jf.lat[0], jf.lon[0], jf.elev[0]) == (52.52, 13.419998, 40)
+    assert jf.vals["visibility_m"][25] == 16240
+    assert jf.vals["precipitation_mm"][30] == 0.4
+
+
+def test_frame_slicing(json_data):
+    fc1 = ForecastFrame.fromjson(json_data)
+    fc2 = ForecastFrame.fromjson({**json_data, "latitude": 48.1, "longitude": 11.5})
+    frame = ForecastFrame.concat([fc1, fc2])
+    assert len(frame) == 96
+    assert frame.locations() == [(52.52, 13.419998), (48.1, 11.5)]
+
+    # Slices by time
+    day = frame.between(parse("2023-01-02"), parse("2023-01-03"))
+    assert len(day) == 48
+    assert str(day.ts[0]) == "2023-01-02T00:00:00.000"
+
+    # Slices by location
+    loc = frame.near(48.05, 11.55)
+    assert len(loc) == 48
+    assert loc.locations() == [(48.1, 11.5)]
+    assert [len(f) for f in frame.split()] == [48, 48]
+    assert frame.take(slice(0, 2)).ts.tolist() == fc1.ts[:2].tolist()
+
+    # Moves rows to another location
+    moved = fc1.with_location(52.5, 13.4)
+    assert moved.locations() == [(52.5, 13.4)]
+    assert moved.ts.tolist() == fc1.ts.tolist()
+
+
+def test_frame_db(json_data):
+    con = duckdb.connect(":memory:")
+    OpenMeteoForecastDataPoint.init_table(con)
+    frame = ForecastFrame.fromjson(json_data)
+    frame.vals["visibility_m"][0] = np.nan
+    OpenMeteoForecastDataPoint.upsert_many(frame, con)
+    assert [(48, 47)] == con.sql(
+        "SELECT count(*), count(visibility_m) FROM open_meteo_hourly"
+    ).fetchall()
+
+    # Reads rows back from a query
+    res = ForecastFrame.fromrelation(con.sql("SELECT * FROM open_meteo_hourly"))
+    assert len(res) == 48
+    assert np.isnan(res.vals["visibility_m"][0])
+    assert res.ts.tolist() == frame.ts.tolist()
+
+
 @pytest.fixture
 def fc_data_1() -> OpenMeteoForecastData:
     return {
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.model.dataset import WindowDataset
+from src.model.features import FeatureMatrix
+from src.model.rnn import (
+    GRUModel,
+    LSTMModel,
+    PricePredictor,
+    eval_loss,
+    model_config,
+    train_epoch,
+)
+
+
+@pytest.fixture
+def windows() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(5, 48, 3)).astype(np.float32)
+
+
+@pytest.mark.parametrize("model_cls", [GRUModel, LSTMModel])
+def test_train(model_cls):
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(24 * 10, 3)).astype(np.float32)
+    ds = WindowDataset(x, 0, lookback=48, horizon=24, stride=24, offset=-24)
+    model = model_cls(3, num_layers=1, hidden_size=16)
+
+    loss = eval_loss(model, ds.loader(4))
+    for _ in range(5):
+        train_epoch(
+            model, ds.loader(4, shuffle=True), torch.optim.Adam(model.parameters())
+        )
+    assert eval_loss(model, ds.loader(4)) < loss
+
+
+def test_price_predictor(windows):
+    torch.manual_seed(0)
+    model = GRUModel(3, num_layers=2, hidden_size=16)
+    assert model_config(model) == {
+        "model": "gru",
+        "input_size": 3,
+        "num_layers": 2,
+        "hidden_size": 16,
+        "dropout": 0.2,
+    }
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        PricePredictor(model, price_std=0)
+    with pytest.raises(AssertionError):
+        PricePredictor(model, backend="onnx")  # type: ignore
+
+    pred = PricePredictor(model, price_mean=100, price_std=10)
+    assert f"{pred}" == "PricePredictor: gru 2×16 → 24h (eager)"
+    with pytest.raises(AssertionError):
+        pred.predict(windows[:, :, :2])
+
+    # Predicts the last 24 outputs of each window, scaled to prices
+    prices = pred.predict(windows)
+    assert prices.shape == (5, 24)
+    model.eval()
+    with torch.no_grad():
+        out = model(torch.from_numpy(windows))[:, -24:, 0].numpy()
+    assert np.allclose(prices, out * 10 + 100, atol=1e-4)
+    assert np.allclose(pred.predict(windows[2]), prices[2], atol=1e-4)
+    # Leaves the model trainable
+    assert all(p.requires_grad for p in model.parameters())
+
+    # Compiled and quantized models predict (nearly) the same prices
+    scripted = PricePredictor(model, price_mean=100, price_std=10, backend="script")
+    assert np.allclose(scripted.predict(windows), prices, atol=1e-4)
+    quantized = PricePredictor(model, price_mean=100, price_std=10, quantize=True)
+    assert f"{quantized}" == "PricePredictor: gru 2×16 → 24h (eager, int8)"
+    assert np.abs(quantized.predict(windows) - prices).max() < 1
+
+
+def test_price_predictor_history():
+    model = GRUModel(2, num_layers=1, hidden_size=8)
+    pred = PricePredictor(
+        model, price_mean=50, price_std=5, keys=["b", "c"], lookback=48
+    )
+    ts = np.datetime64("2024-01-01T00:00", "ms") + np.arange(72) * np.timedelta64(
+        1, "h"
+    )
+    x = np.random.default_rng(0).normal(size=(72, 3)).astype(np.float32)
+    x[-5:, 2] = np.nan
+    history = FeatureMatrix(ts, x, ["a", "b", "c"], np.ones(3), np.full(3, 2))
+
+    # Uses the model's features of the last hours, normalized and with unknown values at the mean
+    inputs = (x[-48:, 1:] - 1) / 2
+    inputs[-5:, 1] = 0
+    assert np.allclose(pred(history, ts[-24:]), pred.predict(inputs), atol=1e-5)
+    assert pred(history, ts[-25:]).shape == (25,)
+
+
+def test_price_predictor_file(tmp_path, windows):
+    model = LSTMModel(3, num_layers=1, hidden_size=8)
+    pred = PricePredictor(model, price_mean=50, price_std=5, keys=["a", "b", "c"])
+    pred.save(f"{tmp_path}/model.pt")
+
+    loaded = PricePredictor.fromfile(f"{tmp_path}/model.pt", backend="script")
+    assert f"{loaded}" == "PricePredictor: lstm 1×8 → 24h (script)"
+    assert loaded.keys == ["a", "b", "c"]
+    assert np.allclose(loaded.predict(windows), pred.predict(windows), atol=1e-4)
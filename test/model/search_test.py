@@ -0,0 +1,62 @@
+import duckdb
+import pytest
+
+from src.model.search import TrialParams, TrialResult, trial_id
+
+PARAMS = TrialParams(
+    model="gru",
+    num_layers=2,
+    hidden_size=64,
+    dropout=0.2,
+    lr=1e-3,
+    lookback=24,
+    seed=0,
+)
+
+
+def test_trial_id():
+    # Doesn't depend on the key order
+    reordered = TrialParams(**dict(reversed(list(PARAMS.items()))))
+    assert trial_id(reordered) == trial_id(PARAMS)
+    assert len(trial_id(PARAMS)) == 12
+    assert trial_id({**PARAMS, "seed": 1}) != trial_id(PARAMS)
+
+
+def test_trial_result():
+    with pytest.raises(AssertionError):
+        TrialResult("s", PARAMS, -1, 4, 0.5)
+    with pytest.raises(AssertionError):
+        TrialResult("s", PARAMS, 0, 4, 0.5, "unknown")  # type: ignore
+
+    res = TrialResult("s", PARAMS, 0, 4, 0.5)
+    assert res.trial == trial_id(PARAMS)
+    assert (
+        f"{res}" == "TrialResult: gru 2×64 (lookback 24h, run 0) 0.5000 after 4 epochs "
+        "[trained]"
+    )
+
+
+def test_trial_result_db():
+    con = duckdb.connect(":memory:")
+    TrialResult.init_table(con)
+    other = TrialParams(**{**PARAMS, "hidden_size": 128})
+    TrialResult.upsert_many(
+        [
+            TrialResult("s", PARAMS, 0, 4, 0.5),
+            TrialResult("s", other, 0, 4, 0.25),
+            TrialResult("t", PARAMS, 0, 4, 0.1),
+        ],
+        con,
+    )
+
+    # Replaces results of the same rung
+    TrialResult.upsert_many([TrialResult("s", PARAMS, 0, 4, 0.5, "pruned")], con)
+    TrialResult.upsert_many([TrialResult("s", other, 1, 12, 0.2)], con)
+
+    results = TrialResult.fromdb(con, "s")
+    assert [(r.params, r.rung, r.epochs, r.val_loss, r.status) for r in results] == [
+        (other, 0, 4, 0.25, "trained"),
+        (PARAMS, 0, 4, 0.5, "pruned"),
+        (other, 1, 12, 0.2, "trained"),
+    ]
+    assert TrialResult.fromdb(con, "u") == []
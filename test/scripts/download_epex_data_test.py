@@ -0,0 +1,128 @@
+import json
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import duckdb
+import pytest
+from requests.exceptions import RetryError
+
+import src.api.energy_charts as energy_charts
+import src.util.db as db
+import src.util.http as http
+from src.model.energy_charts import EpexMarketDataPoint, EpexMarketFrame
+from src.scripts.download_epex_data import backfill, missing_weeks
+from src.util.http import RateLimiter, make_http_session
+
+SERIES = [
+    "Hydro pumped storage consumption",
+    "Cross border electricity trading",
+    "Non-Renewable",
+    "Renewable",
+    "Load",
+    "Day Ahead Auction",
+    "Intraday Continuous Average Price",
+    "Intraday Continuous Low Price",
+    "Intraday Continuous High Price",
+]
+
+
+def make_week_body(year: int, week: int, value=1.0) -> bytes:
+    """Synthetic energy-charts response with hourly values for an ISO week."""
+
+    tz = ZoneInfo("Europe/Berlin")
+    start = datetime.fromisocalendar(year, week, 1).replace(tzinfo=tz)
+    end = (start + timedelta(days=7)).replace(tzinfo=tz)
+    times = list(range(int(start.timestamp()), int(end.timestamp()), 3600))
+    data: list[dict] = [
+        {"name": {"en": name}, "data": [value] * len(times)} for name in SERIES
+    ]
+    data[0]["xAxisValues"] = [t * 1000 for t in times]
+    return json.dumps(data).encode()
+
+
+def test_missing_weeks():
+    assert len(missing_weeks(2022, 2023, set())) == 104
+    assert missing_weeks(2023, 2023, {(2023, w) for w in range(2, 53)}) == [(2023, 1)]
+    assert missing_weeks(2099, 2099, set()) == []
+
+    # Includes ISO week 53
+    assert missing_weeks(2020, 2020, {(2020, w) for w in range(1, 53)}) == [(2020, 53)]
+
+    # Re-fetches complete weeks whose data isn't final yet
+    year, week, _ = (date.today() - timedelta(days=7)).isocalendar()
+    assert (year, week) in missing_weeks(year, year, {(year, week)})
+
+
+def test_backfill(local_server):
+    failing = {(2023, 13)}
+
+    def handle(path: str, query: dict[str, str]):
+        year, week = map(int, path.removesuffix(".json").split("_")[-2:])
+        if (year, week) in failing:
+            return 500, {}, b"Internal server error"
+        return 200, {"Content-Type": "application/json"}, make_week_body(year, week)
+
+    server = local_server(handle)
+    con = duckdb.connect(":memory:")
+    limiter = RateLimiter(1000)
+    with (
+        patch.object(db, "DB_CONN", con),
+        patch.object(http, "HTTP_SESSION", make_http_session(retries=1, backoff=0)),
+        patch.object(energy_charts, "MARKET_DATA_URL", server.url),
+    ):
+        # Stops on errors, but keeps the weeks written so far
+        with pytest.raises(RetryError):
+            backfill(2023, 2023, workers=1, limiter=limiter)
+        complete = EpexMarketDataPoint.complete_weeks(con)
+        assert (2023, 12) in complete
+        assert (2023, 13) not in complete
+
+        # Resumes with the missing weeks only
+        failing.clear()
+        num_requests = len(server.requests)
+        backfill(2023, 2023, workers=4, limiter=limiter)
+        assert len(server.requests) - num_requests == 52 - len(complete)
+        assert len(EpexMarketDataPoint.complete_weeks(con)) == 52
+
+        # Spring forward (week 12) has 167 hours, fall back (week 43) 168 wall-clock hours
+        stmt = "SELECT week(ts), count(*) FROM epex_market GROUP BY ALL"
+        hours = dict(con.sql(stmt).fetchall())
+        assert hours[12] == 167
+        assert hours[43] == 168
+
+        # Does nothing when up to date
+        num_requests = len(server.requests)
+        backfill(2023, 2023, limiter=limiter)
+        assert len(server.requests) == num_requests
+
+
+def test_backfill_refetches_recent_weeks(local_server):
+    def handle(path: str, query: dict[str, str]):
+        year, week = map(int, path.removesuffix(".json").split("_")[-2:])
+        return 200, {"Content-Type": "application/json"}, make_week_body(year, week)
+
+    server = local_server(handle)
+    con = duckdb.connect(":memory:")
+    EpexMarketDataPoint.init_table(con)
+    # Last week is complete, but not final, and its prices are still missing
+    year, week, _ = (date.today() - timedelta(days=7)).isocalendar()
+    body = make_week_body(year, week, float("nan"))
+    EpexMarketDataPoint.upsert_many(EpexMarketFrame.fromjson(json.loads(body)), con)
+    assert (year, week) in EpexMarketDataPoint.complete_weeks(con)
+
+    with (
+        patch.object(db, "DB_CONN", con),
+        patch.object(energy_charts, "MARKET_DATA_URL", server.url),
+    ):
+        backfill(year, year, workers=4, limiter=RateLimiter(1000))
+    assert f"/week_{year}_{week:02d}.json" in server.requests
+
+    # The re-fetched values replace the stored ones
+    stmt = """
+        SELECT count(*), count(daa_price_eurmwh), min(daa_price_eurmwh)
+        FROM epex_market WHERE isoyear(ts) = ? AND week(ts) = ?
+    """
+    num, num_prices, price = con.execute(stmt, [year, week]).fetchall()[0]
+    assert num == num_prices >= 167
+    assert price == 1.0
@@ -0,0 +1,38 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+import src.util.http as http
+from src.util.aio import AsyncHttpClient
+from src.util.http import make_http_session
+
+
+def test_async_http_client(local_server):
+    server = local_server(lambda path, query: (200, {}, path.encode()), latency=0.1)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        AsyncHttpClient(max_concurrency=0)
+    with pytest.raises(AssertionError):
+        AsyncHttpClient(timeout=0)
+
+    async def fetch(client: AsyncHttpClient, num: int) -> list[bytes]:
+        urls = [f"{server.url}/{i}" for i in range(num)]
+        return await asyncio.gather(*[client.get(url) for url in urls])
+
+    with patch.object(http, "HTTP_SESSION", make_http_session(retries=0)):
+        client = AsyncHttpClient(max_concurrency=4, timeout=5)
+        assert f"{client}" == "AsyncHttpClient: 4 concurrent requests, 5s timeout"
+
+        # Runs requests concurrently, up to the concurrency limit
+        t0 = time.monotonic()
+        assert asyncio.run(fetch(client, 8)) == [f"/{i}".encode() for i in range(8)]
+        dur = time.monotonic() - t0
+        assert 2 * 0.1 <= dur < 8 * 0.1
+
+        # Times out slow requests
+        server.latency = 0.5
+        with pytest.raises(TimeoutError):
+            asyncio.run(AsyncHttpClient(timeout=0.2).get(f"{server.url}/slow"))
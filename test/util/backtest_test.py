@@ -0,0 +1,153 @@
+from datetime import date
+
+import duckdb
+import numpy as np
+import pytest
+
+from src.model.backtest import BacktestForecasts
+from src.model.features import FEATURE_KEYS, FeatureMatrix, FeaturesHourly
+from src.util.backtest import (
+    HOUR_MS,
+    backtest,
+    day_history,
+    delivery_days,
+    known_until,
+    score,
+    seasonal_naive,
+)
+
+
+@pytest.fixture
+def con() -> duckdb.DuckDBPyConnection:
+    """Features from March 1st to April 10th 2024 (UTC), with a price that rises daily."""
+
+    con = duckdb.connect(":memory:")
+    FeaturesHourly.init_table(con)
+    ts = np.arange(
+        np.datetime64("2024-03-01T00:00", "ms"),
+        np.datetime64("2024-04-10T00:00", "ms"),
+        np.timedelta64(1, "h"),
+    )
+    hours = np.arange(len(ts), dtype=np.float64)
+    vals = {k: hours.copy() for k in FEATURE_KEYS}
+    vals["daa_price_eurmwh"] = hours // 24
+    vals["daa_price_eurmwh_lag24h"] = hours // 24 - 1
+    FeaturesHourly.upsert_many(ts, vals, con)
+    FeaturesHourly.update_stats(con)
+    return con
+
+
+def test_delivery_days():
+    days = delivery_days(date(2024, 3, 30), date(2024, 4, 1))
+    assert days.day.tolist() == [date(2024, 3, 30), date(2024, 3, 31)]
+    # Starts at local midnight and closes at noon on the day before
+    assert days.start.astype("datetime64[ms]").tolist()[0].isoformat() == (
+        "2024-03-29T23:00:00"
+    )
+    assert ((days.end - days.start) // HOUR_MS).tolist() == [24, 23]
+    assert ((days.start - days.gate) // HOUR_MS).tolist() == [12, 12]
+
+    days = delivery_days(date(2024, 10, 27), date(2024, 10, 28))
+    assert ((days.end - days.start) // HOUR_MS).tolist() == [25]
+    assert ((days.start - days.gate) // HOUR_MS).tolist() == [12]
+
+
+def test_day_history(con):
+    keys = ["temperature_2m_degc", "load_kw", "daa_price_eurmwh", "load_kw_lag24h"]
+    fm = FeaturesHourly.load(con, keys)
+    days = delivery_days(date(2024, 3, 10), date(2024, 3, 11))
+    start, end, gate = int(days.start[0]), int(days.end[0]), int(days.gate[0])
+
+    until = known_until(keys, start, gate)
+    assert until[1:].tolist() == [gate, start, gate + 24 * HOUR_MS]
+
+    history = day_history(fm, start, end, gate, lookback_days=2)
+    assert isinstance(history, FeatureMatrix)
+    assert len(history) == 3 * 24
+    assert history.ts[-24].astype(np.int64) == start
+    # Weather is known for the delivery day, market data only up to gate closure
+    known = ~np.isnan(history.x)
+    assert known.sum(axis=0).tolist() == [72, 24 + 12, 48, 48 + 12]
+    assert not np.isnan(history.col("load_kw")[: 24 + 12]).any()
+    # Doesn't change the loaded features
+    assert not np.isnan(fm.x).any()
+
+    # Skips days without features
+    days = delivery_days(date(2024, 4, 10), date(2024, 4, 11))
+    start, end, gate = int(days.start[0]), int(days.end[0]), int(days.gate[0])
+    assert day_history(fm, start, end, gate, 2) is None
+
+
+def test_backtest(con):
+    start, end = date(2024, 3, 25), date(2024, 4, 12)
+    days_seen = []
+
+    # Forecasts every day with complete features (up to April 9th)
+    num = backtest(
+        con, "naive", seasonal_naive, start, end, workers=1, on_day=days_seen.append
+    )
+    assert num == 16
+    assert days_seen[0] == date(2024, 3, 25) and days_seen[-1] == date(2024, 4, 9)
+    [(rows,)] = con.sql("SELECT count(*) FROM backtest_forecasts").fetchall()
+    assert rows == 16 * 24 - 1
+
+    # Doesn't forecast cached days again
+    assert backtest(con, "naive", seasonal_naive, start, end, workers=1) == 0
+    assert (
+        backtest(con, "naive", seasonal_naive, start, end, workers=1, reset=True) == 16
+    )
+
+    # Parallel runs forecast the same values
+    assert backtest(con, "parallel", seasonal_naive, start, end, workers=2) == 16
+    assert BacktestForecasts.days(con, "parallel") == BacktestForecasts.days(
+        con, "naive"
+    )
+    [(num_same,)] = con.sql("""
+        SELECT count(*)
+        FROM backtest_forecasts a JOIN backtest_forecasts b USING (ts, quantile)
+        WHERE a.name = 'naive' AND b.name = 'parallel' AND a.value = b.value
+    """).fetchall()
+    assert num_same == rows
+
+    # Price rises by 1 every day, so the previous day's price is off by 1
+    res = score(con, "naive")
+    assert res.count.tolist() == [16] * 2 + [15] + [16] * 21
+    assert np.allclose(res.mae, 1) and np.allclose(res.rmse, 1)
+    assert np.allclose(res.pinball, 0.5)
+    assert (
+        f"{res}"
+        == "BacktestScore 'naive': MAE 1.00, RMSE 1.00, pinball 0.50 (383 hours)"
+    )
+    assert score(con, "naive", start=date(2024, 4, 1)).count.sum() == 9 * 24
+
+
+def test_backtest_quantiles(con):
+    def forecaster(history: FeatureMatrix, hours: np.ndarray) -> np.ndarray:
+        naive = seasonal_naive(history, hours)
+        return np.stack([naive - 1, naive, naive + 1], axis=1)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        backtest(
+            con,
+            "q",
+            forecaster,
+            date(2024, 3, 25),
+            date(2024, 3, 26),
+            quantiles=(0.5,),
+            workers=1,
+        )
+
+    num = backtest(
+        con,
+        "q",
+        forecaster,
+        date(2024, 3, 25),
+        date(2024, 3, 27),
+        quantiles=(0.1, 0.5, 0.9),
+        workers=1,
+    )
+    assert num == 2
+    res = score(con, "q")
+    assert res.total_mae == pytest.approx(1)
+    assert res.total_pinball == pytest.approx((0.1 * 2 + 0.5 * 1 + 0) / 3)
@@ -0,0 +1,104 @@
+import glob
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+import src.util.cache as cache
+import src.util.http as http
+from src.util.cache import ResponseCache, get_http_cache, normalize_url
+from src.util.http import make_http_session
+
+
+def test_normalize_url():
+    assert (
+        normalize_url("HTTPS://Example.com/data?b=2&a=1#top")
+        == "https://example.com/data?a=1&b=2"
+    )
+
+
+def test_get_http_cache(tmp_path):
+    with (
+        patch.object(cache, "HTTP_CACHE", None),
+        patch.object(cache, "HTTP_CACHE_DIR", f"{tmp_path}/cache"),
+    ):
+        # Inits new cache and re-uses it
+        c = get_http_cache()
+        assert get_http_cache() is c
+        assert os.path.isdir(f"{tmp_path}/cache")
+
+
+def test_response_cache(tmp_path, local_server):
+    def handle(path: str, query: dict[str, str]):
+        if path == "/error":
+            return 500, {}, b"Internal server error"
+        if server.headers[-1].get("If-None-Match") == '"v1"':
+            return 304, {}, b""
+        return 200, {"ETag": '"v1"'}, f"{path}?{query.get('q', '')}".encode()
+
+    server = local_server(handle)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        ResponseCache(f"{tmp_path}/cache", max_bytes=0)
+
+    with patch.object(http, "HTTP_SESSION", make_http_session(retries=0)):
+        c = ResponseCache(f"{tmp_path}/cache", max_bytes=30, ttl=60)
+
+        # Caches responses by normalized URL
+        assert c.get(f"{server.url}/a?q=1&r=2") == b"/a?1"
+        assert c.get(f"{server.url}/a?r=2&q=1") == b"/a?1"
+        assert (c.hits, c.misses) == (1, 1)
+        assert len(server.requests) == 1
+
+        # Revalidates expired responses
+        c.ttl = 0
+        assert c.get(f"{server.url}/a?q=1&r=2") == b"/a?1"
+        assert c.revalidations == 1
+        assert len(server.requests) == 2
+
+        # Fetches again unconditionally if the body is gone when revalidating
+        for path in glob.glob(f"{tmp_path}/cache/**/*.body", recursive=True):
+            os.remove(path)
+        c.size = 0
+        assert c.get(f"{server.url}/a?q=1&r=2") == b"/a?1"
+        assert (c.revalidations, c.misses) == (1, 2)
+        assert len(server.requests) == 4
+        assert "If-None-Match" not in server.headers[-1]
+
+        # Never revalidates immutable responses
+        assert c.get(f"{server.url}/b", immutable=True) == b"/b?"
+        assert c.get(f"{server.url}/b", immutable=True) == b"/b?"
+        assert len(server.requests) == 5
+
+        # Doesn't cache errors
+        with pytest.raises(requests.RequestException):
+            c.get(f"{server.url}/error")
+        assert c.size == 7
+
+        # Evicts the least recently used responses
+        c.ttl = 60
+        for q in range(5):
+            c.get(f"{server.url}/c?q={q}")
+        time.sleep(0.01)
+        c.get(f"{server.url}/a?q=1&r=2")
+        for q in range(5, 7):
+            c.get(f"{server.url}/c?q={q}")
+        assert c.size <= 30
+        assert c.get(f"{server.url}/a?q=1&r=2") == b"/a?1"
+        num_requests = len(server.requests)
+        c.get(f"{server.url}/b", immutable=True)
+        assert len(server.requests) == num_requests + 1
+
+        # Picks up existing responses from disk
+        c2 = ResponseCache(f"{tmp_path}/cache", max_bytes=30)
+        assert c2.size == c.size
+        assert (
+            f"{c2}" == "ResponseCache: 0.0/0.0 MB (0 hits, 0 misses, 0 revalidations)"
+        )
+
+        c2.clear()
+        assert c2.size == 0
+        assert os.listdir(f"{tmp_path}/cache") == []
@@ -0,0 +1,63 @@
+from datetime import date, datetime
+
+import duckdb
+import numpy as np
+import pytest
+
+from src.model.forecast import Location
+from src.model.open_meteo import (
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+from src.util.coverage import CoverageIndex
+from src.util.plan import DateRange
+
+
+def make_frame(lat: float, lon: float, start: str, num_hours: int) -> ForecastFrame:
+    ts = np.datetime64(start, "h") + np.arange(num_hours).astype("timedelta64[h]")
+    ones = np.ones(num_hours)
+    vals = {k: ones for k in OpenMeteoForecastData.__annotations__}
+    return ForecastFrame(ts, ones * lat, ones * lon, ones, vals)
+
+
+def test_coverage_index():
+    con = duckdb.connect(":memory:")
+    OpenMeteoForecastDataPoint.init_table(con)
+    locs = [Location("A", 50.05, 10), Location("B", 48, 11), Location("C", 52, 13)]
+
+    # Location A: 3 full days with a missing hour on day 2
+    frame = make_frame(50, 10, "2023-03-01", 3 * 24)
+    frame = frame.take(frame.ts != np.datetime64("2023-03-02T05:00"))
+    OpenMeteoForecastDataPoint.upsert_many(frame, con)
+    # Location B: first and last day only
+    OpenMeteoForecastDataPoint.upsert_many(make_frame(48, 11, "2023-03-01", 24), con)
+    OpenMeteoForecastDataPoint.upsert_many(make_frame(48, 11, "2023-03-04", 24), con)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        CoverageIndex.build(con, locs, date(2023, 3, 4), date(2023, 3, 1))
+    with pytest.raises(AssertionError):
+        CoverageIndex(locs, date(2023, 3, 1), np.zeros((1, 4)))
+
+    # Reports exactly which hours are missing
+    idx = CoverageIndex.build(con, locs, date(2023, 3, 1), date(2023, 3, 4))
+    assert f"{idx}" == "CoverageIndex: 3 locations × 4 days (41.3% covered)"
+    assert idx.num_missing().tolist() == [25, 48, 96]
+    assert idx.missing_hours(locs[0])[0] == np.datetime64("2023-03-02T05")
+    assert len(idx.missing_hours(locs[2])) == 96
+
+    # Reports missing day ranges
+    assert idx.missing_ranges() == {
+        locs[0]: [
+            DateRange(date(2023, 3, 2), date(2023, 3, 2)),
+            DateRange(date(2023, 3, 4), date(2023, 3, 4)),
+        ],
+        locs[1]: [DateRange(date(2023, 3, 2), date(2023, 3, 3))],
+        locs[2]: [DateRange(date(2023, 3, 1), date(2023, 3, 4))],
+    }
+
+    # Reports the latest covered hour
+    assert idx.last_hour(locs[0]) == datetime(2023, 3, 3, 23)
+    assert idx.last_hour(locs[1]) == datetime(2023, 3, 4, 23)
+    assert idx.last_hour(locs[2]) is None
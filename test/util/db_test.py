@@ -2,8 +2,9 @@ import os
 from unittest.mock import patch
 
 import duckdb
+import numpy as np
 
-from src.util.db import get_db_connection
+from src.util.db import get_db_connection, insert_columns
 
 data_dir = os.path.normpath(f"{__file__}/../../../data")
 
@@ -18,3 +19,20 @@ def test_get_db_connection():
         conn2 = get_db_connection()
         assert conn2 == conn1
         mock_connect.assert_called_once_with(f"{data_dir}/db/local.db")
+
+
+def test_insert_columns():
+    con = duckdb.connect(":memory:")
+    con.execute("CREATE TABLE t (ts TIMESTAMP_MS PRIMARY KEY, a DOUBLE, b DOUBLE)")
+    ts = np.array(["2023-01-01T00:00", "2023-01-01T01:00"], dtype="datetime64[ms]")
+
+    # Inserts rows and converts NaN to NULL
+    insert_columns(con, "t", {"ts": ts, "a": np.array([1.5, np.nan])})
+    assert con.sql("SELECT a, b FROM t ORDER BY ts").fetchall() == [
+        (1.5, None),
+        (None, None),
+    ]
+
+    # Ignores rows with existing keys
+    insert_columns(con, "t", {"ts": ts[:1], "b": np.array([2.0])})
+    assert con.sql("SELECT count(*), count(b) FROM t").fetchall() == [(2, 0)]
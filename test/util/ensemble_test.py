@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from src.util.ensemble import (
+    blend_grid,
+    combine,
+    fit_weights,
+    local_day_hour,
+    rolling_weights,
+)
+
+
+@pytest.fixture
+def hourly() -> np.ndarray:
+    start = np.datetime64("2024-01-01T00:00", "ms")
+    return start + np.arange(60 * 24) * np.timedelta64(1, "h")
+
+
+def test_local_day_hour():
+    ts = np.array(
+        ["2024-03-30T22:00", "2024-03-30T23:00", "2024-03-31T01:00"],
+        dtype="datetime64[ms]",
+    )
+    day, hour = local_day_hour(ts)
+    assert (day - day[0]).tolist() == [0, 1, 1]
+    assert hour.tolist() == [23, 0, 3]
+
+
+def test_blend_grid():
+    rng = np.random.default_rng(0)
+    actual = rng.normal(size=1000)
+    base = actual + rng.normal(size=1000)
+    pred = actual + rng.normal(size=1000)
+    pred[0] = np.nan
+
+    factors, err = blend_grid(base, pred, actual)
+    assert len(factors) == len(err) == 101
+    # Same as evaluating each factor on its own
+    f = 0.3
+    blend = (1 - f) * base + f * pred
+    assert err[30] == pytest.approx(np.nanmean(np.abs(actual - blend)))
+    # Equally good forecasts are best blended half and half
+    assert factors[np.argmin(err)] == pytest.approx(0.5, abs=0.1)
+
+    hours = np.arange(1000) % 24
+    _, err_hourly = blend_grid(base, pred, actual, np.array([0, 1]), hours)
+    assert err_hourly.shape == (24, 2)
+    mask = (hours == 5) & ~np.isnan(pred)
+    assert err_hourly[5, 0] == pytest.approx(np.abs(actual - base)[mask].mean())
+
+
+def test_fit_weights():
+    rng = np.random.default_rng(0)
+    preds = rng.normal(size=(2000, 3))
+    actual = preds @ np.array([0.5, 0.3, 0.2])
+
+    # Recovers exact weights, even with missing values
+    preds[0, 1] = np.nan
+    assert np.allclose(fit_weights(preds, actual), [0.5, 0.3, 0.2])
+    # Matches the unconstrained least squares solution when that sums to 1
+    actual_noisy = actual + rng.normal(scale=0.1, size=2000)
+    w = fit_weights(preds, actual_noisy)
+    assert w.sum() == pytest.approx(1)
+    # Ridge evens weights out
+    w_ridge = fit_weights(preds, actual, ridge=10)
+    assert w_ridge.std() < w.std()
+
+    # Fits weights per hour of day
+    hours = np.arange(2000) % 24
+    actual = np.where(hours < 12, preds[:, 0], preds[:, 2])
+    w = fit_weights(preds, actual, hours)
+    assert w.shape == (24, 3)
+    assert np.allclose(w[:12], [1, 0, 0]) and np.allclose(w[12:], [0, 0, 1])
+    assert np.allclose(combine(preds[1:], w[hours[1:]]), actual[1:])
+
+    # Identical forecasters are still solved
+    same = np.stack([preds[:, 2]] * 2, axis=1)
+    assert np.allclose(fit_weights(same, preds[:, 2]).sum(), 1)
+
+
+def test_rolling_weights(hourly):
+    rng = np.random.default_rng(0)
+    preds = rng.normal(size=(len(hourly), 2))
+    # The first forecaster is exact for 30 days, then the second one
+    actual = np.where(np.arange(len(hourly)) < 30 * 24, preds[:, 0], preds[:, 1])
+
+    w = rolling_weights(preds, actual, hourly, window_days=7)
+    assert w.shape == (len(hourly), 2)
+    day, _ = local_day_hour(hourly)
+    day = day - day[0]
+    # No weights without past data (the first local day starts at 1 AM UTC)
+    assert np.isnan(w[day == 0]).all()
+    assert np.allclose(w[day == 10], [1, 0])
+    assert np.allclose(w[day == 45], [0, 1])
+    # Only uses days before each day
+    assert np.allclose(w[(day > 1) & (day < 30)], [1, 0])
+    assert np.allclose(w[day == 31].sum(axis=1), 1)
+    assert (w[day == 31][:, 1] > 0).all() and (w[day == 31][:, 1] < 1).all()
+
+    # Matches fitting each window on its own
+    mask = (day >= 26) & (day < 33)
+    assert np.allclose(w[day == 33][0], fit_weights(preds[mask], actual[mask]))
+
+    # Per hour of day
+    w_hourly = rolling_weights(preds, actual, hourly, window_days=7, per_hour=True)
+    assert np.allclose(w_hourly[day == 45], [0, 1])
@@ -0,0 +1,151 @@
+from datetime import datetime
+
+import duckdb
+import numpy as np
+import pytest
+
+import src.model.features as features
+from src.model.energy_charts import (
+    EpexMarketData,
+    EpexMarketDataPoint,
+    EpexMarketFrame,
+)
+from src.model.features import FEATURE_KEYS, TBL_NAME, FeaturesHourly
+from src.model.open_meteo import (
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+from src.util.features import build_features, to_ms
+from src.util.gaps import HOUR_MS
+
+
+def utc_hours(start: str, num_hours: int) -> np.ndarray:
+    return np.datetime64(start, "ms") + np.arange(num_hours) * np.timedelta64(1, "h")
+
+
+def add_weather(con: duckdb.DuckDBPyConnection, start: str, num_hours: int):
+    ts = utc_hours(start, num_hours)
+    ones = np.ones(num_hours)
+    # Every column holds the hour, so rows can be traced back
+    hours = ts.astype(np.int64) / HOUR_MS
+    vals = {k: hours for k in OpenMeteoForecastData.__annotations__}
+    frame = ForecastFrame(ts, ones * 51, ones * 10, ones, vals)
+    OpenMeteoForecastDataPoint.upsert_many(frame, con, "open_meteo_agg_hourly")
+
+
+def add_market(con: duckdb.DuckDBPyConnection, start: str, num_hours: int):
+    ts = utc_hours(start, num_hours).astype(np.int64)
+    vals = {k: ts / HOUR_MS for k in EpexMarketData.__annotations__}
+    EpexMarketDataPoint.upsert_many(EpexMarketFrame(ts, vals), con)
+
+
+@pytest.fixture
+def con() -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect(":memory:")
+    OpenMeteoForecastDataPoint.init_table(con, "open_meteo_agg_hourly")
+    EpexMarketDataPoint.init_table(con)
+    return con
+
+
+def test_build_features(con):
+    # Nothing to build yet
+    assert build_features(con) == 0
+
+    # Three days around the 2024 fall-back transition
+    add_weather(con, "2024-10-26T00:00", 72)
+    add_market(con, "2024-10-25T00:00", 96)
+    assert build_features(con) == 72
+
+    fm = FeaturesHourly.load(con, fill_nan=False)
+    assert fm.x.dtype == np.float32
+    assert fm.x.shape == (72, len(FEATURE_KEYS))
+
+    # A complete UTC grid, despite the repeated local hour
+    assert np.array_equal(fm.ts, utc_hours("2024-10-26T00:00", 72))
+    hours = fm.ts.astype(np.int64) / HOUR_MS
+    assert np.array_equal(fm.col("temperature_2m_degc"), hours)
+
+    # Market data is aligned in UTC, the hour lost in local time is filled
+    price = fm.col("idc_av_price_eurmwh")
+    diff = np.nonzero(price != hours)[0]
+    assert fm.ts[diff].tolist() == [datetime(2024, 10, 27, 1)]
+    assert price[diff[0]] == hours[diff[0]] - 1
+
+    # Lagged market data is the market data from a day earlier
+    lagged = fm.col("idc_av_price_eurmwh_lag24h")
+    assert np.array_equal(lagged[24:], price[:-24])
+    assert np.array_equal(lagged[:24], hours[:24] - 24)
+
+
+def test_build_features_incremental(con):
+    add_weather(con, "2024-03-30T00:00", 48)
+    add_market(con, "2024-03-29T00:00", 48)
+    # Weather is ahead, so the last hours only have lagged market data
+    assert build_features(con) == 48
+    fm = FeaturesHourly.load(con, fill_nan=False)
+    assert np.isnan(fm.col("daa_price_eurmwh")[-24:]).all()
+    assert not np.isnan(fm.col("daa_price_eurmwh_lag24h")).any()
+
+    # Only the last day and the new hours are recomputed
+    add_weather(con, "2024-04-01T00:00", 24)
+    add_market(con, "2024-03-31T00:00", 24)
+    assert build_features(con) == 48
+    incremental = FeaturesHourly.load(con, fill_nan=False)
+    assert len(incremental) == 72
+
+    # Same result as a full rebuild
+    assert build_features(con, incremental=False) == 72
+    full = FeaturesHourly.load(con, fill_nan=False)
+    assert np.array_equal(incremental.x, full.x, equal_nan=True)
+    assert np.array_equal(incremental.ts, full.ts)
+    assert not np.isnan(full.col("idc_av_price_eurmwh")[:48]).any()
+
+    # Nothing new to add
+    assert build_features(con) == 24
+
+
+def test_build_features_version(con, monkeypatch):
+    add_weather(con, "2024-01-02T00:00", 72)
+    add_market(con, "2024-01-01T00:00", 96)
+    assert build_features(con) == 72
+    assert FeaturesHourly.version(con) == features.FEATURES_VERSION
+
+    # Incremental runs leave older days alone
+    con.execute(f"UPDATE {TBL_NAME} SET temperature_2m_degc = -1")
+    assert build_features(con) == 24
+    temp = FeaturesHourly.load(con).col("temperature_2m_degc")
+    assert (temp[:48] == -1).all()
+    assert (temp[48:] > 0).all()
+
+    # A new version rebuilds the table
+    monkeypatch.setattr(features, "FEATURES_VERSION", features.FEATURES_VERSION + 1)
+    assert build_features(con) == 72
+    assert FeaturesHourly.version(con) == features.FEATURES_VERSION
+    assert (FeaturesHourly.load(con).col("temperature_2m_degc") > 0).all()
+
+
+def test_load_features(con):
+    add_weather(con, "2024-01-02T00:00", 48)
+    add_market(con, "2024-01-01T00:00", 72)
+    con.execute("UPDATE epex_market SET load_kw = NULL WHERE hour(ts) = 12")
+    build_features(con)
+
+    keys = ["temperature_2m_degc", "load_kw"]
+    fm = FeaturesHourly.load(
+        con, keys, datetime(2024, 1, 3), datetime(2024, 1, 3, 12), np.float64
+    )
+    assert len(fm) == 12
+    assert fm.keys == keys
+    assert fm.ts[0] == np.datetime64("2024-01-03T00:00")
+
+    # Stats are stored for all hours, missing values are replaced by the mean
+    hours = to_ms(datetime(2024, 1, 2)) / HOUR_MS + np.arange(48)
+    assert fm.mean[0] == pytest.approx(hours.mean())
+    assert fm.std[0] == pytest.approx(hours.std(ddof=1))
+    assert fm.col("load_kw")[11] == fm.mean[1]
+    assert not np.isnan(fm.x).any()
+
+    # Rejects unknown features
+    with pytest.raises(AssertionError):
+        FeaturesHourly.load(con, ["ts"])
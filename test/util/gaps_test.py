@@ -0,0 +1,126 @@
+import calendar
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.util.gaps import HOUR_MS, dedupe, fill_hourly
+from src.util.tz import from_local_wall_ms, to_local_wall_ms
+
+YEARS = range(2015, 2026)
+
+
+def hours(*vals: int) -> np.ndarray:
+    return np.array(vals, dtype=np.int64) * HOUR_MS
+
+
+def last_sunday(year: int, month: int) -> datetime:
+    days = calendar.monthcalendar(year, month)
+    day = max(week[calendar.SUNDAY] for week in days)
+    return datetime(year, month, day, 2)
+
+
+def test_dedupe():
+    h = np.array([3, 1, 2, 2, 4])
+    vals = {"a": np.array([3.0, 1, 2, 4, 5])}
+    assert dedupe(h[:2], {"a": vals["a"][:2]})[0].tolist() == [1, 3]
+
+    uniq, first = dedupe(h, vals)
+    assert uniq.tolist() == [1, 2, 3, 4]
+    assert first["a"].tolist() == [1, 2, 3, 5]
+    assert dedupe(h, vals, "last")[1]["a"].tolist() == [1, 4, 3, 5]
+    assert dedupe(h, vals, "mean")[1]["a"].tolist() == [1, 3, 3, 5]
+
+
+def test_fill_hourly():
+    ts = hours(0, 1, 5, 6, 8)
+    vals = {"a": np.array([0.0, 1, 5, 6, 8])}
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        fill_hourly(ts, vals, method="bfill")  # type: ignore
+    with pytest.raises(AssertionError):
+        fill_hourly(ts[1:], vals)
+    with pytest.raises(AssertionError):
+        fill_hourly(ts + 1, vals)
+
+    grid, filled = fill_hourly(ts, vals)
+    assert grid.tolist() == hours(*range(9)).astype("datetime64[ms]").tolist()
+    assert filled["a"].tolist() == [0, 1, 1, 1, 1, 5, 6, 6, 8]
+    _, filled = fill_hourly(ts, vals, method="interpolate")
+    assert filled["a"].tolist() == list(range(9))
+
+    # Only fills short gaps and nothing outside the data
+    grid = hours(*range(-1, 11)).astype("datetime64[ms]")
+    _, filled = fill_hourly(ts, vals, grid, max_gap=2)
+    assert np.array_equal(
+        filled["a"],
+        [np.nan, 0, 1, np.nan, np.nan, np.nan, 5, 6, 6, 8, np.nan, np.nan],
+        equal_nan=True,
+    )
+
+    # Empty input
+    grid, filled = fill_hourly(ts[:0], {"a": vals["a"][:0]})
+    assert len(grid) == 0
+    assert len(filled["a"]) == 0
+    _, filled = fill_hourly(ts[:0], {"a": vals["a"][:0]}, grid=ts)
+    assert np.isnan(filled["a"]).all()
+
+
+def test_fill_hourly_seasonal():
+    # Two days with the value being the hour of day, then gaps on day 3
+    ts = hours(*range(48), 48, 50, 60, 70, 71)
+    vals = {"a": np.append(np.arange(48.0) % 24, [0, 2, 12, 22, 23])}
+    vals["a"][30] = np.nan
+    ts = np.delete(ts, 29)
+    vals["a"] = np.delete(vals["a"], 29)
+
+    _, filled = fill_hourly(ts, vals, method="seasonal")
+    a = filled["a"]
+    assert a[49] == 1
+    assert a[51:53].tolist() == [3, 4]
+    assert a[55:60].tolist() == [7, 8, 9, 10, 11]
+    # Falls back to earlier days, and missing values are copied as they are
+    assert a[29] == 5
+    assert a[53] == 5
+    assert np.isnan(a[54])
+
+    # Falls back to ffill without an earlier day
+    ts = hours(0, 3)
+    _, filled = fill_hourly(ts, {"a": np.array([1.0, 2])}, method="seasonal")
+    assert filled["a"].tolist() == [1, 1, 1, 2]
+
+
+def test_fill_hourly_dst():
+    # Hourly data for 2015 - 2025, stored in local wall clock time (as `epex_market`)
+    utc = np.arange(
+        np.datetime64("2015-01-01T00:00"),
+        np.datetime64("2026-01-01T00:00"),
+        np.timedelta64(1, "h"),
+    ).astype("datetime64[ms]")
+    utc_hours = utc.astype(np.int64) // HOUR_MS
+    wall = to_local_wall_ms(utc.astype(np.int64))
+    vals = {"a": utc_hours.astype(np.float64)}
+
+    # In local time, one hour is missing in spring and one repeated in autumn
+    grid, filled = fill_hourly(wall, vals, method="interpolate")
+    assert len(grid) == len(utc)
+    gaps = grid[filled["a"] % 1 == 0.5]
+    assert gaps.tolist() == [last_sunday(year, 3) for year in YEARS]
+
+    # Repeated hours keep the first occurrence, or are averaged
+    repeated = np.isin(grid, [np.datetime64(last_sunday(y, 10)) for y in YEARS])
+    assert repeated.sum() == len(YEARS)
+    _, first = fill_hourly(wall, vals)
+    _, mean = fill_hourly(wall, vals, duplicates="mean")
+    assert np.array_equal(mean["a"][repeated], first["a"][repeated] + 0.5)
+    assert np.array_equal(mean["a"][~repeated], first["a"][~repeated])
+
+    # In UTC, the second occurrence of the repeated hour is filled
+    uniq, idx = np.unique(wall, return_index=True)
+    ts = from_local_wall_ms(uniq)
+    grid, filled = fill_hourly(ts, {"a": vals["a"][idx]}, utc, max_gap=1)
+    assert np.array_equal(grid, utc)
+    missing = np.nonzero(filled["a"] != utc_hours)[0]
+    assert len(missing) == len(YEARS)
+    assert np.all(filled["a"][missing] == utc_hours[missing] - 1)
@@ -1,8 +1,22 @@
+import duckdb
+import numpy as np
 import pytest
 from dateutil.parser import parse
 
-from src.model.open_meteo import OpenMeteoForecastData, OpenMeteoForecastDataPoint
-from src.util.geo import get_german_states, merge_forecasts
+from src.model.forecast import Location
+from src.model.open_meteo import (
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+from src.util.geo import (
+    get_german_grid,
+    get_german_states,
+    match_locations,
+    merge_forecasts,
+    merge_forecasts_db,
+    weight_matrix,
+)
 
 
 def test_get_german_states():
@@ -16,6 +30,27 @@ def test_get_german_states():
         assert state.lon < 16
 
 
+def test_get_german_states_split_weights():
+    states = get_german_states()
+    split = get_german_states(split_weights=True)
+    for state, s in zip(states, split):
+        assert state.weight == s.sol_weight + s.wnd_weight
+    assert split[2].wnd_weight == 0
+
+
+def test_get_german_grid():
+    states = get_german_states()
+    cells = get_german_grid(2, 3)
+    assert len(cells) == 16 * 6
+    assert cells[0].name == f"{states[0].name}-0-0"
+    assert cells[5].name == f"{states[0].name}-1-2"
+
+    # Spreads each state's capacity over its cells
+    for idx, state in enumerate(states):
+        weights = [c.weight for c in cells[idx * 6 : (idx + 1) * 6]]
+        assert sum(weights) == pytest.approx(state.weight)
+
+
 def test_merge_forecasts(forecasts):
     # Rejects invalid values
     with pytest.raises(AssertionError):
@@ -55,6 +90,157 @@ def test_merge_forecasts(forecasts):
         merge_forecasts(forecasts[3:])
 
 
+def test_merge_forecast_frames(forecasts):
+    frames = [ForecastFrame.frompoints(fc) for fc in forecasts]
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        merge_forecasts([frames[0]])
+    with pytest.raises(AssertionError):
+        merge_forecasts([frames[0], frames[2]])
+    with pytest.raises(AssertionError):
+        merge_forecasts(frames[3:])
+
+    # Matches the data point merge
+    for fcs, w in [(forecasts[:2], [3, 1]), (forecasts[2:4], [1, 9])]:
+        expected = merge_forecasts(fcs, w)
+        merged = merge_forecasts([ForecastFrame.frompoints(fc) for fc in fcs], w)
+        assert isinstance(merged, ForecastFrame)
+        assert merged.ts.tolist() == [dp.ts for dp in expected]
+        assert np.allclose(merged.elev, [dp.elev for dp in expected])
+        for k in OpenMeteoForecastData.__annotations__:
+            assert np.allclose(merged.vals[k], [getattr(dp, k) for dp in expected])
+
+
+def test_merge_forecasts_missing_values(forecasts):
+    fc1, fc2 = forecasts[0], forecasts[1]
+    setattr(fc1[0], "visibility_m", None)
+    setattr(fc1[0], "precipitation_mm", None)
+    setattr(fc2[0], "precipitation_mm", None)
+
+    # Skips missing values and renormalizes the remaining weights
+    fc = merge_forecasts([fc1, fc2], [3, 1])
+    assert getattr(fc[0], "visibility_m") == 16768
+    assert getattr(fc[0], "precipitation_mm") is None
+    assert round(getattr(fc[0], "temperature_2m_degc"), 2) == 15.23
+
+
+def test_merge_forecasts_db(forecasts):
+    con = duckdb.connect(":memory:")
+    OpenMeteoForecastDataPoint.init_table(con)
+    OpenMeteoForecastDataPoint.upsert_many(forecasts[2] + forecasts[3], con)
+    locs = [Location("A", 50.05, 10, 1), Location("B", 48, 10.95, 9)]
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        merge_forecasts_db(con, locs[:1])
+
+    # Matches the Python merge
+    assert merge_forecasts_db(con, locs) == 2
+    expected = merge_forecasts(forecasts[2:4], [1, 9])
+    res = ForecastFrame.fromrelation(
+        con.sql("SELECT * FROM open_meteo_agg_hourly ORDER BY ts")
+    )
+    assert res.ts.tolist() == [dp.ts for dp in expected]
+    assert np.allclose(res.lat, [dp.lat for dp in expected])
+    for k in OpenMeteoForecastData.__annotations__:
+        assert np.allclose(res.vals[k], [getattr(dp, k) for dp in expected])
+
+    # Only recomputes changed hours in incremental mode
+    assert merge_forecasts_db(con, locs, incremental=True) == 0
+    new_dps = [
+        OpenMeteoForecastDataPoint(parse("2025-09-17T02:00"), 50, 10, 66, fc_data_3),
+        OpenMeteoForecastDataPoint(parse("2025-09-17T02:00"), 48, 11, 23, fc_data_1),
+        OpenMeteoForecastDataPoint(parse("2025-09-17T03:00"), 48, 11, 23, fc_data_1),
+    ]
+    OpenMeteoForecastDataPoint.upsert_many(new_dps, con)
+    assert merge_forecasts_db(con, locs, incremental=True) == 1
+    stmt = "SELECT count(*) FROM open_meteo_agg_hourly"
+    assert con.sql(stmt).fetchall() == [(3,)]
+
+    # Recomputes everything from the start time on when weights change
+    first = con.sql(
+        "SELECT * FROM open_meteo_agg_hourly ORDER BY ts LIMIT 1"
+    ).fetchall()
+    locs[0].weight = 2
+    assert merge_forecasts_db(con, locs, parse("2025-09-17T01:00"), True) == 2
+    assert con.sql(stmt).fetchall() == [(3,)]
+    # Earlier hours survive
+    res = con.sql("SELECT * FROM open_meteo_agg_hourly ORDER BY ts LIMIT 1").fetchall()
+    assert res == first
+
+    # Removes hours whose source rows were deleted
+    con.execute("DELETE FROM open_meteo_hourly WHERE ts = '2025-09-17T02:00'")
+    assert merge_forecasts_db(con, locs, incremental=True) == 0
+    ts = con.sql("SELECT ts FROM open_meteo_agg_hourly ORDER BY ts").fetchall()
+    assert parse("2025-09-17T02:00") not in [t for (t,) in ts]
+    assert len(ts) == 2
+    stmt = "SELECT count(*) FROM open_meteo_agg_hourly_sources WHERE ts = ?"
+    assert con.execute(stmt, [parse("2025-09-17T02:00")]).fetchall() == [(0,)]
+
+
+def test_merge_forecasts_db_exact(forecasts):
+    con = duckdb.connect(":memory:")
+    OpenMeteoForecastDataPoint.init_table(con)
+    OpenMeteoForecastDataPoint.upsert_many(forecasts[2] + forecasts[3], con)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        match_locations("h", "l", -1)
+
+    # Matches the tolerant merge for exact coordinates
+    locs = [Location("A", 50, 10, 1), Location("B", 48, 11, 9)]
+    assert merge_forecasts_db(con, locs) == 2
+    expected = con.sql("SELECT * FROM open_meteo_agg_hourly ORDER BY ts").fetchall()
+    assert merge_forecasts_db(con, locs, tol=0) == 2
+    res = con.sql("SELECT * FROM open_meteo_agg_hourly ORDER BY ts").fetchall()
+    assert res == expected
+
+    # Skips nearby locations
+    locs = [Location("A", 50.05, 10, 1), Location("B", 48, 11, 9)]
+    assert merge_forecasts_db(con, locs, tol=0) == 0
+
+
+def test_merge_forecasts_split_weights(forecasts):
+    frames = [ForecastFrame.frompoints(fc) for fc in forecasts[2:4]]
+    same = [Location("A", 50, 10, 1), Location("B", 48, 11, 9)]
+    split = [
+        Location("A", 50, 10, 1, sol_weight=3, wnd_weight=1),
+        Location("B", 48, 11, 9, sol_weight=1, wnd_weight=1),
+    ]
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        merge_forecasts(frames, weight_matrix(same)[:, :3])
+
+    # Matches scalar weights when solar and wind weights are equal
+    expected = merge_forecasts(frames, [1, 9])
+    res = merge_forecasts(frames, weight_matrix(same))
+    assert res.lat.tolist() == expected.lat.tolist()
+    for k in OpenMeteoForecastData.__annotations__:
+        assert res.vals[k].tolist() == expected.vals[k].tolist()
+
+    # Weights solar and wind columns separately
+    res = merge_forecasts(frames, weight_matrix(split))
+    sol = merge_forecasts(frames, [3, 1])
+    wnd = merge_forecasts(frames, [1, 1])
+    k_sol, k_wnd, k_tmp = "direct_radiation_wm2", "wind_speed_10m_kmh", "visibility_m"
+    assert res.vals[k_sol].tolist() == sol.vals[k_sol].tolist()
+    assert res.vals[k_wnd].tolist() == wnd.vals[k_wnd].tolist()
+    assert res.vals[k_tmp].tolist() == expected.vals[k_tmp].tolist()
+
+    # Matches the Python merge in the DB
+    con = duckdb.connect(":memory:")
+    OpenMeteoForecastDataPoint.init_table(con)
+    OpenMeteoForecastDataPoint.upsert_many(forecasts[2] + forecasts[3], con)
+    assert merge_forecasts_db(con, split) == 2
+    db = ForecastFrame.fromrelation(
+        con.sql("SELECT * FROM open_meteo_agg_hourly ORDER BY ts")
+    )
+    for k in OpenMeteoForecastData.__annotations__:
+        assert np.allclose(db.vals[k], res.vals[k])
+
+
 fc_data_1: OpenMeteoForecastData = {
     "temperature_2m_degc": 15.9,
     "shortwave_radiation_wm2": 0,
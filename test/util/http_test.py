@@ -0,0 +1,66 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from requests.exceptions import RetryError
+
+import src.util.http as http
+from src.util.http import (
+    QuotaExceededError,
+    RateLimiter,
+    get_http_session,
+    make_http_session,
+)
+
+
+def test_get_http_session():
+    with patch.object(http, "HTTP_SESSION", None):
+        # Inits new session and re-uses it
+        session = get_http_session()
+        assert get_http_session() is session
+
+
+def test_make_http_session(local_server):
+    attempts: dict[str, int] = {}
+
+    def handle(path: str, query: dict[str, str]):
+        attempts[path] = attempts.get(path, 0) + 1
+        if attempts[path] < 3:
+            return 429, {"Retry-After": "0"}, b"Too many requests"
+        return 200, {"Content-Type": "application/json"}, b'{"ok": true}'
+
+    server = local_server(handle)
+
+    # Retries rate-limited requests
+    session = make_http_session(retries=3, backoff=0)
+    res = session.get(f"{server.url}/data")
+    assert res.json() == {"ok": True}
+    assert attempts["/data"] == 3
+
+    # Gives up after the configured number of retries
+    session = make_http_session(retries=1, backoff=0)
+    with pytest.raises(RetryError):
+        session.get(f"{server.url}/other")
+    assert attempts["/other"] == 2
+
+
+def test_rate_limiter():
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        RateLimiter(0)
+    with pytest.raises(AssertionError):
+        RateLimiter(1, 0)
+
+    # Spaces out requests
+    limiter = RateLimiter(50, 10)
+    t0 = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - t0 >= 0.09
+    assert f"{limiter}" == "RateLimiter: 50.0 req/s (6/10)"
+
+    # Enforces the daily quota
+    limiter.acquire(3.5)
+    with pytest.raises(QuotaExceededError):
+        limiter.acquire()
+    assert limiter.used == 9.5
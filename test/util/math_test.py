@@ -1,4 +1,7 @@
-from src.util.math import normalize
+import numpy as np
+import pytest
+
+from src.util.math import normalize, weighted_nanmean
 
 
 def test_normalize():
@@ -9,3 +12,29 @@ def test_normalize():
         0.35,
         0.02,
     ]
+
+
+def test_weighted_nanmean():
+    vals = np.array([[1.0, 2.0, np.nan], [3.0, np.nan, np.nan]])
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        weighted_nanmean(vals, np.array([1.0]))
+
+    # Renormalizes weights around missing values
+    res = weighted_nanmean(vals, np.array([1.0, 3.0]))
+    assert res[:2].tolist() == [2.5, 2.0]
+    assert np.isnan(res[2])
+
+    # Works without missing values and for more dimensions
+    cube = np.arange(12, dtype=np.float64).reshape(3, 2, 2)
+    res = weighted_nanmean(cube, np.array([0.5, 0.25, 0.25]))
+    assert res.tolist() == [[3.0, 4.0], [5.0, 6.0]]
+
+    # Applies separate weights per column
+    res = weighted_nanmean(cube, np.array([[1.0, 0.0], [0.0, 1.0], [0.0, 1.0]]))
+    assert res.tolist() == [[0.0, 7.0], [2.0, 9.0]]
+    with pytest.raises(AssertionError):
+        weighted_nanmean(cube, np.ones((3, 3)))
+    res = weighted_nanmean(vals[:, None, :], np.array([[1.0, 1.0, 1.0], [1, 0, 1]]))
+    assert res[0, :2].tolist() == [2.0, 2.0]
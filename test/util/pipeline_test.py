@@ -0,0 +1,85 @@
+import threading
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+import src.api.open_meteo as open_meteo
+import src.util.http as http
+from src.model.open_meteo import ForecastFrame
+from src.util.http import QuotaExceededError, RateLimiter, make_http_session
+from src.util.pipeline import fetch_concurrently
+
+
+def test_fetch_concurrently(local_server, forecast_body):
+    attempts: dict[str, int] = {}
+
+    def handle(path: str, query: dict[str, str]):
+        key = query["latitude"]
+        attempts[key] = attempts.get(key, 0) + 1
+        if attempts[key] == 1:
+            return 429, {"Retry-After": "0"}, b"Too many requests"
+        return 200, {"Content-Type": "application/json"}, forecast_body(query)
+
+    server = local_server(handle, latency=0.05)
+    tasks = [
+        (48 + i * 0.5, datetime(2023, 1, 1), datetime(2023, 1, 31)) for i in range(8)
+    ]
+    written: list[tuple[float, int, int]] = []
+    lock = threading.Lock()
+    active = [0, 0]  # current and maximum number of fetches in flight
+
+    def fetch(task):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        try:
+            return open_meteo.get_historical_forecast_frame(
+                task[0], 10, task[1], task[2]
+            )
+        finally:
+            with lock:
+                active[0] -= 1
+
+    def write(task, frame: ForecastFrame):
+        written.append((task[0], len(frame), threading.get_ident()))
+
+    with (
+        patch.object(http, "HTTP_SESSION", make_http_session(backoff=0)),
+        patch.object(
+            open_meteo, "HISTORICAL_FORECAST_URL", f"{server.url}/v1/forecast"
+        ),
+    ):
+        # Fetches concurrently, retries 429 responses and writes from the calling thread
+        assert fetch_concurrently(tasks, fetch, write, workers=8) == 8
+        assert active[1] > 1
+        assert sorted(w[0] for w in written) == [t[0] for t in tasks]
+        assert {w[1] for w in written} == {31 * 24}
+        assert {w[2] for w in written} == {threading.get_ident()}
+        assert len(server.requests) == 16
+
+        # Stops when the quota is used up, but writes completed results
+        written.clear()
+        limiter = RateLimiter(1000, 5)
+        with pytest.raises(QuotaExceededError):
+            fetch_concurrently(tasks, fetch, write, workers=2, limiter=limiter)
+        assert len(written) == 5
+
+
+def test_fetch_concurrently_errors():
+    def fetch(task: int) -> int:
+        if task == 3:
+            raise ValueError("Boom")
+        return task * 2
+
+    written: list[int] = []
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        fetch_concurrently([1], fetch, lambda t, r: None, workers=0)
+
+    # Raises fetch errors after writing completed results
+    with pytest.raises(ValueError):
+        fetch_concurrently(range(10), fetch, lambda t, r: written.append(r), workers=1)
+    assert 0 < len(written) < 10
+    assert 6 not in written
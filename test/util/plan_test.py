@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+
+from src.util.plan import DateRange, PlannedRequest, plan_requests
+
+
+def test_plan_requests():
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        plan_requests({}, max_locs=0)
+    with pytest.raises(AssertionError):
+        plan_requests({}, max_days=0)
+    with pytest.raises(AssertionError):
+        plan_requests({"a": [DateRange(date(2021, 2, 1), date(2021, 1, 1))]})
+
+    # Combines all locations and months of a full backfill
+    year = [DateRange(date(2021, m, 1), date(2021, m, 28)) for m in range(1, 13)]
+    full = [DateRange(date(2021, 1, 1), date(2021, 12, 31))]
+    missing = {f"s{idx}": full for idx in range(16)}
+    reqs = plan_requests(missing, max_locs=16, max_days=366)
+    assert reqs == [PlannedRequest(list(missing), date(2021, 1, 1), date(2021, 12, 31))]
+    assert reqs[0].num_days == 365
+
+    # Splits by max. number of locations and days
+    reqs = plan_requests(missing, max_locs=10, max_days=92)
+    assert len(reqs) == 8
+    assert [len(r.keys) for r in reqs[:2]] == [10, 6]
+    assert max(r.num_days for r in reqs) == 92
+
+    # Doesn't join non-consecutive days or different location sets
+    reqs = plan_requests(
+        {"a": year[:2], "b": [DateRange(date(2021, 1, 1), date(2021, 1, 10))]}
+    )
+    assert reqs == [
+        PlannedRequest(["a", "b"], date(2021, 1, 1), date(2021, 1, 10)),
+        PlannedRequest(["a"], date(2021, 1, 11), date(2021, 1, 28)),
+        PlannedRequest(["a"], date(2021, 2, 1), date(2021, 2, 28)),
+    ]
@@ -0,0 +1,164 @@
+import os
+
+import duckdb
+import numpy as np
+import pytest
+
+from src.model.search import TrialResult
+from src.util.search import (
+    TrialTask,
+    TrialUpdate,
+    attach,
+    init_worker,
+    param_grid,
+    run_trial,
+    rung_epochs,
+    search,
+    share,
+    shared,
+)
+
+
+def fake_train(task: TrialTask) -> TrialUpdate:
+    """Stand-in for `run_trial`, with lower losses for larger and longer trained models."""
+
+    # Reads the shared data
+    assert shared("x_train").shape == (48, 3)
+    assert shared("y_val").tolist() == [1.0] * 24
+
+    os.makedirs(os.path.dirname(task.ckpt_path), exist_ok=True)
+    with open(f"{task.ckpt_path}.{task.start}-{task.end}", "w"):
+        pass
+    p = task.params
+    # Trials with 1 layer stop early after their first rung
+    stopped = p["num_layers"] == 1
+    end = task.end if not stopped else min(task.end, 2)
+    return TrialUpdate(end, 1 / (p["hidden_size"] * end), stopped)
+
+
+def test_share():
+    x = np.arange(12, dtype=np.float32).reshape(3, 4)
+    shm, ref = share(x)
+    try:
+        other, y = attach(ref)
+        assert y.dtype == np.float32
+        assert y.tolist() == x.tolist()
+        # Maps the same memory
+        y[0, 0] = -1
+        assert np.ndarray(x.shape, x.dtype, shm.buf)[0, 0] == -1
+        del y
+        other.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_param_grid():
+    grid = param_grid(["gru", "lstm"], [2, 3], [64], runs=2)
+    assert len(grid) == 8
+    assert grid[0] == {
+        "model": "gru",
+        "num_layers": 2,
+        "hidden_size": 64,
+        "dropout": 0.2,
+        "lr": 1e-3,
+        "lookback": 24,
+        "seed": 0,
+    }
+    assert [p["seed"] for p in grid[:2]] == [0, 1]
+
+
+def test_rung_epochs():
+    assert rung_epochs(4, 108, 3) == [4, 12, 36, 108]
+    assert rung_epochs(4, 100, 3) == [4, 12, 36, 100]
+    assert rung_epochs(5, 5, 3) == [5]
+    with pytest.raises(AssertionError):
+        rung_epochs(0, 10, 3)
+    with pytest.raises(AssertionError):
+        rung_epochs(1, 10, 1)
+
+
+def test_search(tmp_path):
+    con = duckdb.connect(":memory:")
+    ckpt_dir = f"{tmp_path}/ckpt"
+    data = {
+        "x_train": np.zeros((48, 3), dtype=np.float32),
+        "y_train": np.zeros(48, dtype=np.float32),
+        "x_val": np.zeros((24, 3), dtype=np.float32),
+        "y_val": np.ones(24, dtype=np.float32),
+    }
+    trials = param_grid(["gru"], [1, 2], [16, 32, 64, 128, 256])
+    kw = {
+        "min_epochs": 1,
+        "max_epochs": 9,
+        "eta": 3,
+        "workers": 2,
+        "ckpt_dir": ckpt_dir,
+    }
+
+    seen: list[TrialResult] = []
+    results = search(
+        con, "s1", trials, data, train=fake_train, on_result=seen.append, **kw
+    )
+
+    # Trains all trials, then the best third of them for each rung, except stopped ones
+    runs = os.listdir(f"{ckpt_dir}/s1")
+    assert len(runs) == 10 + 2 + 2
+    assert len(seen) == 10 + 2 + 2
+    assert sum(r.endswith(".0-1") for r in runs) == 10
+    assert sum(r.endswith(".1-3") for r in runs) == 2
+    assert sum(r.endswith(".3-9") for r in runs) == 2
+
+    # Returns the final results, best first
+    assert len(results) == 10
+    best = results[0]
+    assert (best.rung, best.epochs, best.status) == (2, 9, "trained")
+    assert best.params["hidden_size"] == 256 and best.params["num_layers"] == 2
+    assert best.val_loss == pytest.approx(1 / (256 * 9))
+    assert [r.status for r in results] == ["trained"] * 2 + ["pruned"] * 8
+
+    # Stores every rung in the DB, and stopped trials keep their loss
+    stored = TrialResult.fromdb(con, "s1")
+    assert len(stored) == 10 + 4 + 2
+    assert [(r.rung, r.trial) for r in stored if r.rung == 2] == [
+        (r.rung, r.trial) for r in results[:2]
+    ]
+    stopped = [r for r in stored if r.rung == 1 and r.params["num_layers"] == 1]
+    assert [(r.epochs, r.val_loss) for r in stopped] == [(1, 1 / 256), (1, 1 / 128)]
+
+    # Resumes without training again
+    results2 = search(con, "s1", trials, data, train=fake_train, **kw)
+    assert len(os.listdir(f"{ckpt_dir}/s1")) == len(runs)
+    assert [(r.trial, r.rung, r.val_loss, r.status) for r in results2] == [
+        (r.trial, r.rung, r.val_loss, r.status) for r in results
+    ]
+
+
+def test_run_trial(tmp_path):
+    pytest.importorskip("torch")
+    rng = np.random.default_rng(0)
+    data = {
+        "x_train": rng.normal(size=(24 * 6, 3)).astype(np.float32),
+        "y_train": rng.normal(size=24 * 6).astype(np.float32),
+        "x_val": rng.normal(size=(24 * 3, 3)).astype(np.float32),
+        "y_val": rng.normal(size=24 * 3).astype(np.float32),
+    }
+    blocks = {k: share(v) for k, v in data.items()}
+    try:
+        init_worker({k: ref for k, (_, ref) in blocks.items()}, 1)
+        params = param_grid(["gru"], [1], [8])[0]
+        ckpt = f"{tmp_path}/trial.pt"
+
+        update = run_trial(TrialTask(params, 0, 2, ckpt, 24, 2, 10))
+        assert (update.epochs, update.stopped) == (2, False)
+        assert update.val_loss > 0
+        assert os.path.exists(ckpt)
+
+        # Continues from the checkpoint
+        update2 = run_trial(TrialTask(params, 2, 3, ckpt, 24, 2, 10))
+        assert update2.epochs == 3
+        assert update2.val_loss <= update.val_loss
+    finally:
+        for shm, _ in blocks.values():
+            shm.close()
+            shm.unlink()
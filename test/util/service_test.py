@@ -0,0 +1,210 @@
+import json
+import threading
+from datetime import date, datetime
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import duckdb
+import numpy as np
+import pytest
+
+from src.model.energy_charts import (
+    EpexMarketData,
+    EpexMarketDataPoint,
+    EpexMarketFrame,
+)
+from src.model.features import FeatureMatrix
+from src.model.open_meteo import (
+    ForecastFrame,
+    OpenMeteoForecastData,
+    OpenMeteoForecastDataPoint,
+)
+from src.util.gaps import HOUR_MS
+from src.util.service import ForecastService, MissingDataError, make_server
+
+
+def utc_hours(start: str, num_hours: int) -> np.ndarray:
+    return np.datetime64(start, "ms") + np.arange(num_hours) * np.timedelta64(1, "h")
+
+
+def weather_frame(start: str, num_hours: int, offset=0) -> ForecastFrame:
+    ts = utc_hours(start, num_hours)
+    ones = np.ones(num_hours)
+    # Every column holds the hour (plus offset), so rows can be traced back
+    hours = ts.astype(np.int64) / HOUR_MS + offset
+    vals = {k: hours for k in OpenMeteoForecastData.__annotations__}
+    return ForecastFrame(ts, ones * 51, ones * 10, ones, vals)
+
+
+def add_weather(con: duckdb.DuckDBPyConnection, start: str, num_hours: int):
+    frame = weather_frame(start, num_hours)
+    OpenMeteoForecastDataPoint.upsert_many(frame, con, "open_meteo_agg_hourly")
+
+
+def add_market(con: duckdb.DuckDBPyConnection, start: str, num_hours: int):
+    ts = utc_hours(start, num_hours).astype(np.int64)
+    vals = {k: ts / HOUR_MS for k in EpexMarketData.__annotations__}
+    EpexMarketDataPoint.upsert_many(EpexMarketFrame(ts, vals), con)
+
+
+NOW = datetime(2024, 6, 9, 13)
+DAY = date(2024, 6, 10)
+# UTC hours of the local delivery day (CEST)
+DAY_HOURS = utc_hours("2024-06-09T22:00", 24)
+
+
+def forecaster(history: FeatureMatrix, hours: np.ndarray) -> np.ndarray:
+    """Weather and lagged day-ahead price of the delivery hours"""
+
+    n = len(hours)
+    return np.stack(
+        [
+            history.col("temperature_2m_degc")[-n:],
+            history.col("daa_price_eurmwh_lag24h")[-n:],
+        ],
+        axis=1,
+    )
+
+
+@pytest.fixture
+def service() -> ForecastService:
+    con = duckdb.connect(":memory:")
+    OpenMeteoForecastDataPoint.init_table(con, "open_meteo_agg_hourly")
+    EpexMarketDataPoint.init_table(con)
+    add_weather(con, "2024-05-01T00:00", 39 * 24)
+    # Market data up to 11:00 local time, before gate closure
+    add_market(con, "2024-05-01T00:00", 39 * 24 + 10)
+
+    calls = []
+
+    def fetch_weather():
+        calls.append(1)
+        # Shifted, so live values can be told apart from stored ones
+        return weather_frame("2024-06-08T00:00", 72, offset=1000)
+
+    service = ForecastService(
+        con, forecaster, quantiles=(0.1, 0.5), fetch_weather=fetch_weather
+    )
+    service.calls = calls
+    return service
+
+
+def test_refresh(service):
+    assert service.refresh(NOW)
+    assert service.version == 1
+    # Features of the lookback window (and the day before) up to the stored weather
+    assert service.window.ts[0] == np.datetime64("2024-05-11T00:00")
+    assert service.window.ts[-1] == np.datetime64("2024-06-08T23:00")
+
+    # Nothing changed
+    assert not service.refresh(NOW)
+    assert service.version == 1
+    assert len(service.calls) == 1
+
+    # New data is appended to the window
+    add_weather(service.con, "2024-06-09T00:00", 24)
+    assert service.refresh(NOW)
+    assert service.version == 2
+    assert service.window.ts[0] == np.datetime64("2024-05-11T00:00")
+    assert service.window.ts[-1] == np.datetime64("2024-06-09T23:00")
+    assert np.all(np.diff(service.window.ts.astype(np.int64)) == HOUR_MS)
+    assert len(service.calls) == 1
+
+    # Stale weather is re-fetched
+    service.weather_at = -np.inf
+    assert service.refresh(NOW)
+    assert service.version == 3
+    assert len(service.calls) == 2
+
+
+def test_forecast(service):
+    service.refresh(NOW)
+    res = service.forecast(DAY)
+    assert res["day"] == "2024-06-10"
+    assert res["quantiles"] == [0.1, 0.5]
+    assert res["ts"][0] == "2024-06-09T22:00:00Z"
+    assert len(res["ts"]) == len(res["prices"]) == 24
+
+    prices = np.array(res["prices"], dtype=np.float64)
+    # Weather of the delivery day from the live forecast
+    hours = DAY_HOURS.astype(np.int64) / HOUR_MS
+    assert np.array_equal(prices[:, 0], hours + 1000)
+    # Day-ahead prices of the day before, as far as they are published
+    lagged = hours - 24
+    assert np.array_equal(prices[:12, 1], lagged[:12])
+    assert np.isnan(prices[12:, 1]).all()
+
+    # Cached until the data changes
+    assert service.forecast(DAY) is res
+    add_market(service.con, "2024-06-09T10:00", 14)
+    service.refresh(NOW)
+    res = service.forecast(DAY)
+    prices = np.array(res["prices"], dtype=np.float64)
+    assert np.array_equal(prices[:, 1], lagged)
+
+    # Days without weather can't be forecast
+    with pytest.raises(MissingDataError):
+        service.forecast(date(2024, 6, 20))
+
+
+def test_server(service):
+    service.refresh(NOW)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(path: str) -> tuple[int, dict]:
+        try:
+            with urlopen(url + path) as res:
+                return res.status, json.load(res)
+        except HTTPError as e:
+            return e.code, json.load(e)
+
+    try:
+        status, res = get("/forecast?day=2024-06-10")
+        assert status == 200
+        assert res == json.loads(json.dumps(service.forecast(DAY)))
+        assert get("/health") == (200, {"status": "ok", "version": 1})
+        assert get("/forecast?day=tomorrow")[0] == 400
+        assert get("/forecast?day=2024-06-20")[0] == 404
+        assert get("/unknown")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_errors(service):
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/forecast?day=2024-06-10"
+
+    def get() -> tuple[int, dict]:
+        try:
+            with urlopen(url) as res:
+                return res.status, json.load(res)
+        except HTTPError as e:
+            return e.code, json.load(e)
+
+    def fail():
+        raise TimeoutError("Weather API timed out")
+
+    try:
+        # The weather fetch of the first refresh fails
+        fetch_weather, service.fetch_weather = service.fetch_weather, fail
+        assert get() == (503, {"error": "Forecast unavailable"})
+        # The DB data that was loaded invalidates cached forecasts
+        assert service.version == 1
+
+        # The service has no data (refreshing did nothing)
+        service.fetch_weather = fetch_weather
+        refresh, service.refresh = service.refresh, lambda now=None: False
+        service.window = None
+        assert get() == (503, {"error": "Forecast unavailable"})
+        service.refresh = refresh
+
+        # The DB fails (on a cold start)
+        service.con.execute("DROP TABLE epex_market")
+        assert get() == (503, {"error": "Forecast unavailable"})
+    finally:
+        server.shutdown()
+        server.server_close()
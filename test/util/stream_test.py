@@ -0,0 +1,33 @@
+import io
+import json
+
+import pytest
+
+from src.util.stream import iter_json_values
+
+
+def test_iter_json_values():
+    data = [
+        {"name": "Baden-Württemberg", "values": [1.5, -2, None, 1e-3]},
+        {"name": "Bayern", "values": list(range(100))},
+        [],
+        12345,
+    ]
+    body = json.dumps(data, ensure_ascii=False, indent=2).encode()
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        list(iter_json_values(io.BytesIO(body), chunk_size=0))
+
+    # Decodes array elements one by one, independent of the chunk size
+    for chunk_size in [1, 7, 64, 1 << 20]:
+        assert list(iter_json_values(io.BytesIO(body), chunk_size)) == data
+
+    # Yields single values as is
+    assert list(iter_json_values(io.BytesIO(b' {"a": 1} '), 3)) == [{"a": 1}]
+    assert list(iter_json_values(io.BytesIO(b"[ ]"), 1)) == []
+
+    # Raises on malformed input
+    for body in [b"", b'[{"a": 1}', b'[{"a": 1} {"b": 2}]', b'[{"a": }]']:
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_values(io.BytesIO(body), 4))
@@ -0,0 +1,38 @@
+import calendar
+import time
+
+import numpy as np
+
+from src.util.tz import from_local_wall_ms, to_local_wall_ms, utc_offsets
+
+
+def test_utc_offsets():
+    assert len(utc_offsets(np.array([], dtype=np.int64))) == 0
+
+    # Matches the offsets from the time module, including DST transition days
+    ts = np.arange(1679702400, 1679702400 + 3 * 86400, 1800)
+    assert utc_offsets(ts).tolist() == [time.localtime(t).tm_gmtoff for t in ts]
+    ts = np.arange(1698537600 - 86400, 1698537600 + 2 * 86400, 3600)
+    assert utc_offsets(ts).tolist() == [time.localtime(t).tm_gmtoff for t in ts]
+
+
+def test_to_local_wall_ms():
+    ts = np.arange(1711753200000, 1711753200000 + 7 * 86400000, 3600000)
+    assert to_local_wall_ms(ts).tolist() == [
+        round(calendar.timegm(time.localtime(t / 1e3)) * 1e3) for t in ts.tolist()
+    ]
+
+
+def test_from_local_wall_ms():
+    # Round trips, also across both DST transitions of 2024
+    ts = np.arange(1711753200000, 1711753200000 + 7 * 86400000, 3600000)
+    assert from_local_wall_ms(to_local_wall_ms(ts)).tolist() == ts.tolist()
+    ts = np.arange(1729900800000, 1729900800000 + 3 * 86400000, 3600000)
+    wall = to_local_wall_ms(ts)
+    back = from_local_wall_ms(wall)
+    assert len(np.unique(wall)) == len(ts) - 1
+
+    # The repeated 02:00 maps to its first occurrence (00:00 UTC, still CEST)
+    repeated = np.nonzero(ts != back)[0]
+    assert len(repeated) == 1
+    assert back[repeated[0]] == 1729990800000 - 3600000
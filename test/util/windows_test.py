@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from src.util.windows import num_windows, sliding_windows
+
+
+def create_dataset(data: np.ndarray, target: int, lookback: int, horizon: int):
+    """Windows as created in the notebooks, copying each one (but including the last)."""
+
+    X, y = [], []
+    for i in range(lookback, len(data) - horizon + 1, 24):
+        X.append(data[i - lookback : i])
+        y.append(data[i : i + horizon][:, target])
+    return np.array(X), np.array(y)
+
+
+def test_num_windows():
+    assert num_windows(48, 24, 24, 24) == 1
+    assert num_windows(71, 24, 24, 24) == 1
+    assert num_windows(72, 24, 24, 24) == 2
+    assert num_windows(72, 24, 24, 1) == 25
+    assert num_windows(40, 24, 24, 24) == 0
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        num_windows(72, 0, 24, 24)
+    with pytest.raises(AssertionError):
+        num_windows(72, 24, 24, 0)
+
+
+def test_sliding_windows():
+    x = np.arange(30 * 24 * 5, dtype=np.float32).reshape(-1, 5)
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        sliding_windows(x[:, 0], 0)
+    with pytest.raises(AssertionError):
+        sliding_windows(x, 5)
+
+    # Matches the notebooks' windows
+    for lookback, horizon in [(24, 24), (7 * 24, 24), (48, 12)]:
+        inputs, targets = sliding_windows(x, 3, lookback, horizon)
+        X, y = create_dataset(x, 3, lookback, horizon)
+        assert np.array_equal(inputs, X)
+        assert np.array_equal(targets, y)
+
+    # Windows are read-only views into the matrix
+    inputs, targets = sliding_windows(x, 3, 7 * 24, 24, stride=1)
+    assert inputs.shape == (len(x) - 8 * 24 + 1, 7 * 24, 5)
+    assert targets.shape == (len(x) - 8 * 24 + 1, 24)
+    assert np.shares_memory(inputs, x)
+    assert np.shares_memory(targets, x)
+    assert not inputs.flags.writeable
+    assert targets[1, 0] == x[7 * 24 + 1, 3]
+
+    # Too few rows
+    inputs, targets = sliding_windows(x[:30], 3)
+    assert inputs.shape == (0, 24, 5)
+    assert targets.shape == (0, 24)
+
+
+def test_sliding_windows_offset():
+    x = np.arange(10 * 24 * 2, dtype=np.float32).reshape(-1, 2)
+    y = np.arange(len(x), dtype=np.float64) * -1
+
+    # Rejects invalid values
+    with pytest.raises(AssertionError):
+        sliding_windows(x, y[1:])
+    with pytest.raises(AssertionError):
+        sliding_windows(x, y, offset=-25)
+
+    # Targets of the window's last day, from a separate series
+    inputs, targets = sliding_windows(x, y, 72, 24, 24, offset=-24)
+    assert len(inputs) == len(targets) == num_windows(len(x), 72, 24, 24, -24) == 8
+    assert np.shares_memory(targets, y)
+    for i in range(len(inputs)):
+        assert np.array_equal(inputs[i], x[i * 24 : i * 24 + 72])
+        assert np.array_equal(targets[i], y[i * 24 + 48 : i * 24 + 72])
+
+    # Targets a day after the window ends
+    inputs, targets = sliding_windows(x, 1, 24, 24, 24, offset=24)
+    assert len(inputs) == 8
+    assert np.array_equal(targets[-1], x[-24:, 1])